@@ -1,12 +1,12 @@
 
 
 from django.contrib import admin
-from .models import Employee, Task, AssignmentLog
+from .models import Employee, Task, AssignmentLog, NotificationOutbox
 
 
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "email", "role", "workload_score")
+    list_display = ("id", "name", "email", "role", "workload_score", "active_tasks")
     search_fields = ("name", "email", "role", "skills", "responsibilities")
     list_filter = ("role",)
     ordering = ("name",)
@@ -43,3 +43,21 @@ class AssignmentLogAdmin(admin.ModelAdmin):
     list_filter = ("decision_status",)
     ordering = ("-created_at",)
 
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "channel",
+        "recipient",
+        "subject",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "sent_at",
+    )
+    search_fields = ("recipient", "subject", "last_error")
+    list_filter = ("channel", "status")
+    ordering = ("-created_at",)
+    raw_id_fields = ("task",)
@@ -1,30 +1,82 @@
-import os
+import re
 import json
+import time
+import contextvars
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, Any, List
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from celery import shared_task
-from .models import Task, Employee, AssignmentLog
+from .models import Task, Employee, AssignmentLog, AssignmentBatch
+from .retrieval import find_candidates, match_candidates, matching_backend
+from .skill_index import skill_index
+from .llm_cache import parser_cache, normalize_text
+from .llm_clients import get_chat_model
+from .llm_router import get_router
+from .assigning import commit_auto_assignment
+from .response_cache import invalidate
+from .progress import publish
+from . import metrics, prompts
 
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
-from langgraph.graph import StateGraph
 
 logger = logging.getLogger(__name__)
 
 
 def get_llm():
-    api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.warning("⚠️ No OpenAI API key found; running in mock mode.")
-        return None
-    print(f"✅ Using OpenAI API key (starts with {api_key[:7]}...)")
-    return ChatOpenAI(model="gpt-4o-mini", temperature=0.3, api_key=api_key)
+    """
+    Pooled, per-process ChatOpenAI client (see llm_clients), or the multi-provider
+    router (llm_router) when LLM_PROVIDERS lists more than one provider or not only
+    OpenAI; None runs the pipeline in mock mode.
+    """
+    providers = getattr(settings, "LLM_PROVIDERS", ["openai"])
+    if list(providers) == ["openai"]:
+        llm = get_chat_model(model=getattr(settings, "LLM_PROVIDER_MODELS", {}).get("openai", "gpt-4o-mini"), temperature=0.3)
+    else:
+        llm = get_router()
+    if not llm:
+        logger.warning("⚠️ No LLM API key found; running in mock mode.")
+    return llm
 
-import re
 
-def task_parser_node(task: Task) -> Dict[str, Any]:
-    """Extract candidate skills/keywords from the task title & description."""
+def _invoke_llm(llm, prompt: str, purpose: str):
+    """
+    llm.invoke(prompt), recording prompt size, latency, token usage and estimated cost under `purpose`.
+    When the provider reports no usage, the locally counted prompt/completion tokens are recorded instead.
+    """
+    model = getattr(llm, "model_name", "unknown")
+    prompt_tokens = prompts.count_tokens(prompt, model)
+    metrics.PROMPT_TOKENS.observe(prompt_tokens, purpose=purpose)
+    start = time.perf_counter()
+    try:
+        result = llm.invoke(prompt)
+    except Exception:
+        metrics.record_llm_call(purpose, model, time.perf_counter() - start, ok=False)
+        raise
+    elapsed = time.perf_counter() - start
+    # The router reports which provider's model actually answered.
+    answered_by = getattr(result, "model_name", None)
+    model = answered_by if isinstance(answered_by, str) else model
+    usage = metrics.usage_from(result)
+    if usage == (None, None):
+        content = getattr(result, "content", "")
+        usage = (prompt_tokens, prompts.count_tokens(content if isinstance(content, str) else "", model))
+    metrics.record_llm_call(purpose, model, elapsed, *usage)
+    return result
+
+
+# Bump whenever the task parser prompt changes so cached parses are not reused.
+PARSER_PROMPT_VERSION = "2"
+
+
+def task_parser_node(task: Task, bypass_cache: bool = False) -> Dict[str, Any]:
+    """
+    Extract candidate skills/keywords from the task title & description.
+    Results are cached by content hash (see llm_cache); bypass_cache forces a re-parse.
+    The description is compacted to what is left of PROMPT_TOKEN_BUDGETS["parse"] (see prompts).
+    """
     llm = get_llm()
     if not llm:
       
@@ -50,100 +102,323 @@ def task_parser_node(task: Task) -> Dict[str, Any]:
 )
 
 
-    text = prompt.format(title=task.title, description=task.description)
+    use_cache = getattr(settings, "PARSER_CACHE_ENABLED", True)
+    cache_key = parser_cache.key(
+        normalize_text(task.title), normalize_text(task.description),
+        getattr(llm, "model_name", "unknown"), PARSER_PROMPT_VERSION,
+    )
+    if use_cache and bypass_cache:
+        parser_cache.record_bypass()
+    elif use_cache:
+        cached = parser_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[TaskParser] Cache hit for Task ID={task.id}")
+            return cached
+
+    model = getattr(llm, "model_name", None)
+    description = prompts.compact(
+        task.description,
+        prompts.field_budget("parse", prompt.format(title=task.title, description=""), model=model),
+        model, field="task_description",
+    )
+    text = prompt.format(title=task.title, description=description)
     try:
-        result = llm.invoke(text)
-        print("🧩 Raw model output:", result.content)
+        result = _invoke_llm(llm, text, "parse")
+        logger.debug(f"[TaskParser] Raw model output: {result.content}")
         parsed = json.loads(result.content)
         logger.info(f"[TaskParser] Parsed: {parsed}")
+        if use_cache:
+            parser_cache.set(cache_key, parsed)
         return parsed
     except Exception as e:
         logger.exception(f"Task parser failed: {e}")
         return {"keywords": [], "skills": [], "technical_tags": [], "effort_level": "medium"}
 
 
+def effort_from(parsed: Dict[str, Any] | None) -> str:
+    """Parsed effort_level, clamped to Task.EFFORT_CHOICES (weights the assignee's workload)."""
+    effort = str((parsed or {}).get("effort_level", "medium")).lower()
+    return effort if effort in dict(Task.EFFORT_CHOICES) else "medium"
+
+
 def role_matching_node(parsed: Dict[str, Any]) -> List[Employee]:
-    """Find employees whose role/skills match parsed keywords."""
-    skills = set([s.lower() for s in parsed.get("skills", [])])
-    keywords = set([k.lower() for k in parsed.get("keywords", [])])
-
-    candidates = []
-    for emp in Employee.objects.all():
-        emp_skills = set([s.lower() for s in emp.skills or []])
-        text_block = f"{emp.role} {emp.responsibilities or ''}".lower()
-
-        skill_match = len(emp_skills & skills)
-        keyword_match = sum(1 for k in keywords if k in text_block)
-        score = (skill_match * 2) + keyword_match
-        if score > 0:
-            candidates.append((emp, score))
-
-    candidates.sort(key=lambda x: (-x[1], x[0].workload_score))
+    """Find employees whose role/skills match parsed keywords, best ROLE_MATCHING_TOP_K first."""
+    limit = getattr(settings, "ROLE_MATCHING_TOP_K", 25)
+    candidates = match_candidates(parsed, limit=limit)
+    if getattr(settings, "SEMANTIC_MATCHING", False):
+        from .embeddings import semantic_rerank
+        candidates = semantic_rerank(parsed, candidates, limit)
     logger.info(f"[RoleMatching] {len(candidates)} candidates found")
     return [c[0] for c in candidates]
 
 
+def batch_role_matching(parsed_by_task: Dict[int, Dict[str, Any]]) -> Dict[int, List[Employee]]:
+    """
+    role_matching_node for a whole bulk chunk against one employee snapshot.
+
+    With the in-memory matcher every task is ranked on the shared skill index
+    and the candidates of all tasks are loaded with a single in_bulk; the
+    semantic stage reuses that snapshot too. The database matcher ranks in
+    SQL, so it still runs one query per task.
+    """
+    limit = getattr(settings, "ROLE_MATCHING_TOP_K", 25)
+    if matching_backend() == "memory":
+        ranked = {task_id: skill_index.search(parsed, limit) for task_id, parsed in parsed_by_task.items()}
+        snapshot = Employee.objects.in_bulk({emp_id for pairs in ranked.values() for emp_id, _ in pairs})
+        lexical = {
+            task_id: [(snapshot[emp_id], score) for emp_id, score in pairs if emp_id in snapshot]
+            for task_id, pairs in ranked.items()
+        }
+    else:
+        lexical = {task_id: find_candidates(parsed, limit) for task_id, parsed in parsed_by_task.items()}
+        snapshot = {emp.pk: emp for pairs in lexical.values() for emp, _ in pairs}
+
+    if getattr(settings, "SEMANTIC_MATCHING", False):
+        from .embeddings import semantic_rerank
+        lexical = {
+            task_id: semantic_rerank(parsed_by_task[task_id], pairs, limit, known=snapshot)
+            for task_id, pairs in lexical.items()
+        }
+    return {task_id: [emp for emp, _ in pairs] for task_id, pairs in lexical.items()}
+
+
+def adjusted_score(workload_score: float) -> float:
+    """Workload-adjusted availability in [0.4, 1.0]."""
+    availability = max(0.0, 1.0 - workload_score)
+    return round(availability * 0.6 + 0.4, 2)
+
+
 def workload_analyzer_node(candidates: List[Employee]) -> List[Dict[str, Any]]:
     """Return candidates with workload-adjusted availability score."""
     adjusted = []
     for emp in candidates:
-        availability = max(0.0, 1.0 - emp.workload_score)
-        adjusted_score = round(availability * 0.6 + 0.4, 2)
-        adjusted.append({"employee": emp, "adjusted_score": adjusted_score})
+        adjusted.append({"employee": emp, "adjusted_score": adjusted_score(emp.workload_score)})
     adjusted.sort(key=lambda x: -x["adjusted_score"])
     logger.info("[WorkloadAnalyzer] Adjusted workload scores calculated.")
     return adjusted
 
 
-def confidence_scorer_node(task: Task, candidate_info: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Compute a confidence score (0–1) for each candidate using LLM or heuristic fallback."""
-    llm = get_llm()
-    results = []
+def _heuristic_score(info: Dict[str, Any], reason: str) -> Dict[str, Any]:
+    return {
+        "employee": info["employee"],
+        "confidence": round(float(min(1.0, info["adjusted_score"])), 2),
+        "reason": reason,
+    }
 
-    for info in candidate_info:
-        emp = info["employee"]
 
-        if not llm:
-            conf = float(min(1.0, info["adjusted_score"]))
-            reason = "Heuristic confidence (no LLM)."
-        else:
-            prompt = (
-                f"You are an expert technical evaluator.\n"
-                f"Task: {task.title}\n"
-                f"Description: {task.description}\n"
-                f"Candidate: {emp.name} ({emp.role})\n"
-                f"Skills: {emp.skills}\nResponsibilities: {emp.responsibilities}\n"
-                f"Workload Score: {emp.workload_score}\n\n"
-                "Respond with a single JSON object in this format:\n"
-                '{"confidence": 0.xx, "reason": "short reason"}'
-            )
-            try:
-                result = llm.invoke(prompt)
-                print("🧠 ConfidenceScorer raw output:", result.content)
+def _score_candidate(llm, task: Task, info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ask the LLM for a single candidate's confidence; falls back to the heuristic on failure.
+    The task context is compacted once per task and shared by every candidate's prompt; the
+    candidate's responsibilities get what is left of PROMPT_TOKEN_BUDGETS["score"].
+    """
+    emp = info["employee"]
+    model = getattr(llm, "model_name", None)
+    ctx = prompts.compact_task(task, model=model)
+
+    def build(responsibilities: str) -> str:
+        return (
+            f"You are an expert technical evaluator.\n"
+            f"Task: {ctx.title}\n"
+            f"Description: {ctx.description}\n"
+            f"Candidate: {emp.name} ({emp.role})\n"
+            f"Skills: {emp.skills}\nResponsibilities: {responsibilities}\n"
+            f"Workload Score: {emp.workload_score}\n\n"
+            "Respond with a single JSON object in this format:\n"
+            '{"confidence": 0.xx, "reason": "short reason"}'
+        )
 
+    cap = getattr(settings, "PROMPT_RESPONSIBILITIES_TOKENS", 150)
+    prompt = build(prompts.compact(
+        emp.responsibilities, prompts.field_budget("score", build(""), cap=cap, model=model), model, field="responsibilities",
+    ))
+    try:
+        result = _invoke_llm(llm, prompt, "score")
+        logger.debug(f"[ConfidenceScorer] Raw output: {result.content}")
+
+        try:
+            parsed = json.loads(result.content)
+        except Exception:
+            json_match = re.search(r'\{.*\}', result.content, re.S)
+            if json_match:
+                parsed = json.loads(json_match.group(0))
+            else:
+                parsed = {"confidence": 0.6, "reason": "LLM returned invalid or empty response"}
+
+        conf = float(parsed.get("confidence", 0.6))
+        reason = parsed.get("reason", "No reason provided")
+
+    except Exception as e:
+        logger.exception(f"[ConfidenceScorer] LLM failed: {e}")
+        return _heuristic_score(info, "Fallback heuristic (LLM failed)")
+
+    return {"employee": emp, "confidence": round(conf, 2), "reason": reason}
+
+
+def _parse_batch_rankings(content: str) -> List[Dict[str, Any]]:
+    """Pull the ranking list out of a batch response (bare list or {"rankings": [...]})."""
+    try:
+        parsed = json.loads(content)
+    except Exception:
+        json_match = re.search(r'\[.*\]', content, re.S)
+        if not json_match:
+            return []
+        parsed = json.loads(json_match.group(0))
+    if isinstance(parsed, dict):
+        parsed = parsed.get("rankings", [])
+    return parsed if isinstance(parsed, list) else []
+
+
+def _score_batch(llm, task: Task, chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rank a chunk of candidates with a single LLM call; unranked candidates keep adjusted_score."""
+    rows = "\n".join(
+        f"{info['employee'].id} | {info['employee'].name} | {info['employee'].role} | "
+        f"{', '.join(info['employee'].skills or [])} | {info['employee'].workload_score:.2f}"
+        for info in chunk
+    )
+    model = getattr(llm, "model_name", None)
+
+    def build(description: str) -> str:
+        return (
+            f"You are an expert technical evaluator.\n"
+            f"Task: {task.title}\n"
+            f"Description: {description}\n\n"
+            "Candidates (employee_id | name | role | skills | workload 0-1):\n"
+            f"{rows}\n\n"
+            "Rate how well each candidate fits the task. Respond with ONLY a JSON list, one entry per candidate:\n"
+            '[{"employee_id": 123, "confidence": 0.xx, "reason": "short reason"}]'
+        )
+
+    # The candidate rows are bounded by CONFIDENCE_BATCH_SIZE; the task context takes what is left.
+    cap = getattr(settings, "PROMPT_TASK_CONTEXT_TOKENS", 500)
+    ctx = prompts.compact_task(task, prompts.field_budget("score_batch", build(""), cap=cap, model=model), model)
+    prompt = build(ctx.description)
+    result = _invoke_llm(llm, prompt, "score_batch")
+    logger.debug(f"[ConfidenceScorer] Batch raw output: {result.content}")
+
+    by_id = {info["employee"].id: info for info in chunk}
+    ranked = {}
+    for item in _parse_batch_rankings(result.content):
+        try:
+            emp_id = int(item["employee_id"])
+            conf = min(1.0, max(0.0, float(item["confidence"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if emp_id in by_id and emp_id not in ranked:
+            ranked[emp_id] = {
+                "employee": by_id[emp_id]["employee"],
+                "confidence": round(conf, 2),
+                "reason": str(item.get("reason") or "No reason provided"),
+            }
+
+    missing = len(chunk) - len(ranked)
+    if missing:
+        logger.warning(f"[ConfidenceScorer] Batch ranking omitted {missing} of {len(chunk)} candidates")
+    return [
+        ranked.get(info["employee"].id) or _heuristic_score(info, "Fallback heuristic (missing from batch ranking)")
+        for info in chunk
+    ]
+
+
+def _batch_confidence_scores(llm, task: Task, candidate_info: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Batch mode: rank the top-K candidates in chunks of CONFIDENCE_BATCH_SIZE, one call per chunk."""
+    top_k = getattr(settings, "CONFIDENCE_BATCH_TOP_K", 30)
+    size = max(1, getattr(settings, "CONFIDENCE_BATCH_SIZE", 15))
+    head, tail = candidate_info[:top_k], candidate_info[top_k:]
+    chunks = [head[i:i + size] for i in range(0, len(head), size)]
+
+    scored_chunks = _bounded_map(
+        lambda chunk: _score_batch(llm, task, chunk),
+        chunks,
+        max_workers=getattr(settings, "LLM_SCORING_CONCURRENCY", 8),
+        timeout=getattr(settings, "LLM_SCORING_TIMEOUT", 30.0),
+        fallback=lambda chunk, reason: [_heuristic_score(info, reason) for info in chunk],
+    )
+    results = [scored for chunk in scored_chunks for scored in chunk]
+    results += [_heuristic_score(info, "Heuristic confidence (outside batch top-K)") for info in tail]
+    return results
+
+
+def _bounded_map(fn, items: List[Any], max_workers: int, timeout: float, fallback) -> List[Any]:
+    """
+    Run fn over items on a bounded thread pool, preserving order.
+
+    Each call gets `timeout` seconds from the moment it starts running; calls
+    that raise or overrun are replaced by fallback(item, reason) and abandoned.
+    The whole map also has one deadline from submission (LLM_SCORING_DEADLINE,
+    at least `timeout`): abandoned calls to a hung provider keep their pool
+    threads, so items still queued when it passes would otherwise never start;
+    they fall back too.
+    """
+    if not items:
+        return []
+
+    results: List[Any] = [None] * len(items)
+    started: Dict[int, float] = {}
+    deadline = time.monotonic() + max(timeout, getattr(settings, "LLM_SCORING_DEADLINE", 60.0))
+
+    def run(index, item):
+        started[index] = time.monotonic()
+        return fn(item)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))), thread_name_prefix="llm-call")
+    # Each call runs in a copy of the caller's context so the trace id follows it onto the pool.
+    futures = {executor.submit(contextvars.copy_context().run, run, i, item): i for i, item in enumerate(items)}
+    pending = set(futures)
+    try:
+        while pending:
+            running = [started[futures[f]] for f in pending if futures[f] in started]
+            next_deadline = min([deadline] + [t + timeout for t in running]) - time.monotonic()
+            done, pending = wait(pending, timeout=max(0.01, next_deadline), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                i = futures[future]
                 try:
-                    parsed = json.loads(result.content)
-                except Exception:
-                    import re
-                    json_match = re.search(r'\{.*\}', result.content, re.S)
-                    if json_match:
-                        parsed = json.loads(json_match.group(0))
-                    else:
-                        parsed = {"confidence": 0.6, "reason": "LLM returned invalid or empty response"}
-
-                conf = float(parsed.get("confidence", 0.6))
-                reason = parsed.get("reason", "No reason provided")
-
-            except Exception as e:
-                logger.exception(f"[ConfidenceScorer] LLM failed: {e}")
-                conf = info["adjusted_score"]
-                reason = "Fallback heuristic (LLM failed)"
-
-        results.append({
-            "employee": emp,
-            "confidence": round(conf, 2),
-            "reason": reason
-        })
+                    results[i] = future.result()
+                except Exception as e:
+                    logger.warning(f"[ConfidenceScorer] Call {i} failed: {e}")
+                    results[i] = fallback(items[i], "Fallback heuristic (LLM failed)")
+
+            now = time.monotonic()
+            for future in list(pending):
+                i = futures[future]
+                if i in started and now - started[i] >= timeout:
+                    logger.warning(f"[ConfidenceScorer] Call {i} timed out after {timeout}s")
+                    pending.discard(future)
+                    future.cancel()
+                    results[i] = fallback(items[i], "Fallback heuristic (LLM timed out)")
+                elif now >= deadline:
+                    pending.discard(future)
+                    future.cancel()
+                    results[i] = fallback(items[i], "Fallback heuristic (LLM timed out)")
+            if pending and now >= deadline:
+                logger.warning(f"[ConfidenceScorer] Deadline passed with {len(pending)} call(s) unfinished")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def confidence_scorer_node(task: Task, candidate_info: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compute a confidence score (0–1) for each candidate using LLM or heuristic fallback.
+    Candidates are scored concurrently (LLM_SCORING_CONCURRENCY) with a per-call
+    timeout (LLM_SCORING_TIMEOUT); failed or slow calls keep the heuristic score.
+    With CONFIDENCE_SCORING_MODE="batch" candidates are ranked a chunk per call instead.
+    """
+    llm = get_llm()
+
+    if not llm:
+        results = [_heuristic_score(info, "Heuristic confidence (no LLM).") for info in candidate_info]
+    elif getattr(settings, "CONFIDENCE_SCORING_MODE", "per_candidate") == "batch":
+        results = _batch_confidence_scores(llm, task, candidate_info)
+    else:
+        results = _bounded_map(
+            lambda info: _score_candidate(llm, task, info),
+            candidate_info,
+            max_workers=getattr(settings, "LLM_SCORING_CONCURRENCY", 8),
+            timeout=getattr(settings, "LLM_SCORING_TIMEOUT", 30.0),
+            fallback=_heuristic_score,
+        )
 
     # Sort candidates by descending confidence
     results.sort(key=lambda x: -x["confidence"])
@@ -152,88 +427,93 @@ def confidence_scorer_node(task: Task, candidate_info: List[Dict[str, Any]]) ->
 
 
 
+def _assignment_email_context(task: Task, emp: Employee, conf: float, reason: str) -> Dict[str, Any]:
+    return {
+        "assignee_name": emp.name,
+        "task_title": task.title,
+        "task_description": task.description,
+        "confidence_score": conf,
+        "assigned_by": "AI Task Engine",
+        "assigned_at": task.created_at.strftime("%Y-%m-%d %H:%M"),
+        "task_url": f"{getattr(settings, 'FRONTEND_URL', '#')}/tasks/{task.id}",
+        "summary_lines": [
+            f"Confidence Score: {conf:.2f}",
+            f"Reason: {reason}"
+        ],
+    }
+
+
+def _notify_assignee(task: Task, emp: Employee, conf: float, reason: str) -> bool:
+    """Queue the assignment email in the outbox (delivered by tasks.flush_notifications); True if queued."""
+    from .notifications import queue_assignment_email
+
+    try:
+        # Keyed on the assignment's version so a retried pipeline step does not email twice.
+        return queue_assignment_email(
+            emp.email, _assignment_email_context(task, emp, conf, reason), task=task,
+            dedupe_key=f"assignment:{task.id}:{emp.id}:{task.version}",
+        )
+    except Exception as e:
+        logger.error(f"Failed to queue email: {e}")
+        return False
+
+
 def decision_node(task: Task, scored: List[Dict[str, Any]], threshold: float = 0.75):
     """Decide if we auto-assign or send for review."""
     if not scored:
         AssignmentLog.objects.create(task=task, reasoning_text="No candidates", confidence=0.0, decision_status="no_candidates")
-        return {"decision": "no_candidates", "reason": "No matching candidates", "email_sent": False}
+        metrics.DECISIONS.inc(decision="no_candidates")
+        return {"decision": "no_candidates", "reason": "No matching candidates", "email_queued": False}
 
     top = scored[0]
     emp, conf, reason = top["employee"], top["confidence"], top["reason"]
 
-    email_sent = False
+    email_queued = False
+    decision = "auto_assign"
 
     if conf >= threshold:
-        task.assigned_to = emp
-        task.status = "assigned"
-        task.confidence_score = conf
-        task.save()
-
-        AssignmentLog.objects.create(
-            task=task,
-            reasoning_text=reason,
-            confidence=conf,
-            decision_status="auto_assigned"
-        )
-        logger.info(f"[Decision] Auto-assigned to {emp.name} (confidence {conf:.2f})")
-
-        from .notifications import send_assignment_email
-
-        context = {
-            "assignee_name": emp.name,
-            "task_title": task.title,
-            "task_description": task.description,
-            "confidence_score": conf,
-            "assigned_by": "AI Task Engine",
-            "assigned_at": task.created_at.strftime("%Y-%m-%d %H:%M"),
-            "task_url": f"{getattr(settings, 'FRONTEND_URL', '#')}/tasks/{task.id}",
-            "summary_lines": [
-                f"Confidence Score: {conf:.2f}",
-                f"Reason: {reason}"
-            ],
-        }
-
-        try:
-            send_assignment_email(emp.email, context)
-            email_sent = True  
-        except Exception as e:
-            logger.error(f"Failed to send email: {e}")
-            email_sent = False
+        chosen = commit_auto_assignment(task, scored, threshold)
+        if chosen:
+            emp, conf, reason = chosen["employee"], chosen["confidence"], chosen["reason"]
+            AssignmentLog.objects.create(
+                task=task,
+                reasoning_text=reason,
+                confidence=conf,
+                decision_status="auto_assigned"
+            )
+            logger.info(f"[Decision] Auto-assigned to {emp.name} (confidence {conf:.2f})")
+            email_queued = _notify_assignee(task, emp, conf, reason)
+        else:
+            decision = "needs_review"
+            AssignmentLog.objects.create(
+                task=task,
+                reasoning_text=f"Not auto-assigned: candidates at capacity or task assigned concurrently. Top pick: {reason}",
+                confidence=conf,
+                decision_status="needs_review"
+            )
 
+    metrics.DECISIONS.inc(decision=decision if conf >= threshold else "below_threshold")
     return {
-        "decision": "auto_assign",
+        "decision": decision,
         "assignee": emp.name,
         "confidence": conf,
         "reason": reason,
-        "email_sent": email_sent  
+        "email_queued": email_queued  
     }
 
 
-@shared_task
-def run_assignment_pipeline(task_id: int, threshold: float = 0.75) -> dict:
-    """
-    End-to-end reasoning pipeline that mimics LangGraph execution flow,
-    with confidence breakdown for frontend display.
-    """
-    message = task_id        
-    task = Task.objects.get(pk=task_id)
-    logger.info(f"🔹 Running AI assignment pipeline for Task ID={task.id}")
+def _no_candidates_result(task: Task) -> dict:
+    return {
+        "task": task.title,
+        "recommended_assignee": None,
+        "confidence_score": 0.0,
+        "reasoning": "No candidates matched.",
+        "confidence_breakdown": [],
+        "email_queued": False  
+    }
 
-    parsed = task_parser_node(task)
-    candidates = role_matching_node(parsed)
-    if not candidates:
-        return {
-            "task": task.title,
-            "recommended_assignee": None,
-            "confidence_score": 0.0,
-            "reasoning": "No candidates matched.",
-            "confidence_breakdown": [],
-            "email_sent": False  
-        }
 
-    candidate_info = workload_analyzer_node(candidates)
-    scored = confidence_scorer_node(task, candidate_info)
-    decision = decision_node(task, scored, threshold)
+def _pipeline_result(task: Task, scored: List[Dict[str, Any]], decision: Dict[str, Any]) -> dict:
     breakdown = [
         {
             "name": s["employee"].name,
@@ -249,11 +529,156 @@ def run_assignment_pipeline(task_id: int, threshold: float = 0.75) -> dict:
         "confidence_score": float(task.confidence_score or 0.0),
         "reasoning": decision.get("reason", "See AssignmentLog."),
         "confidence_breakdown": breakdown,
-        "email_sent": decision.get("email_sent", False)  
+        "email_queued": decision.get("email_queued", False)  
     }
     logger.info("🧠 Confidence Breakdown:")
     for b in breakdown:
         logger.info(f"• {b['name']}: {b['confidence']*100:.1f}% — {b['reason']}")
+    return result
+
+
+@shared_task(bind=True)
+def run_assignment_pipeline(self, task_id: int, threshold: float = 0.75, force_reparse: bool = False) -> dict:
+    """
+    Celery entry point for the assignment pipeline. Tracks the job on the
+    task row (assignment_status / assignment_result) so clients can poll
+    GET /api/tasks/{id}/assignment/ instead of blocking on the result.
+    force_reparse skips the task parser cache.
+
+    Runs checkpointed under the Celery job id, so a retry (up to
+    PIPELINE_MAX_RETRIES) resumes from the last completed graph node.
+    """
+    Task.objects.filter(pk=task_id).update(assignment_status="running", assignment_started_at=timezone.now())
+    invalidate("task")
+    publish(task_id, "started", job_id=self.request.id, attempt=self.request.retries or 0)
+    try:
+        result = _run_pipeline(task_id, threshold, force_reparse, job_id=self.request.id)
+    except Exception as e:
+        max_retries = getattr(settings, "PIPELINE_MAX_RETRIES", 2)
+        if self.request.id and self.request.retries < max_retries:
+            logger.warning(f"Assignment pipeline failed for Task ID={task_id}, retrying: {e}")
+            publish(task_id, "retrying", error=str(e), attempt=self.request.retries + 1)
+            metrics.PIPELINE_RUNS.inc(outcome="retrying")
+            raise self.retry(exc=e, countdown=2 ** self.request.retries, max_retries=max_retries)
+        logger.exception(f"Assignment pipeline failed for Task ID={task_id}: {e}")
+        Task.objects.filter(pk=task_id).update(assignment_status="failed", assignment_result={"error": str(e)})
+        invalidate("task")
+        publish(task_id, "failed", error=str(e))
+        metrics.PIPELINE_RUNS.inc(outcome="failed")
+        raise
+    Task.objects.filter(pk=task_id).update(assignment_status="completed", assignment_result=result)
+    invalidate("task")
+    publish(task_id, "completed", result=result)
+    metrics.PIPELINE_RUNS.inc(outcome="completed")
+    return result
+
+
+def _run_pipeline(task_id: int, threshold: float = 0.75, force_reparse: bool = False, job_id: str | None = None) -> dict:
+    """
+    End-to-end reasoning pipeline as a compiled LangGraph graph (see
+    pipeline_graph), with confidence breakdown for frontend display.
+    """
+    from .pipeline_graph import run_assignment_graph
+
+    task = Task.objects.get(pk=task_id)
+    logger.info(f"🔹 Running AI assignment pipeline for Task ID={task.id}")
+
+    result = run_assignment_graph(task, threshold, force_reparse, job_id=job_id)
 
     logger.info(f"Final Assignment result: {result}")
-    return result
\ No newline at end of file
+    return result
+
+
+@shared_task
+def run_assignment_batch(task_ids: List[int], threshold: float = 0.75) -> dict:
+    """
+    Run the pipeline for one chunk of a bulk submission (POST /api/tasks/bulk/).
+
+    Every task is parsed first, then matched in one pass against a single
+    employee snapshot (batch_role_matching, which honours ROLE_MATCHING_BACKEND
+    and SEMANTIC_MATCHING like role_matching_node); results are written back
+    with bulk_update / bulk_create instead of per-task saves.
+    """
+    Task.objects.filter(pk__in=task_ids).update(assignment_status="running", assignment_started_at=timezone.now())
+    invalidate("task")
+    tasks = list(Task.objects.filter(pk__in=task_ids).order_by("pk"))
+    errors: Dict[int, str] = {}
+
+    parsed_by_task: Dict[int, Dict[str, Any]] = {}
+    for task in tasks:
+        try:
+            parsed_by_task[task.id] = task_parser_node(task)
+        except Exception as e:
+            logger.exception(f"[Batch] Parsing failed for Task ID={task.id}: {e}")
+            errors[task.id] = str(e)
+    try:
+        candidates_by_task = batch_role_matching(parsed_by_task)
+    except Exception as e:
+        logger.exception(f"[Batch] Matching failed for chunk {task_ids}: {e}")
+        errors.update({task_id: str(e) for task_id in parsed_by_task})
+        candidates_by_task = {}
+
+    logs, assigned = [], []
+    for task in tasks:
+        if task.id in errors:
+            continue
+        try:
+            candidates = candidates_by_task[task.id]
+            if not candidates:
+                logs.append(AssignmentLog(task=task, reasoning_text="No candidates", confidence=0.0, decision_status="no_candidates"))
+                task.assignment_status, task.assignment_result = "completed", _no_candidates_result(task)
+                metrics.DECISIONS.inc(decision="no_candidates")
+                continue
+
+            scored = confidence_scorer_node(task, workload_analyzer_node(candidates))
+            task.effort_level = effort_from(parsed_by_task[task.id])
+            top = scored[0]
+            if top["confidence"] >= threshold:
+                chosen = commit_auto_assignment(task, scored, threshold)
+                if chosen:
+                    top = chosen
+                    logs.append(AssignmentLog(task=task, reasoning_text=top["reason"], confidence=top["confidence"], decision_status="auto_assigned"))
+                    assigned.append((task, top))
+                metrics.DECISIONS.inc(decision="auto_assign" if chosen else "needs_review")
+            else:
+                metrics.DECISIONS.inc(decision="below_threshold")
+            decision = {"assignee": top["employee"].name, "reason": top["reason"], "email_queued": False}
+            task.assignment_status, task.assignment_result = "completed", _pipeline_result(task, scored, decision)
+        except Exception as e:
+            logger.exception(f"[Batch] Pipeline failed for Task ID={task.id}: {e}")
+            errors[task.id] = str(e)
+
+    now = timezone.now()
+    for task in tasks:
+        if task.id in errors:
+            task.assignment_status, task.assignment_result = "failed", {"error": errors[task.id]}
+        task.updated_at = now
+
+    # Assignments were committed one by one above (versioned, capacity-checked); only job columns are bulk-written.
+    fields = ["effort_level", "assignment_status", "assignment_result", "updated_at"]
+    with transaction.atomic():
+        Task.objects.bulk_update(tasks, fields, batch_size=500)
+        AssignmentLog.objects.bulk_create(logs, batch_size=500)
+        invalidate("task")
+
+    emailed = []
+    # One transaction: the outbox flush is scheduled once for the whole chunk, not once per email.
+    with transaction.atomic():
+        for task, top in assigned:
+            if _notify_assignee(task, top["employee"], top["confidence"], top["reason"]):
+                task.assignment_result["email_queued"] = True
+                emailed.append(task)
+    if emailed:
+        Task.objects.bulk_update(emailed, ["assignment_result"], batch_size=500)
+
+    logger.info(f"[Batch] Processed {len(tasks)} tasks: {len(assigned)} auto-assigned, {len(errors)} failed")
+    return {"processed": len(tasks), "assigned": len(assigned), "failed": len(errors)}
+
+
+@shared_task
+def finalize_assignment_batch(chunk_results: List[dict], batch_id: str) -> dict:
+    """Chord callback: mark the batch finished once every chunk has run."""
+    AssignmentBatch.objects.filter(pk=batch_id).update(status="completed", completed_at=timezone.now())
+    summary = {key: sum(r.get(key, 0) for r in chunk_results or []) for key in ("processed", "assigned", "failed")}
+    logger.info(f"[Batch] {batch_id} completed: {summary}")
+    return summary
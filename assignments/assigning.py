@@ -0,0 +1,129 @@
+"""
+Contention-safe assignment commits.
+
+Several Celery workers (and managers using manual_assign) can try to assign
+the same task, or load the same employee, at the same time. assign_task()
+commits one assignment in a short transaction:
+
+1. a versioned UPDATE of only the assignment columns (Task.version must still
+   be the one that was read, otherwise StaleTaskError);
+2. F-expression workload charges for the new (and release for the previous)
+   assignee, in employee-id order so concurrent commits cannot deadlock;
+3. optionally a capacity check on the freshly charged employee row, rolling
+   the whole commit back with CapacityExceeded if it would overload them.
+
+Writing before checking means the row locks are taken by the first
+statement, which serializes competing commits on Postgres and SQLite alike.
+commit_auto_assignment() wraps this with retries and falls through to the
+next eligible candidate when the best one is at capacity.
+"""
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Employee, StaleTaskError, Task
+from .response_cache import invalidate
+from .workload import ACTIVE_STATUSES, adjust, snapshot, task_weight
+
+logger = logging.getLogger(__name__)
+
+
+class CapacityExceeded(Exception):
+    """Assigning the task would push the employee past WORKLOAD_ASSIGN_LIMIT."""
+
+
+def _over_capacity(employee_id: int) -> bool:
+    capacity = float(getattr(settings, "WORKLOAD_CAPACITY_POINTS", 8.0)) or 1.0
+    limit = getattr(settings, "WORKLOAD_ASSIGN_LIMIT", 1.0)
+    base, points = Employee.objects.filter(pk=employee_id).values_list("base_workload", "workload_points").get()
+    return base + points / capacity > limit + 1e-9
+
+
+def assign_task(task: Task, employee: Employee, confidence: float, *, require_unassigned: bool = False,
+                enforce_capacity: bool = False) -> Task:
+    """
+    Assign `task` (as read, including its version) to `employee`. Raises
+    StaleTaskError if the task changed since it was read (or, with
+    require_unassigned, got an assignee) and CapacityExceeded when
+    enforce_capacity is set and the employee has no room.
+    """
+    previous = task.assigned_to_id if task.assigned_to_id and task.status in ACTIVE_STATUSES else None
+    recharge = previous != employee.pk
+    weight = task_weight(task.priority, task.effort_level) if recharge else task.workload_weight
+
+    filters = {"pk": task.pk, "version": task.version}
+    if require_unassigned:
+        filters["assigned_to__isnull"] = True
+
+    with transaction.atomic():
+        updated = Task.objects.filter(**filters).update(
+            assigned_to=employee,
+            status="assigned",
+            confidence_score=confidence,
+            effort_level=task.effort_level,
+            workload_weight=weight,
+            version=F("version") + 1,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise StaleTaskError(f"Task {task.pk} changed before it could be assigned")
+        if recharge:
+            charges = [(employee.pk, weight, 1)]
+            if previous:
+                charges.append((previous, -task.workload_weight, -1))
+            for employee_id, points, count in sorted(charges):
+                adjust(employee_id, points, count)
+            if enforce_capacity and _over_capacity(employee.pk):
+                raise CapacityExceeded(f"{employee.name} has no capacity for Task {task.pk}")
+        invalidate("task")
+
+    task.assigned_to = employee
+    task.status = "assigned"
+    task.confidence_score = confidence
+    task.workload_weight = weight
+    task.version += 1
+    snapshot(task)
+    return task
+
+
+def _retry_delay(attempt: int) -> float:
+    return random.uniform(0, 0.05 * 2 ** attempt)
+
+
+def commit_auto_assignment(task: Task, scored: List[Dict[str, Any]], threshold: float) -> Optional[Dict[str, Any]]:
+    """
+    Auto-assign `task` to the best-scored candidate at or above `threshold`
+    that still has capacity. Conflicts are retried (ASSIGNMENT_COMMIT_RETRIES)
+    against a fresh read; a task that was assigned meanwhile is left alone.
+    Returns the chosen scored entry, or None.
+    """
+    eligible = [s for s in scored if s["confidence"] >= threshold]
+    effort = task.effort_level
+    retries = getattr(settings, "ASSIGNMENT_COMMIT_RETRIES", 3)
+
+    for attempt in range(retries + 1):
+        for candidate in eligible:
+            try:
+                assign_task(task, candidate["employee"], candidate["confidence"], require_unassigned=True, enforce_capacity=True)
+                return candidate
+            except CapacityExceeded as e:
+                logger.info(f"[Decision] {e}; trying next candidate")
+            except (StaleTaskError, OperationalError) as e:
+                logger.warning(f"[Decision] Assignment conflict on Task ID={task.pk} (attempt {attempt + 1}): {e}")
+                break
+        else:
+            return None  # every eligible candidate is at capacity
+
+        time.sleep(_retry_delay(attempt))
+        task.refresh_from_db(fields=["assigned_to", "status", "priority", "workload_weight", "version"])
+        task.effort_level = effort
+        if task.assigned_to_id:
+            logger.info(f"[Decision] Task ID={task.pk} was assigned concurrently; keeping that assignment")
+            return None
+    return None
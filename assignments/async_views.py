@@ -0,0 +1,141 @@
+"""
+Async task-creation path for ASGI deployments (ASYNC_VIEWS=true).
+
+Under gunicorn every POST /api/tasks/ holds an OS thread while OpenAI
+classifies the message and, in synchronous mode, while the Celery job runs.
+Served by daphne/uvicorn, create_task awaits both on the event loop instead:
+classification goes through the per-loop AsyncOpenAI client, the ORM is used
+through its async API, and the synchronous response waits on the task's
+progress channel (progress.py), re-reading the row at each heartbeat in case
+an event is missed. One process can hold hundreds of in-flight requests.
+GET /api/tasks/<id>/assignment/?wait= long-polls the same way, for up to
+ASSIGNMENT_LONG_POLL_MAX instead of the WSGI view's short cap.
+
+Other methods on /api/tasks/ are handed to the regular DRF viewset.
+"""
+import asyncio
+import json
+import logging
+import uuid
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+
+from .models import Task
+from .progress import TERMINAL_EVENTS, group_name
+from .queueing import enqueue_assignment, retry_after
+from .serializers import TaskSerializer
+from .utils import aclassify_message_openai
+from .views import TaskViewSet, _accepted_payload, _assignment_payload, _assignment_status, _wants_async
+
+logger = logging.getLogger(__name__)
+
+_task_collection = TaskViewSet.as_view({"get": "list", "post": "create"})
+
+
+def _json(data, status=200, headers=None) -> JsonResponse:
+    return JsonResponse(data, status=status, headers=headers, safe=False, json_dumps_params={"ensure_ascii": False})
+
+
+def _request_data(request):
+    if request.content_type == "application/json":
+        return json.loads(request.body or b"{}")
+    return request.POST.dict()
+
+
+async def _load(task_id: int) -> Task:
+    return await Task.objects.select_related("assigned_to").aget(pk=task_id)
+
+
+async def wait_for_assignment(task_id: int, timeout: float) -> Task:
+    """The task once its assignment job has finished, or as it stands when `timeout` runs out."""
+    layer = get_channel_layer()
+    channel = await layer.new_channel()
+    group = group_name(task_id)
+    # Subscribe before the first read so a job finishing in between still wakes us.
+    await layer.group_add(group, channel)
+    # Without Redis, worker events never reach this process: fall back to polling the row.
+    recheck = settings.PIPELINE_PROGRESS_HEARTBEAT if settings.REDIS_URL else settings.ASSIGNMENT_LONG_POLL_INTERVAL
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        task = await _load(task_id)
+        while task.assignment_status not in TERMINAL_EVENTS and (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(layer.receive(channel), min(recheck, remaining))
+                if message["event"] not in TERMINAL_EVENTS:
+                    continue  # intermediate progress, nothing to re-read
+            except asyncio.TimeoutError:
+                pass
+            task = await _load(task_id)
+        return task
+    finally:
+        await layer.group_discard(group, channel)
+
+
+async def create_task(request):
+    """Async equivalent of TaskViewSet.create (same request and response shapes)."""
+    try:
+        data = _request_data(request)
+    except ValueError:
+        return _json({"detail": "JSON parse error."}, status=400)
+
+    message_content = data.get("title") or data.get("description") or ""
+    classification_result = await aclassify_message_openai(message_content)
+    if not isinstance(classification_result, dict):  # chat reply (DRF Response) for non-task messages
+        return _json(classification_result.data, status=classification_result.status_code)
+
+    wait = await sync_to_async(retry_after)()
+    if wait is not None:
+        return _json({"detail": "Assignment queue is full, retry later.", "retry_after": wait},
+                     status=503, headers={"Retry-After": str(wait)})
+
+    serializer = TaskSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return _json(serializer.errors, status=400)
+    task = await Task.objects.acreate(
+        **serializer.validated_data,
+        assignment_status="pending",
+        assignment_job_id=str(uuid.uuid4()),
+        assignment_enqueued_at=timezone.now(),
+    )
+    logger.info(f"Saved Task ID={task.id}, title={task.title}")
+    await sync_to_async(enqueue_assignment)(task)
+
+    if not _wants_async(request):
+        task = await wait_for_assignment(task.id, settings.ASSIGNMENT_SYNC_TIMEOUT)
+        if task.assignment_status == "completed":
+            return _json(_assignment_payload(task, task.assignment_result or {}), status=201)
+        if task.assignment_status == "failed":
+            return _json({"detail": (task.assignment_result or {}).get("error", "Assignment pipeline failed")}, status=500)
+        logger.warning(f"Task ID={task.id} still {task.assignment_status} after {settings.ASSIGNMENT_SYNC_TIMEOUT}s; answering 202")
+
+    payload = _accepted_payload(request, task)
+    return _json(payload, status=202, headers={"Location": payload["status_url"]})
+
+
+@csrf_exempt
+async def task_collection(request):
+    """/api/tasks/ under ASYNC_VIEWS: async create, everything else through the DRF viewset."""
+    if request.method == "POST":
+        return await create_task(request)
+    return await sync_to_async(_task_collection)(request)
+
+
+async def task_assignment(request, pk):
+    """Async equivalent of TaskViewSet.assignment: the long-poll waits on the event loop."""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    try:
+        wait = min(float(request.GET.get("wait", 0)), settings.ASSIGNMENT_LONG_POLL_MAX)
+    except ValueError:
+        return _json({"detail": "wait must be a number of seconds."}, status=400)
+    try:
+        task = await wait_for_assignment(int(pk), wait) if wait > 0 else await _load(int(pk))
+    except Task.DoesNotExist:
+        return _json({"detail": "No Task matches the given query."}, status=404)
+    return _json(_assignment_status(task))
@@ -0,0 +1,117 @@
+"""
+Small timing helpers shared by the bench_* management commands.
+"""
+import json
+import subprocess
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Sequence
+
+import numpy as np
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+
+def measure(fn: Callable[[], object], repeat: int = 20, warmup: int = 2) -> List[float]:
+    """Wall-clock milliseconds for `repeat` calls of fn, after `warmup` untimed calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def measure_each(fn: Callable[[object], object], items: Iterable[object]) -> List[float]:
+    """Wall-clock milliseconds of fn(item) for every item (one sample per item, no warmup)."""
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+class QueryCounter:
+    """Number of SQL statements executed while active, on this thread and on threads that connect meanwhile."""
+
+    def __init__(self):
+        self.count = 0
+        self.active = False
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.active:
+            with self._lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+    def _install(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+
+@contextmanager
+def count_queries():
+    # Pipeline nodes run on worker threads with their own connections; those are opened lazily,
+    # so wrap every connection created while counting as well as the current one.
+    counter = QueryCounter()
+    counter.active = True
+    connection_created.connect(counter._install, weak=False)
+    connection.execute_wrappers.append(counter)
+    try:
+        yield counter
+    finally:
+        counter.active = False
+        connection_created.disconnect(counter._install)
+        connection.execute_wrappers.remove(counter)
+
+
+def peak_memory_kib(fn: Callable[[object], object], items: Iterable[object]) -> float:
+    """Peak Python heap growth (tracemalloc, all threads) while running fn over items, in KiB."""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for item in items:
+            fn(item)
+        return round((tracemalloc.get_traced_memory()[1] - baseline) / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    values = np.asarray(samples, dtype=float)
+    return {
+        "p50": round(float(np.percentile(values, 50)), 2),
+        "p95": round(float(np.percentile(values, 95)), 2),
+        "max": round(float(values.max()), 2),
+    }
+
+
+def render_table(headers: Sequence[str], rows: Sequence[Sequence[object]]) -> str:
+    cells = [[str(h) for h in headers]] + [[str(c) for c in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    lines = ["  ".join(c.ljust(w) for c, w in zip(row, widths)) for row in cells]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def write_report(path: str, report: dict) -> Path:
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(json.dumps(report, indent=2, sort_keys=True))
+    return target
@@ -0,0 +1,232 @@
+"""
+LangGraph checkpoint saver backed by the Django database.
+
+The assignment graph (pipeline_graph.py) checkpoints after every step, so a
+run that crashes mid-pipeline resumes from the last completed node instead of
+repeating paid LLM calls. Checkpoints are stored whole (graph state is small:
+ids and plain dicts) in PipelineCheckpoint; writes from nodes that finished
+inside an interrupted step go to PipelineCheckpointWrite. Using the ORM means
+the same saver works on SQLite and Postgres with no extra packages.
+
+LangGraph calls the saver from its executor threads, so every method uses the
+ORM synchronously and the async variants defer to a thread.
+
+A completed run deletes its thread; runs that fail for good or are abandoned
+(lost worker, task deleted) would leave theirs forever, so purge_stale()
+(the purge_pipeline_checkpoints beat task) drops threads with no new
+checkpoint for PIPELINE_CHECKPOINT_TTL seconds.
+"""
+import random
+from datetime import timedelta
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from .models import PipelineCheckpoint, PipelineCheckpointWrite
+
+
+def _config(thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]) -> Optional[RunnableConfig]:
+    if not checkpoint_id:
+        return None
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+class DjangoCheckpointSaver(BaseCheckpointSaver[str]):
+    def _typed(self, type_: str, data) -> Any:
+        return self.serde.loads_typed((type_, bytes(data)))
+
+    def _tuple(self, row: PipelineCheckpoint) -> CheckpointTuple:
+        writes = PipelineCheckpointWrite.objects.filter(
+            thread_id=row.thread_id, checkpoint_ns=row.checkpoint_ns, checkpoint_id=row.checkpoint_id
+        ).order_by("pk")
+        return CheckpointTuple(
+            config=_config(row.thread_id, row.checkpoint_ns, row.checkpoint_id),
+            checkpoint=self._typed(row.checkpoint_type, row.checkpoint),
+            metadata=self._typed(row.metadata_type, row.metadata),
+            parent_config=_config(row.thread_id, row.checkpoint_ns, row.parent_checkpoint_id),
+            pending_writes=[(w.task_id, w.channel, self._typed(w.value_type, w.value)) for w in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        rows = PipelineCheckpoint.objects.filter(
+            thread_id=configurable["thread_id"], checkpoint_ns=configurable.get("checkpoint_ns", "")
+        )
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            rows = rows.filter(checkpoint_id=checkpoint_id)
+        # Checkpoint ids are uuid6, so lexical order is creation order.
+        row = rows.order_by("-checkpoint_id").first()
+        return self._tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        rows = PipelineCheckpoint.objects.all()
+        if config:
+            configurable = config["configurable"]
+            rows = rows.filter(thread_id=configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                rows = rows.filter(checkpoint_ns=configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                rows = rows.filter(checkpoint_id=checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            rows = rows.filter(checkpoint_id__lt=before_id)
+
+        for row in rows.order_by("-checkpoint_id").iterator():
+            if limit is not None and limit <= 0:
+                break
+            item = self._tuple(row)
+            if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id, checkpoint_ns = configurable["thread_id"], configurable.get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        # Single-statement upserts: LangGraph calls the saver from several threads at once.
+        PipelineCheckpoint.objects.bulk_create(
+            [PipelineCheckpoint(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=checkpoint["id"],
+                parent_checkpoint_id=configurable.get("checkpoint_id"),
+                checkpoint_type=checkpoint_type,
+                checkpoint=checkpoint_data,
+                metadata_type=metadata_type,
+                metadata=metadata_data,
+            )],
+            update_conflicts=True,
+            unique_fields=["thread_id", "checkpoint_ns", "checkpoint_id"],
+            update_fields=["parent_checkpoint_id", "checkpoint_type", "checkpoint", "metadata_type", "metadata"],
+        )
+        return _config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        key = {
+            "thread_id": configurable["thread_id"],
+            "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+            "checkpoint_id": configurable["checkpoint_id"],
+        }
+        regular, special = [], []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            value_type, value_data = self.serde.dumps_typed(value)
+            row = PipelineCheckpointWrite(
+                **key, task_id=task_id, idx=idx, channel=channel,
+                value_type=value_type, value=value_data, task_path=task_path,
+            )
+            (regular if idx >= 0 else special).append(row)
+        # Regular writes are immutable once stored; special ones (errors, interrupts) are replaced.
+        if regular:
+            PipelineCheckpointWrite.objects.bulk_create(regular, ignore_conflicts=True)
+        if special:
+            PipelineCheckpointWrite.objects.bulk_create(
+                special,
+                update_conflicts=True,
+                unique_fields=["thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"],
+                update_fields=["channel", "value_type", "value", "task_path"],
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with transaction.atomic():
+            PipelineCheckpoint.objects.filter(thread_id=thread_id).delete()
+            PipelineCheckpointWrite.objects.filter(thread_id=thread_id).delete()
+
+    def purge_stale(self, max_age: float, batch_size: int = 500) -> int:
+        """Delete threads whose newest checkpoint is older than max_age seconds. Returns how many."""
+        cutoff = timezone.now() - timedelta(seconds=max_age)
+        stale = list(
+            PipelineCheckpoint.objects.values("thread_id").annotate(last=Max("created_at"))
+            .filter(last__lt=cutoff).values_list("thread_id", flat=True)
+        )
+        for start in range(0, len(stale), batch_size):
+            chunk = stale[start:start + batch_size]
+            with transaction.atomic():
+                PipelineCheckpoint.objects.filter(thread_id__in=chunk).delete()
+                PipelineCheckpointWrite.objects.filter(thread_id__in=chunk).delete()
+        return len(stale)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same scheme as langgraph's InMemorySaver: monotonically increasing, string-sortable.
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await sync_to_async(self.get_tuple, thread_sensitive=False)(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await sync_to_async(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit)), thread_sensitive=False
+        )()
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await sync_to_async(self.put, thread_sensitive=False)(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await sync_to_async(self.put_writes, thread_sensitive=False)(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await sync_to_async(self.delete_thread, thread_sensitive=False)(thread_id)
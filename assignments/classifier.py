@@ -0,0 +1,133 @@
+"""
+Local fast path for message classification.
+
+Before this, every task POST paid a gpt-4o-mini round trip just to decide
+whether the text was a greeting, a help request or a task. classify_locally()
+resolves the obvious cases with the same rule lists handle_chat_message uses
+plus a small keyword scorer for task-like text, and returns None only for
+ambiguous messages. Final classifications are cached by message hash.
+
+Chat keywords match whole words/phrases only ("help" is not in "helper"),
+and a message that also names a tech term or a failure ("Team calendar sync
+broken", "Hi-res image upload fails") is never settled locally as chat:
+it is either clearly a task or left to the LLM.
+"""
+import re
+import threading
+from typing import Optional
+
+import xxhash
+from cachetools import TTLCache
+from django.conf import settings
+
+from .llm_cache import normalize_text
+
+CATEGORIES = ["greeting", "help", "task", "unknown"]
+
+# Rule lists shared with utils.handle_chat_message
+GREETINGS = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening", "greetings", "howdy"]
+HELP_KEYWORDS = ["help", "what can you do", "capabilities", "commands", "how to", "guide"]
+STATUS_KEYWORDS = ["show task", "list task", "task status", "assignments", "what tasks", "recent task"]
+TEAM_KEYWORDS = ["employee", "team", "staff", "who is", "team member", "workers"]
+EXPLAIN_MARKERS = ["how does", "how do", "explain"]
+
+TASK_VERBS = {
+    "add", "analyze", "automate", "build", "clean", "configure", "convert", "create", "debug", "deploy",
+    "design", "develop", "document", "draft", "fix", "implement", "improve", "integrate", "investigate",
+    "migrate", "monitor", "optimize", "prepare", "refactor", "remove", "research", "resolve", "review",
+    "set", "setup", "ship", "test", "update", "upgrade", "write",
+}
+TECH_TERMS = {
+    "api", "apis", "aws", "azure", "backend", "bug", "ci/cd", "component", "dashboard", "database", "django",
+    "docker", "endpoint", "feature", "frontend", "kubernetes", "migration", "model", "page", "pipeline",
+    "postgres", "postgresql", "python", "query", "react", "report", "schema", "server", "service", "ui",
+}
+# Failure words: with any of these a short message is a bug report, not chat.
+BUG_WORDS = {
+    "broken", "bug", "bugs", "crash", "crashed", "crashes", "crashing", "down", "error", "errors", "exception",
+    "fail", "failed", "failing", "fails", "failure", "freeze", "freezes", "hang", "hangs", "leak", "outage",
+    "regression", "slow", "sync", "timeout", "timeouts",
+}
+_HTTP_STATUS_RE = re.compile(r"^[45]\d\d$")
+QUESTION_STARTERS = ("what", "who", "why", "how", "when", "where", "can you", "could you", "is ", "are ", "do ", "does ")
+
+_WORD_RE = re.compile(r"[a-z0-9/+#.-]+")
+
+_cache = TTLCache(
+    maxsize=getattr(settings, "MESSAGE_CLASSIFIER_CACHE_SIZE", 4096),
+    ttl=getattr(settings, "MESSAGE_CLASSIFIER_CACHE_TTL", 3600),
+)
+_cache_lock = threading.Lock()
+
+
+def _has_phrase(msg: str, phrases) -> bool:
+    """Whole-word match of any phrase (an optional plural "s" allowed); hyphens count as part of a word."""
+    return any(re.search(rf"(?<![\w-]){re.escape(p)}s?(?![\w-])", msg) for p in phrases)
+
+
+def _looks_technical(words) -> bool:
+    return any(w in TECH_TERMS or w in BUG_WORDS or _HTTP_STATUS_RE.match(w) for w in words)
+
+
+def _is_greeting(msg: str, words) -> bool:
+    return len(words) <= 4 and any(re.match(rf"{re.escape(g)}(?![\w-])", msg) for g in GREETINGS)
+
+
+def _task_score(msg: str, words) -> int:
+    score = 0
+    if words and words[0] in TASK_VERBS:
+        score += 2
+    score += min(2, sum(1 for w in words[1:] if w in TASK_VERBS))
+    score += min(2, sum(1 for w in words if w in TECH_TERMS))
+    if len(words) >= 4:
+        score += 1
+    if msg.endswith("?") or msg.startswith(QUESTION_STARTERS):
+        score -= 3
+    return score
+
+
+def classify_locally(message: str) -> Optional[str]:
+    """Return a category for clear-cut messages, or None when the LLM should decide."""
+    msg = normalize_text(message)
+    words = _WORD_RE.findall(msg)
+    if not words:
+        return "unknown"
+    # An imperative opening ("Fix the team page", "Document how to deploy") wins over chat keywords.
+    if words[0] in TASK_VERBS and len(words) >= 3 and not msg.endswith("?"):
+        return "task"
+    score = _task_score(msg, words)
+    if _looks_technical(words):
+        # Maybe a task title ("Employee onboarding API returns 500"); never settle it as chat here.
+        return "task" if score >= 4 else None
+
+    if _is_greeting(msg, words):
+        return "greeting"
+    if len(words) <= 8:
+        if _has_phrase(msg, HELP_KEYWORDS + EXPLAIN_MARKERS):
+            return "help"
+        if _has_phrase(msg, STATUS_KEYWORDS + TEAM_KEYWORDS):
+            return "unknown"
+    if score >= 4:
+        return "task"
+    if score < 0 or (score == 0 and len(words) == 1):
+        return "unknown"
+    return None
+
+
+def message_key(message: str) -> str:
+    return xxhash.xxh3_64_hexdigest(normalize_text(message))
+
+
+def get_cached(message: str) -> Optional[str]:
+    with _cache_lock:
+        return _cache.get(message_key(message))
+
+
+def remember(message: str, category: str) -> None:
+    with _cache_lock:
+        _cache[message_key(message)] = category
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,35 @@
+from asgiref.sync import sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .progress import TERMINAL_EVENTS, group_name
+from .views import load_assignment_status
+
+
+class AssignmentProgressConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws/tasks/<id>/progress/ — the WebSocket counterpart of GET
+    /api/tasks/<id>/events/: sends the current status, then every progress
+    event, and closes after completed / failed.
+    """
+
+    async def connect(self):
+        self.task_id = int(self.scope["url_route"]["kwargs"]["task_id"])
+        self.group = group_name(self.task_id)
+        # Subscribe before reading the status so nothing published in between is lost.
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        status = await sync_to_async(load_assignment_status)(self.task_id)
+        if status is None:
+            await self.close(code=4404)
+            return
+        await self.accept()
+        await self.send_json({"event": "status", "data": status})
+        if status["assignment_status"] in TERMINAL_EVENTS:
+            await self.close()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def progress_event(self, message):
+        await self.send_json({"event": message["event"], "data": message["data"]})
+        if message["event"] in TERMINAL_EVENTS:
+            await self.close()
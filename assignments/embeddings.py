@@ -0,0 +1,295 @@
+"""
+Embedding-based semantic matching for role_matching_node.
+
+Employee profiles are embedded once and stored as float32 blobs
+(EmployeeEmbedding). Each process keeps the normalized vectors in a single
+NumPy matrix so a task is ranked with one matrix-vector product plus
+argpartition. Providers are pluggable via EMBEDDING_PROVIDER: "hash" is a
+local feature-hashing embedder (offline, deterministic), "openai" uses the
+OpenAI embeddings API.
+
+Like the skill index, the matrix is patched in place when one employee's
+profile changes (the row is re-embedded on next use) and other processes
+are told to reload through a version counter in Redis.
+"""
+import logging
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import xxhash
+from django.conf import settings
+
+from .models import Employee, EmployeeEmbedding
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "assignments:embeddings:version"
+_WORD_RE = re.compile(r"[a-z0-9+#.]+")
+
+
+class HashingEmbeddingProvider:
+    """Feature-hashed words + character trigrams, so "postgres" and "postgresql" land close together."""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hash-{dim}"
+
+    def _features(self, text: str):
+        for word in _WORD_RE.findall(text.lower()):
+            yield word, 1.0
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                bucket = xxhash.xxh32_intdigest(feature) % self.dim
+                sign = 1.0 if xxhash.xxh32_intdigest(feature, seed=1) & 1 else -1.0
+                out[row, bucket] += sign * weight
+        return out
+
+
+class OpenAIEmbeddingProvider:
+    def __init__(self, model: str = "text-embedding-3-small"):
+        from langchain_openai import OpenAIEmbeddings
+
+        self.name = f"openai-{model}"
+        self._client = OpenAIEmbeddings(model=model, api_key=settings.OPENAI_API_KEY)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self._client.embed_documents(texts), dtype=np.float32)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_embedding_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                kind = getattr(settings, "EMBEDDING_PROVIDER", "hash")
+                if kind == "openai":
+                    _provider = OpenAIEmbeddingProvider(getattr(settings, "EMBEDDING_MODEL", "text-embedding-3-small"))
+                else:
+                    _provider = HashingEmbeddingProvider(getattr(settings, "EMBEDDING_DIM", 512))
+    return _provider
+
+
+def employee_profile_text(emp: Employee) -> str:
+    return f"{emp.role}. Skills: {', '.join(map(str, emp.skills or []))}. {emp.responsibilities or ''}"
+
+
+def task_query_text(parsed: Dict[str, Any]) -> str:
+    terms = list(parsed.get("skills", [])) + list(parsed.get("technical_tags", [])) + list(parsed.get("keywords", []))
+    return " ".join(map(str, terms))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class EmbeddingMatrix:
+    """Per-process matrix of normalized employee vectors, kept in sync through a Redis version key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._version = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._row_of: Dict[int, int] = {}
+        self._stale: Set[int] = set()  # rows to re-embed / reload before the next query
+
+    def invalidate(self) -> None:
+        """Drop the local matrix and tell other processes to reload theirs."""
+        with self._lock:
+            self._built = False
+        self._bump_version()
+
+    def update(self, emp_id: int) -> None:
+        """One employee's profile changed (or it was deleted): refresh just its row on next use."""
+        with self._lock:
+            if self._built:
+                self._stale.add(emp_id)
+        self._bump_version()
+
+    def _bump_version(self) -> None:
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            new_version = int(client.incr(VERSION_KEY))
+        except Exception as e:
+            logger.warning(f"[Embeddings] Could not bump version in Redis: {e}")
+            return
+        with self._lock:
+            # Our own change is already queued; anything else in between means reload.
+            if self._built and self._version is not None and new_version == self._version + 1:
+                self._version = new_version
+            else:
+                self._built = False
+
+    def _remote_version(self):
+        client = get_redis()
+        if client is None:
+            return None
+        try:
+            return int(client.get(VERSION_KEY) or 0)
+        except Exception as e:
+            logger.warning(f"[Embeddings] Could not read version from Redis: {e}")
+            return None
+
+    def _build(self, provider) -> None:
+        version = self._remote_version()
+        refresh_employee_embeddings(provider)
+        rows = list(EmployeeEmbedding.objects.filter(model=provider.name).values_list("employee_id", "vector"))
+        self._ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        if rows:
+            self._matrix = _normalize(np.vstack([np.frombuffer(bytes(r[1]), dtype=np.float32) for r in rows]))
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._row_of = {int(emp_id): i for i, emp_id in enumerate(self._ids)}
+        self._stale = set()
+        self._built = True
+        self._version = version
+        logger.info(f"[Embeddings] Loaded {len(rows)} employee vectors ({provider.name})")
+
+    def _refresh_rows(self, provider) -> None:
+        """Re-embed and reload the stale rows only: replaced in place, appended, or dropped if gone."""
+        ids, self._stale = self._stale, set()
+        refresh_employee_embeddings(provider, employee_ids=ids)
+        vectors = {
+            emp_id: _normalize(np.frombuffer(bytes(vector), dtype=np.float32))
+            for emp_id, vector in EmployeeEmbedding.objects.filter(model=provider.name, employee_id__in=ids)
+            .values_list("employee_id", "vector")
+        }
+        gone = [self._row_of[emp_id] for emp_id in ids if emp_id in self._row_of and emp_id not in vectors]
+        for emp_id, vector in vectors.items():
+            row = self._row_of.get(emp_id)
+            if row is not None:
+                self._matrix[row] = vector
+        added = [emp_id for emp_id in vectors if emp_id not in self._row_of]
+        if added:
+            new_rows = np.vstack([vectors[emp_id] for emp_id in added])
+            self._matrix = np.vstack([self._matrix, new_rows]) if len(self._ids) else new_rows
+            self._ids = np.concatenate([self._ids, np.asarray(added, dtype=np.int64)])
+        if gone:
+            keep = np.ones(len(self._ids), dtype=bool)
+            keep[gone] = False
+            self._ids, self._matrix = self._ids[keep], self._matrix[keep]
+        self._row_of = {int(emp_id): i for i, emp_id in enumerate(self._ids)}
+        logger.info(f"[Embeddings] Refreshed {len(ids)} employee vector(s) in place")
+
+    def _ensure_fresh(self, provider) -> None:
+        remote = self._remote_version()
+        if not self._built or (remote is not None and remote != self._version):
+            self._build(provider)
+        elif self._stale:
+            self._refresh_rows(provider)
+
+    def warm(self) -> None:
+        """Load (or patch) the matrix now so the next query does not pay for it."""
+        provider = get_embedding_provider()
+        with self._lock:
+            self._ensure_fresh(provider)
+
+    def similarities(self, query: np.ndarray, k: int, include_ids=()) -> Dict[int, float]:
+        """Cosine similarity of the top-k employees plus any explicitly requested ids."""
+        provider = get_embedding_provider()
+        with self._lock:
+            self._ensure_fresh(provider)
+            if not len(self._ids):
+                return {}
+            sims = self._matrix @ _normalize(query.astype(np.float32))
+            k = min(k, len(sims))
+            top = np.argpartition(-sims, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+            result = {int(self._ids[i]): float(sims[i]) for i in top}
+            for emp_id in include_ids:
+                row = self._row_of.get(emp_id)
+                if row is not None:
+                    result[emp_id] = float(sims[row])
+        return result
+
+
+embedding_matrix = EmbeddingMatrix()
+
+
+def refresh_employee_embeddings(provider=None, batch_size: int = 256, employee_ids: Optional[Iterable[int]] = None) -> int:
+    """Embed every employee (or just employee_ids) that has no vector for the current provider. Returns how many were added."""
+    provider = provider or get_embedding_provider()
+    stale = Employee.objects.exclude(embedding__model=provider.name).only("id", "role", "skills", "responsibilities")
+    if employee_ids is not None:
+        stale = stale.filter(pk__in=list(employee_ids))
+    created = 0
+    batch: List[Employee] = []
+
+    def flush():
+        nonlocal created
+        vectors = provider.embed([employee_profile_text(emp) for emp in batch])
+        EmployeeEmbedding.objects.bulk_create(
+            [
+                EmployeeEmbedding(employee_id=emp.pk, model=provider.name, vector=vec.astype(np.float32).tobytes())
+                for emp, vec in zip(batch, vectors)
+            ],
+            update_conflicts=True,
+            unique_fields=["employee"],
+            update_fields=["model", "vector"],
+        )
+        created += len(batch)
+        batch.clear()
+
+    for emp in stale.iterator(chunk_size=batch_size):
+        batch.append(emp)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    if created:
+        logger.info(f"[Embeddings] Embedded {created} employee profiles")
+    return created
+
+
+def semantic_rerank(parsed: Dict[str, Any], candidates: List[Tuple[Employee, float]], limit: int,
+                    known: Optional[Dict[int, Employee]] = None) -> List[Tuple[Employee, float]]:
+    """
+    Blend lexical match scores with embedding similarity and pull in
+    semantically close employees the lexical matcher missed.
+    score = lexical + SEMANTIC_MATCHING_WEIGHT * cosine (cosine below SEMANTIC_MIN_SIMILARITY counts as 0).
+    `known` is an employee snapshot shared across calls (a bulk chunk): extras
+    are taken from it and only the missing ones are loaded (and added to it).
+    """
+    text = task_query_text(parsed)
+    if not text.strip():
+        return candidates[:limit]
+
+    weight = getattr(settings, "SEMANTIC_MATCHING_WEIGHT", 2.0)
+    min_sim = getattr(settings, "SEMANTIC_MIN_SIMILARITY", 0.15)
+    query = get_embedding_provider().embed([text])[0]
+    lexical = {emp.pk: (emp, score) for emp, score in candidates}
+    sims = embedding_matrix.similarities(query, limit, include_ids=lexical.keys())
+
+    extra_ids = [emp_id for emp_id, sim in sims.items() if emp_id not in lexical and sim >= min_sim]
+    employees = {emp_id: emp for emp_id, (emp, _) in lexical.items()}
+    known = {} if known is None else known
+    missing = [emp_id for emp_id in extra_ids if emp_id not in known]
+    if missing:
+        known.update(Employee.objects.in_bulk(missing))
+    employees.update({emp_id: known[emp_id] for emp_id in extra_ids if emp_id in known})
+
+    combined = []
+    for emp_id, emp in employees.items():
+        sim = sims.get(emp_id, 0.0)
+        lexical_score = lexical[emp_id][1] if emp_id in lexical else 0
+        combined.append((emp, round(lexical_score + (weight * sim if sim >= min_sim else 0.0), 4)))
+    combined.sort(key=lambda x: (-x[1], x[0].workload_score, x[0].pk))
+    logger.info(f"[Embeddings] Semantic stage added {len(extra_ids)} candidates")
+    return combined[:limit]
@@ -0,0 +1,37 @@
+"""
+Dashboard filters for the task and assignment-log lists.
+
+Each filter maps onto a leading column of one of the composite indexes in
+Task.Meta / AssignmentLog.Meta, so a filtered page is still an index range
+scan ending in the (created_at, id) cursor order. Assignees are filtered by
+raw id rather than a ModelChoiceFilter, which would cost an extra lookup query.
+"""
+from django_filters import rest_framework as filters
+
+from .models import AssignmentLog, Task
+
+
+class TaskFilter(filters.FilterSet):
+    status = filters.MultipleChoiceFilter(choices=Task.STATUS_CHOICES)
+    priority = filters.MultipleChoiceFilter(choices=Task.PRIORITY_CHOICES)
+    assigned_to = filters.NumberFilter(field_name="assigned_to_id")
+    unassigned = filters.BooleanFilter(field_name="assigned_to", lookup_expr="isnull")
+    created_after = filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="lt")
+
+    class Meta:
+        model = Task
+        fields = ["status", "priority", "assigned_to", "unassigned", "assignment_status"]
+
+
+class AssignmentLogFilter(filters.FilterSet):
+    decision_status = filters.MultipleChoiceFilter(
+        choices=[(s, s) for s in ("auto_assigned", "needs_review", "no_candidates", "manager_assigned")]
+    )
+    task = filters.NumberFilter(field_name="task_id")
+    created_after = filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="lt")
+
+    class Meta:
+        model = AssignmentLog
+        fields = ["decision_status", "task"]
@@ -0,0 +1,227 @@
+"""
+Streaming employee import (manage.py import_roles).
+
+HR exports come as a JSON array, NDJSON (one object per line) or CSV and can
+hold tens of thousands of people, so records are read incrementally (the
+JSON array with JSONDecoder.raw_decode over a sliding buffer) and written in
+batches: one SELECT to diff a batch against the stored rows, then one
+bulk_create(update_conflicts=True) of the new and changed rows, all in one
+transaction. Unchanged rows are not written.
+
+bulk_create skips the Employee signals, so upsert_employees() does their work
+once per batch instead of once per row: EmployeeSkill rows are rewritten for
+changed skills, stored embeddings of changed profiles are dropped, and the
+in-memory skill index, embedding matrix and cached employee responses are
+invalidated after commit.
+"""
+import csv
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from django.db import transaction
+
+from .models import Employee, EmployeeEmbedding
+from .response_cache import invalidate
+from .retrieval import sync_employee_skills
+from .workload import score_expression
+
+FORMATS = ("json", "ndjson", "csv")
+FIELDS = ("name", "role", "skills", "responsibilities", "base_workload")
+PROFILE_FIELDS = {"role", "skills", "responsibilities"}
+CHUNK_SIZE = 1 << 16
+
+_SKILL_SEPARATORS = re.compile(r"[;,|]")
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole cannot be read (as opposed to one bad record, which is skipped)."""
+
+
+# -- reading ---------------------------------------------------------------
+
+def detect_format(path: str) -> str:
+    lower = path.lower()
+    if lower.endswith(".csv"):
+        return "csv"
+    if lower.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "json"
+
+
+def read_json_array(fh, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, Any]]:
+    """(item number, value) for each element of a top-level JSON array, reading chunk_size characters at a time."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = fh.read(chunk_size)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    def peek() -> str:
+        """Next non-whitespace character ("" at end of input)."""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                return ""
+            fill()
+
+    if peek() != "[":
+        raise ImportFormatError("Expected a JSON array of employee objects")
+    pos += 1
+    if peek() == "]":
+        return
+    number = 0
+    while True:
+        number += 1
+        peek()
+        while True:
+            try:
+                value, pos = decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError as e:
+                if eof:  # not just cut off at the end of the buffer
+                    raise ImportFormatError(f"Invalid JSON in item {number}: {e.msg}")
+                fill()
+        yield number, value
+        separator = peek()
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ImportFormatError(f"Expected ',' or ']' after item {number}")
+        pos += 1
+
+
+def read_ndjson(fh) -> Iterator[Tuple[int, Any]]:
+    """(line number, value) per non-blank line; unparsable lines yield the JSONDecodeError as the value."""
+    for number, line in enumerate(fh, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, e
+
+
+def read_csv(fh) -> Iterator[Tuple[int, Any]]:
+    """(line number, row dict) using the header row for keys."""
+    reader = csv.DictReader(fh)
+    if not reader.fieldnames or "email" not in [name.strip() for name in reader.fieldnames]:
+        raise ImportFormatError("CSV header must include an 'email' column")
+    for row in reader:
+        yield reader.line_num, {(k or "").strip(): v for k, v in row.items()}
+
+
+READERS = {"json": read_json_array, "ndjson": read_ndjson, "csv": read_csv}
+
+
+def _skills(value: Any) -> List[str]:
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("["):  # JSON list inside a CSV cell
+            return _skills(json.loads(text))
+        return [s.strip() for s in _SKILL_SEPARATORS.split(text) if s.strip()]
+    if isinstance(value, list):
+        return [str(s).strip() for s in value if str(s).strip()]
+    raise ValueError("skills must be a list or a delimited string")
+
+
+def employee_fields(record: Any) -> Dict[str, Any]:
+    """Validated Employee column values for one import record; raises ValueError for a bad record."""
+    if isinstance(record, Exception):
+        raise ValueError(f"invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+    email = str(record.get("email") or "").strip()
+    if not email:
+        raise ValueError("missing email")
+    workload = record.get("workload_score")
+    try:
+        base_workload = float(workload) if workload not in (None, "") else 0.0
+    except (TypeError, ValueError):
+        raise ValueError(f"workload_score {workload!r} is not a number")
+    row = {
+        "email": email,
+        "name": str(record.get("name") or "").strip(),
+        "role": str(record.get("role") or "").strip(),
+        "skills": _skills(record.get("skills")),
+        "responsibilities": str(record.get("responsibilities") or ""),
+        "base_workload": base_workload,
+    }
+    for name, limit in (("email", 254), ("name", 200), ("role", 200)):
+        if len(row[name]) > limit:
+            raise ValueError(f"{name} is longer than {limit} characters")
+    return row
+
+
+# -- writing ---------------------------------------------------------------
+
+@dataclass
+class BatchResult:
+    created: List[Dict[str, Any]] = field(default_factory=list)
+    updated: List[Tuple[Dict[str, Any], Dict[str, Tuple[Any, Any]]]] = field(default_factory=list)  # (row, {field: (old, new)})
+    unchanged: int = 0
+
+
+def upsert_employees(rows: Iterable[Dict[str, Any]], dry_run: bool = False) -> BatchResult:
+    """
+    Create or update one batch of employee_fields() rows, keyed by email (the
+    last row wins for duplicate emails). With dry_run only the diff is computed.
+    """
+    by_email = {row["email"]: row for row in rows}
+    existing = {
+        values["email"]: values
+        for values in Employee.objects.filter(email__in=list(by_email)).values("email", *FIELDS)
+    }
+    result = BatchResult()
+    for email, row in by_email.items():
+        old = existing.get(email)
+        if old is None:
+            result.created.append(row)
+            continue
+        changes = {name: (old[name], row[name]) for name in FIELDS if old[name] != row[name]}
+        if changes:
+            result.updated.append((row, changes))
+        else:
+            result.unchanged += 1
+
+    writes = result.created + [row for row, _ in result.updated]
+    if dry_run or not writes:
+        return result
+
+    emails = [row["email"] for row in writes]
+    new_skills = [row["email"] for row in result.created] + [row["email"] for row, c in result.updated if "skills" in c]
+    stale_profiles = [row["email"] for row, changes in result.updated if PROFILE_FIELDS & set(changes)]
+    with transaction.atomic():
+        Employee.objects.bulk_create(
+            [Employee(workload_score=row["base_workload"], **row) for row in writes],
+            update_conflicts=True,
+            unique_fields=["email"],
+            update_fields=list(FIELDS),
+        )
+        # Imported scores are the baseline; active task points stay on top of them.
+        Employee.objects.filter(email__in=emails).update(workload_score=score_expression())
+        if new_skills:
+            sync_employee_skills(Employee.objects.filter(email__in=new_skills).only("id", "skills"))
+        if stale_profiles:
+            EmployeeEmbedding.objects.filter(employee__email__in=stale_profiles).delete()
+        transaction.on_commit(lambda: _refresh_indexes(embeddings=bool(result.created or stale_profiles)))
+    return result
+
+
+def _refresh_indexes(embeddings: bool) -> None:
+    from .embeddings import embedding_matrix
+    from .skill_index import skill_index
+    skill_index.invalidate()
+    if embeddings:
+        embedding_matrix.invalidate()
+    invalidate("employee")
@@ -0,0 +1,111 @@
+"""
+Two-tier cache for deterministic LLM results (currently task_parser_node).
+
+Keys are content hashes (xxh3-128) of the normalized inputs plus model name
+and prompt version, so re-posted or recurring tasks skip the LLM round trip.
+Tier 1 is an in-process LRU with TTL (cachetools), tier 2 is Redis with the
+same TTL when REDIS_URL is configured. Hit/miss counters are kept per process
+and mirrored into a Redis hash so they can be read across workers.
+"""
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, Optional
+
+import xxhash
+from cachetools import TTLCache
+from django.conf import settings
+
+from .metrics import CACHE_REQUESTS
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WS_RE.sub(" ", (text or "").strip().lower())
+
+
+class LLMResultCache:
+    def __init__(self, namespace: str, maxsize: int, ttl: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "bypassed": 0}
+
+    def key(self, *parts: str) -> str:
+        return xxhash.xxh3_128_hexdigest("\x1f".join(parts))
+
+    def _redis_key(self, key: str) -> str:
+        return f"assignments:llm_cache:{self.namespace}:{key}"
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+        CACHE_REQUESTS.inc(cache=self.namespace, result=stat)
+        client = get_redis()
+        if client is not None:
+            try:
+                client.hincrby(f"assignments:llm_cache_stats:{self.namespace}", stat, 1)
+            except Exception:
+                pass
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._local.get(key)
+        if value is not None:
+            self._count("local_hits")
+            return value
+
+        client = get_redis()
+        if client is not None:
+            try:
+                raw = client.get(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"[LLMCache] Redis read failed: {e}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                with self._lock:
+                    self._local[key] = value
+                self._count("redis_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._local[key] = value
+        client = get_redis()
+        if client is not None:
+            try:
+                client.set(self._redis_key(key), json.dumps(value), ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"[LLMCache] Redis write failed: {e}")
+
+    def record_bypass(self) -> None:
+        self._count("bypassed")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["local_hits"] + stats["redis_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+parser_cache = LLMResultCache(
+    "task_parser",
+    maxsize=getattr(settings, "PARSER_CACHE_MAXSIZE", 1024),
+    ttl=getattr(settings, "PARSER_CACHE_TTL", 86400),
+)
@@ -0,0 +1,148 @@
+"""
+Per-process registry of LLM clients.
+
+Building a ChatOpenAI / OpenAI client creates a fresh HTTP connection pool, so
+every node call used to pay DNS + TCP + TLS setup. Clients are now created
+lazily once per process and share one keep-alive httpx pool (sized by the
+LLM_HTTP_* settings). The registry is keyed by PID, so a Celery prefork child
+or gunicorn worker never reuses sockets inherited from its parent, and
+creation is locked so gunicorn threads share a single instance.
+
+Async clients (ASGI views) hold an httpx.AsyncClient, which is bound to the
+event loop it was created on, so they are cached per running loop instead.
+"""
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()  # factories may request other clients (e.g. the shared pool)
+_registry: Dict[Hashable, Any] = {}
+_owner_pid = os.getpid()
+
+
+def _get_or_create(key: Hashable, factory: Callable[[], Any]) -> Any:
+    global _owner_pid, _registry
+    with _lock:
+        if _owner_pid != os.getpid():
+            # Forked: connections belong to the parent, start a fresh registry.
+            _registry = {}
+            _owner_pid = os.getpid()
+        client = _registry.get(key)
+        if client is None:
+            client = _registry[key] = factory()
+        return client
+
+
+def reset_clients() -> None:
+    """Drop every cached client (tests, or after settings change)."""
+    global _registry
+    with _lock:
+        for client in _registry.values():
+            if isinstance(client, httpx.Client):
+                client.close()
+        _registry = {}
+        _async_clients.clear()
+
+
+def _api_key():
+    return settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        getattr(settings, "LLM_HTTP_TIMEOUT", 60.0),
+        connect=getattr(settings, "LLM_HTTP_CONNECT_TIMEOUT", 5.0),
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Shared keep-alive connection pool for all synchronous LLM traffic in this process."""
+    def build():
+        limits = httpx.Limits(
+            max_connections=getattr(settings, "LLM_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=getattr(settings, "LLM_HTTP_MAX_KEEPALIVE", 10),
+            keepalive_expiry=getattr(settings, "LLM_HTTP_KEEPALIVE_EXPIRY", 30.0),
+        )
+        return httpx.Client(limits=limits, timeout=_timeout())
+
+    return _get_or_create("http", build)
+
+
+def get_chat_model(model: str = "gpt-4o-mini", temperature: float = 0.3):
+    """Cached ChatOpenAI for (model, temperature), or None when no API key is configured."""
+    api_key = _api_key()
+    if not api_key:
+        return None
+
+    def build():
+        from langchain_openai import ChatOpenAI
+
+        logger.info(f"✅ Creating pooled ChatOpenAI client for {model} (key starts with {api_key[:7]}...)")
+        return ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            api_key=api_key,
+            http_client=get_http_client(),
+            timeout=_timeout(),
+            max_retries=getattr(settings, "LLM_MAX_RETRIES", 2),
+        )
+
+    return _get_or_create(("chat", model, temperature, api_key), build)
+
+
+def get_openai_client():
+    """Cached raw OpenAI SDK client sharing the same pool, or None when no API key is configured."""
+    api_key = _api_key()
+    if not api_key:
+        return None
+
+    def build():
+        from openai import OpenAI
+
+        return OpenAI(
+            api_key=api_key,
+            http_client=get_http_client(),
+            timeout=_timeout(),
+            max_retries=getattr(settings, "LLM_MAX_RETRIES", 2),
+        )
+
+    return _get_or_create(("openai", api_key), build)
+
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, Any]]" = weakref.WeakKeyDictionary()
+
+
+def get_async_openai_client():
+    """
+    AsyncOpenAI client for the running event loop (one keep-alive pool per
+    loop, i.e. per ASGI worker), or None when no API key is configured.
+    """
+    api_key = _api_key()
+    if not api_key:
+        return None
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(api_key)
+    if client is None:
+        from openai import AsyncOpenAI
+
+        limits = httpx.Limits(
+            max_connections=getattr(settings, "LLM_ASYNC_MAX_CONNECTIONS", 200),
+            max_keepalive_connections=getattr(settings, "LLM_HTTP_MAX_KEEPALIVE", 10),
+            keepalive_expiry=getattr(settings, "LLM_HTTP_KEEPALIVE_EXPIRY", 30.0),
+        )
+        client = clients[api_key] = AsyncOpenAI(
+            api_key=api_key,
+            http_client=httpx.AsyncClient(limits=limits, timeout=_timeout()),
+            timeout=_timeout(),
+            max_retries=getattr(settings, "LLM_MAX_RETRIES", 2),
+        )
+    return client
@@ -0,0 +1,337 @@
+"""
+Multi-provider LLM routing with hedged requests and failover.
+
+When LLM_PROVIDERS is anything other than just "openai", get_llm() returns an
+LLMRouter instead of a single ChatOpenAI. LLMRouter.invoke(prompt) works like this:
+
+1. Rank the providers. Providers that are cooling down after
+   LLM_ROUTER_FAILURE_THRESHOLD consecutive failures go last. The others go
+   by their recent median latency; a provider with too few samples ranks by
+   its configured position, ahead of measured ones, so it gets measured.
+2. Send the prompt to the first provider.
+3. If it has not answered within the hedge delay, send the same prompt to
+   the next provider as well. The delay is that provider's recent p95,
+   clamped to LLM_HEDGE_MIN_DELAY..LLM_HEDGE_MAX_DELAY, or
+   LLM_HEDGE_DEFAULT_DELAY until there are enough samples. At most
+   LLM_MAX_HEDGES extra requests are made.
+4. An error or a response that is not valid JSON (the pipeline only asks
+   for JSON) fails over to the next provider immediately.
+5. The first valid answer wins. Slower requests still running are left to
+   finish on the router's pool. Their latency and tokens are still
+   recorded, since they are paid for.
+
+Providers are called directly over the shared keep-alive httpx pool
+(llm_clients.get_http_client) with their REST APIs: OpenAI and Mistral chat
+completions and the Anthropic Messages API. Base URLs are settings, so tests
+(and proxies) can point them at local servers. Latency stats are per
+process, like the clients themselves.
+"""
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from . import metrics
+from .llm_clients import _get_or_create, _timeout, get_http_client
+
+logger = logging.getLogger(__name__)
+
+# A provider needs this many timed answers before its p50/p95 are trusted.
+MIN_SAMPLES = 20
+_JSON_BLOCK = re.compile(r"(\{.*\}|\[.*\])", re.S)
+
+
+class ProviderError(Exception):
+    pass
+
+
+class LLMUnavailable(Exception):
+    """Every provider failed (or the router deadline passed) for one prompt."""
+
+
+class LLMResponse:
+    """Minimal chat-model result: .content plus LangChain-style usage_metadata for metrics.usage_from()."""
+
+    def __init__(self, content: str, model_name: str, provider: str, prompt_tokens=None, completion_tokens=None):
+        self.content = content
+        self.model_name = model_name
+        self.provider = provider
+        self.usage_metadata = (
+            {"input_tokens": prompt_tokens or 0, "output_tokens": completion_tokens or 0}
+            if prompt_tokens is not None or completion_tokens is not None else None
+        )
+
+
+# -- providers -------------------------------------------------------------
+
+class Provider(ABC):
+    name = ""
+    default_url = ""
+
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None, temperature: float = 0.3):
+        self.api_key, self.model, self.temperature = api_key, model, temperature
+        self.base_url = (base_url or self.default_url).rstrip("/")
+
+    def _post(self, path: str, payload: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        try:
+            response = get_http_client().post(f"{self.base_url}{path}", json=payload, headers=headers, timeout=_timeout())
+        except Exception as e:
+            raise ProviderError(f"{self.name}: {type(e).__name__}: {e}") from e
+        if response.status_code >= 400:
+            raise ProviderError(f"{self.name}: HTTP {response.status_code}: {response.text[:200]}")
+        try:
+            return response.json()
+        except ValueError as e:
+            raise ProviderError(f"{self.name}: response is not JSON") from e
+
+    @abstractmethod
+    def complete(self, prompt: str) -> LLMResponse:
+        """Send one user prompt; raise ProviderError on any failure."""
+
+
+class OpenAIProvider(Provider):
+    """OpenAI-compatible /chat/completions."""
+    name = "openai"
+    default_url = "https://api.openai.com/v1"
+
+    def complete(self, prompt: str) -> LLMResponse:
+        data = self._post(
+            "/chat/completions",
+            {"model": self.model, "messages": [{"role": "user", "content": prompt}], "temperature": self.temperature},
+            {"Authorization": f"Bearer {self.api_key}"},
+        )
+        try:
+            content = data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError) as e:
+            raise ProviderError(f"{self.name}: unexpected response shape") from e
+        usage = data.get("usage") or {}
+        return LLMResponse(content, self.model, self.name, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+
+class MistralProvider(OpenAIProvider):
+    name = "mistral"
+    default_url = "https://api.mistral.ai/v1"
+
+
+class AnthropicProvider(Provider):
+    """Anthropic Messages API."""
+    name = "anthropic"
+    default_url = "https://api.anthropic.com/v1"
+    api_version = "2023-06-01"
+
+    def complete(self, prompt: str) -> LLMResponse:
+        data = self._post(
+            "/messages",
+            {
+                "model": self.model,
+                "max_tokens": getattr(settings, "ANTHROPIC_MAX_TOKENS", 1024),
+                "temperature": self.temperature,
+                "messages": [{"role": "user", "content": prompt}],
+            },
+            {"x-api-key": self.api_key, "anthropic-version": self.api_version},
+        )
+        try:
+            content = "".join(block.get("text", "") for block in data["content"] if block.get("type") == "text")
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ProviderError(f"{self.name}: unexpected response shape") from e
+        usage = data.get("usage") or {}
+        return LLMResponse(content, self.model, self.name, usage.get("input_tokens"), usage.get("output_tokens"))
+
+
+PROVIDERS = {cls.name: cls for cls in (OpenAIProvider, AnthropicProvider, MistralProvider)}
+
+
+# -- routing ---------------------------------------------------------------
+
+class ProviderStats:
+    """Recent successful latencies and the failure streak of one provider (per process)."""
+
+    def __init__(self, window: int):
+        self._lock = threading.Lock()
+        self.latencies: deque = deque(maxlen=window)
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    def success(self, seconds: float) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+            self.failures = 0
+
+    def failure(self) -> None:
+        threshold = getattr(settings, "LLM_ROUTER_FAILURE_THRESHOLD", 3)
+        with self._lock:
+            self.failures += 1
+            if self.failures >= threshold:
+                self.cooldown_until = time.monotonic() + getattr(settings, "LLM_ROUTER_COOLDOWN", 30.0)
+
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def is_valid_json(text: str) -> bool:
+    """Whether text is (or contains, like the pipeline's own parsing accepts) a JSON object or list."""
+    for candidate in (text, *_JSON_BLOCK.findall(text or "")[:1]):
+        try:
+            if isinstance(json.loads(candidate), (dict, list)):
+                return True
+        except (TypeError, ValueError):
+            continue
+    return False
+
+
+class LLMRouter:
+    def __init__(self, providers: List[Provider], require_json: bool = True):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.require_json = require_json
+        self.stats = {p.name: ProviderStats(getattr(settings, "LLM_ROUTER_WINDOW", 200)) for p in providers}
+        # Hedged requests that lose keep running here until they finish.
+        self._executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "LLM_ROUTER_MAX_WORKERS", 32), thread_name_prefix="llm-router"
+        )
+
+    @property
+    def model_name(self) -> str:
+        """
+        Stable id of the configured provider/model set (parser cache keys, token
+        counting). It does not follow the latency ranking, so keys stay put when
+        another provider takes the lead; the model that actually answered is on
+        each LLMResponse.
+        """
+        return "router:" + ",".join(f"{p.name}/{p.model}" for p in self.providers)
+
+    def ranked(self) -> List[Provider]:
+        def key(item):
+            position, provider = item
+            stats = self.stats[provider.name]
+            p50 = stats.quantile(0.5)
+            return (stats.cooling_down(), p50 is not None, p50 or 0.0, position)
+        return [p for _, p in sorted(enumerate(self.providers), key=key)]
+
+    def hedge_delay(self, provider: Provider) -> float:
+        p95 = self.stats[provider.name].quantile(0.95)
+        if p95 is None:
+            return getattr(settings, "LLM_HEDGE_DEFAULT_DELAY", 2.0)
+        low = getattr(settings, "LLM_HEDGE_MIN_DELAY", 0.25)
+        high = getattr(settings, "LLM_HEDGE_MAX_DELAY", 10.0)
+        return min(high, max(low, p95))
+
+    def _call(self, provider: Provider, prompt: str) -> LLMResponse:
+        start = time.perf_counter()
+        try:
+            response = provider.complete(prompt)
+            if self.require_json and not is_valid_json(response.content):
+                raise ProviderError(f"{provider.name}: answer is not valid JSON")
+        except Exception:
+            self.stats[provider.name].failure()
+            raise
+        self.stats[provider.name].success(time.perf_counter() - start)
+        return response
+
+    def invoke(self, prompt: str) -> LLMResponse:
+        order = self.ranked()
+        max_hedges = getattr(settings, "LLM_MAX_HEDGES", 1)
+        deadline = time.monotonic() + getattr(settings, "LLM_ROUTER_TIMEOUT", 60.0)
+        running: Dict[Any, tuple] = {}  # future -> (provider, reason, started)
+        errors: List[str] = []
+        next_index, hedges = 0, 0
+
+        def launch(reason: str) -> None:
+            nonlocal next_index
+            provider = order[next_index]
+            next_index += 1
+            future = self._executor.submit(contextvars.copy_context().run, self._call, provider, prompt)
+            running[future] = (provider, reason, time.perf_counter())
+
+        launch("primary")
+        hedge_at = time.monotonic() + self.hedge_delay(order[0])
+        while running:
+            can_hedge = next_index < len(order) and hedges < max_hedges
+            wake = min(deadline, hedge_at) if can_hedge else deadline
+            done, _ = wait(list(running), timeout=max(0.0, wake - time.monotonic()), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider, reason, started = running.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    errors.append(str(e))
+                    logger.warning(f"[LLMRouter] {provider.name} ({reason}) failed: {e}")
+                    metrics.LLM_ROUTER_ATTEMPTS.inc(provider=provider.name, reason=reason, outcome="error")
+                    if next_index < len(order):
+                        launch("failover")
+                        hedge_at = time.monotonic() + self.hedge_delay(order[next_index - 1])
+                    continue
+                metrics.LLM_ROUTER_ATTEMPTS.inc(provider=provider.name, reason=reason, outcome="won")
+                for loser in running:
+                    loser.add_done_callback(self._record_loser(*running[loser]))
+                if reason != "primary":
+                    logger.info(f"[LLMRouter] {reason} to {provider.name} answered first "
+                                f"after {time.perf_counter() - started:.2f}s")
+                return response
+
+            now = time.monotonic()
+            if now >= deadline:
+                for future in running:
+                    future.add_done_callback(self._record_loser(*running[future]))
+                raise LLMUnavailable(f"No provider answered within {getattr(settings, 'LLM_ROUTER_TIMEOUT', 60.0)}s")
+            if running and can_hedge and now >= hedge_at:
+                hedges += 1
+                launch("hedge")
+                hedge_at = now + self.hedge_delay(order[next_index - 1])
+
+        raise LLMUnavailable("All LLM providers failed: " + "; ".join(errors))
+
+    @staticmethod
+    def _record_loser(provider: Provider, reason: str, started: float):
+        def record(future):
+            outcome = "error" if future.exception() else "lost"
+            metrics.LLM_ROUTER_ATTEMPTS.inc(provider=provider.name, reason=reason, outcome=outcome)
+            if outcome == "lost":
+                # Answered too late but still billed.
+                metrics.record_llm_call("hedge_lost", provider.model, time.perf_counter() - started,
+                                        *metrics.usage_from(future.result()))
+        return record
+
+
+def configured_providers() -> List[Provider]:
+    """Providers named in LLM_PROVIDERS, in order, skipping those without an API key."""
+    keys = {
+        "openai": settings.OPENAI_API_KEY,
+        "anthropic": settings.ANTHROPIC_API_KEY,
+        "mistral": getattr(settings, "MISTRAL_API_KEY", None),
+    }
+    models = getattr(settings, "LLM_PROVIDER_MODELS", {})
+    urls = getattr(settings, "LLM_PROVIDER_URLS", {})
+    providers = []
+    for name in getattr(settings, "LLM_PROVIDERS", ["openai"]):
+        if name not in PROVIDERS:
+            logger.warning(f"[LLMRouter] Unknown provider {name!r} in LLM_PROVIDERS")
+        elif keys.get(name):
+            providers.append(PROVIDERS[name](keys[name], models.get(name) or "", urls.get(name)))
+    return providers
+
+
+def get_router() -> Optional[LLMRouter]:
+    """Per-process LLMRouter over the configured providers, or None when none has an API key."""
+    providers = configured_providers()
+    if not providers:
+        return None
+    signature = tuple((p.name, p.model, p.base_url, p.api_key) for p in providers)
+    return _get_or_create(("router", signature), lambda: LLMRouter(providers))
@@ -0,0 +1,207 @@
+import json
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from assignments import ai_engine, pipeline_graph
+from assignments.ai_engine import (
+    confidence_scorer_node,
+    decision_node,
+    role_matching_node,
+    run_assignment_pipeline,
+    task_parser_node,
+    workload_analyzer_node,
+)
+from assignments.benchmarking import (
+    count_queries,
+    git_revision,
+    measure_each,
+    peak_memory_kib,
+    render_table,
+    summarize,
+    write_report,
+)
+from assignments.llm_cache import parser_cache
+from assignments.models import Employee, Task
+from assignments.response_cache import invalidate
+from assignments.retrieval import sync_employee_skills
+from assignments.skill_index import skill_index
+from assignments.synthetic import DeterministicLLM, generate_employees, generate_tasks
+
+EMAIL_DOMAIN = "bench.invalid"
+# Sub-millisecond stages swing by more than any sensible tolerance between runs.
+NOISE_FLOOR_MS = 0.5
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the assignment pipeline nodes and the full pipeline on synthetic employee directories "
+            "with a deterministic fake LLM; writes a JSON report for comparison across commits")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default="1000,10000,100000", help="Comma-separated directory sizes")
+        parser.add_argument('--tasks', type=int, default=200, help="Timed tasks per stage and size")
+        parser.add_argument('--profile-tasks', type=int, default=5, help="Extra tasks run under tracemalloc for peak memory")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--llm-latency', type=float, default=0.0, help="Simulated LLM round trip in ms")
+        parser.add_argument('--scoring-mode', choices=["per_candidate", "batch"], default=None)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--output', help="Report path (default benchmarks/pipeline-<revision>.json)")
+        parser.add_argument('--compare', help="Earlier report to compare p50 latencies against")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Relative p50 slowdown reported as a regression")
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--keep', action='store_true', help="Keep the synthetic rows instead of deleting them")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in options['sizes'].split(",") if s.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers")
+        if Employee.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").exists():
+            raise CommandError(f"Synthetic employees (@{EMAIL_DOMAIN}) already exist; delete them or drop --keep rows first")
+
+        revision = git_revision()
+        mode = options['scoring_mode'] or getattr(settings, "CONFIDENCE_SCORING_MODE", "per_candidate")
+        llm = DeterministicLLM(latency=options['llm_latency'] / 1000)
+        report = {
+            "revision": revision,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": connection.vendor,
+            "config": {
+                "tasks": options['tasks'],
+                "seed": options['seed'],
+                "llm_latency_ms": options['llm_latency'],
+                "scoring_mode": mode,
+                "role_matching_backend": getattr(settings, "ROLE_MATCHING_BACKEND", "auto"),
+                "role_matching_top_k": getattr(settings, "ROLE_MATCHING_TOP_K", 25),
+                "llm_scoring_concurrency": getattr(settings, "LLM_SCORING_CONCURRENCY", 8),
+            },
+            "results": [],
+        }
+
+        # Notifications are disabled so the run measures the pipeline, not the outbox.
+        with mock.patch.object(ai_engine, "get_llm", return_value=llm), \
+                mock.patch.object(pipeline_graph, "get_llm", return_value=llm), \
+                override_settings(CONFIDENCE_SCORING_MODE=mode, ENABLE_EMAIL_NOTIFICATIONS=False):
+            for size in sizes:
+                report["results"] += self._run_size(size, options)
+
+        path = write_report(options['output'] or f"benchmarks/pipeline-{revision}.json", report)
+        self.stdout.write(render_table(
+            ["employees", "stage", "calls", "per s", "p50 ms", "p95 ms", "max ms", "queries/call", "peak KiB"],
+            [[r["employees"], r["stage"], r["calls"], r["throughput_per_s"], r["p50_ms"], r["p95_ms"], r["max_ms"],
+              r["queries_per_call"], r["peak_kib"]] for r in report["results"]],
+        ))
+        self.stdout.write(self.style.SUCCESS(f"Report written to {path}"))
+
+        if options['compare']:
+            regressions = self._compare(report, options['compare'], options['tolerance'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"{regressions} stage(s) regressed by more than {options['tolerance']:.0%}")
+
+    # -- data ----------------------------------------------------------------
+
+    def _seed(self, size, options):
+        batch = []
+        for emp in generate_employees(size, seed=options['seed'], email_domain=EMAIL_DOMAIN):
+            batch.append(emp)
+            if len(batch) == options['batch_size']:
+                self._save_employees(batch)
+                batch = []
+        self._save_employees(batch)
+        skill_index.invalidate()
+        invalidate("employee")
+
+    def _save_employees(self, batch):
+        if not batch:
+            return
+        # bulk_create skips the post_save signal that writes EmployeeSkill rows.
+        with transaction.atomic():
+            sync_employee_skills(Employee.objects.bulk_create(batch))
+
+    def _tasks(self, count, seed):
+        return Task.objects.bulk_create(list(generate_tasks(count, seed=seed)))
+
+    def _cleanup(self, task_ids):
+        for start in range(0, len(task_ids), 1000):
+            Task.objects.filter(pk__in=task_ids[start:start + 1000]).delete()
+        Employee.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
+        skill_index.invalidate()
+
+    # -- measurement ---------------------------------------------------------
+
+    def _run_size(self, size, options):
+        timed, extra = options['tasks'], options['profile_tasks']
+        self.stdout.write(f"Seeding {size} employees...")
+        self._seed(size, options)
+        corpus = self._tasks(timed + extra, options['seed'])
+        pipeline_corpus = self._tasks(timed + extra, options['seed'] + size)
+        rows = []
+
+        def stage(name, fn, inputs):
+            """Time fn on the first `timed` inputs, trace memory on the rest; returns every output in order."""
+            outputs = []
+
+            def call(item):
+                outputs.append(fn(item))
+
+            with count_queries() as queries:
+                samples = measure_each(call, inputs[:timed])
+            peak = peak_memory_kib(call, inputs[timed:]) if extra else None
+            stats = summarize(samples)
+            rows.append({
+                "employees": size,
+                "stage": name,
+                "calls": len(samples),
+                "throughput_per_s": round(len(samples) / (sum(samples) / 1000), 1) if sum(samples) else None,
+                "p50_ms": stats["p50"],
+                "p95_ms": stats["p95"],
+                "max_ms": stats["max"],
+                "queries_per_call": round(queries.count / len(samples), 2),
+                "peak_kib": peak,
+            })
+            self.stdout.write(f"  {name}: p50 {stats['p50']} ms")
+            return outputs
+
+        try:
+            parsed = [task_parser_node(task, bypass_cache=True) for task in corpus]
+            role_matching_node(parsed[0])  # builds the in-memory index when that backend is used
+
+            # Each node's outputs feed the next, as in the graph.
+            candidates = stage("role_matching_node", role_matching_node, parsed)
+            infos = stage("workload_analyzer_node", workload_analyzer_node, candidates)
+            scored = stage("confidence_scorer_node", lambda pair: confidence_scorer_node(*pair), list(zip(corpus, infos)))
+            stage("decision_node", lambda pair: decision_node(*pair), list(zip(corpus, scored)))
+
+            parser_cache.clear()
+            stage("run_assignment_pipeline", lambda task: run_assignment_pipeline(task.id), pipeline_corpus)
+        finally:
+            if not options['keep']:
+                self._cleanup([t.pk for t in corpus + pipeline_corpus])
+        return rows
+
+    def _compare(self, report, baseline_path, tolerance):
+        try:
+            with open(baseline_path) as fh:
+                baseline = json.load(fh)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {baseline_path}: {e}")
+        before = {(r["employees"], r["stage"]): r for r in baseline.get("results", [])}
+        rows, regressions = [], 0
+        for r in report["results"]:
+            old = before.get((r["employees"], r["stage"]))
+            if not old or not old["p50_ms"]:
+                continue
+            change = (r["p50_ms"] - old["p50_ms"]) / old["p50_ms"]
+            flag = "REGRESSION" if change > tolerance and r["p50_ms"] - old["p50_ms"] > NOISE_FLOOR_MS else ""
+            regressions += bool(flag)
+            rows.append([r["employees"], r["stage"], old["p50_ms"], r["p50_ms"], f"{change:+.0%}",
+                         old["queries_per_call"], r["queries_per_call"], flag])
+        self.stdout.write(f"\nCompared with {baseline.get('revision', baseline_path)}:")
+        self.stdout.write(render_table(
+            ["employees", "stage", "p50 before", "p50 now", "change", "queries before", "queries now", ""], rows
+        ))
+        return regressions
@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import QueryDict
+from rest_framework.pagination import Cursor, LimitOffsetPagination
+from rest_framework.test import APIRequestFactory
+
+from assignments.benchmarking import measure, render_table, summarize
+from assignments.filters import TaskFilter
+from assignments.models import Employee, Task
+from assignments.pagination import CreatedAtCursorPagination
+from assignments.views import TaskViewSet
+
+STATUSES = ["open", "assigned", "in_progress", "review", "done"]
+PRIORITIES = ["low", "medium", "medium", "high"]
+DEPTHS = [0.0, 0.01, 0.5, 0.99]
+
+
+class Command(BaseCommand):
+    help = ("Benchmark GET /api/tasks/ page latency at increasing depth, cursor vs offset pagination, "
+            "on synthetic tasks (rolled back unless --keep)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1_000_000)
+        parser.add_argument('--employees', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--keep', action='store_true', help="Commit the synthetic rows instead of rolling back")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            employees = self._seed(options)
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            rows = self._run(employees, options)
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        self.stdout.write(render_table(
+            ["filter", "matched", "depth", "cursor p50", "cursor p95", "offset p50", "offset p95"], rows
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Page latency (ms) for {options['tasks']} synthetic tasks, page size {options['page_size']}."
+        ))
+
+    def _seed(self, options):
+        employees = Employee.objects.bulk_create([
+            Employee(name=f"Bench Employee {i}", email=f"bench-{i}@example.invalid", role="Engineer")
+            for i in range(options['employees'])
+        ])
+        total, size = options['tasks'], options['batch_size']
+        for start in range(0, total, size):
+            Task.objects.bulk_create([
+                Task(
+                    title=f"Synthetic task {i}",
+                    description="Benchmark row",
+                    status=STATUSES[i % len(STATUSES)],
+                    priority=PRIORITIES[i % len(PRIORITIES)],
+                    assigned_to=employees[i % len(employees)] if i % len(STATUSES) else None,
+                )
+                for i in range(start, min(start + size, total))
+            ])
+            self.stdout.write(f"Seeded {min(start + size, total)}/{total} tasks", ending="\r")
+        self.stdout.write("")
+        return employees
+
+    def _run(self, employees, options):
+        factory = APIRequestFactory()
+        cursor_view = TaskViewSet.as_view({"get": "list"})
+        offset_view = TaskViewSet.as_view({"get": "list"}, pagination_class=LimitOffsetPagination)
+        page_size, repeat = options['page_size'], options['repeat']
+        scenarios = [
+            ("all", {}),
+            ("status=assigned", {"status": "assigned"}),
+            ("priority=high", {"priority": "high"}),
+            ("assigned_to+status", {"assigned_to": employees[1].pk, "status": "assigned"}),
+        ]
+
+        def request(view, url):
+            return lambda: view(factory.get(url)).render()
+
+        rows = []
+        for label, params in scenarios:
+            query = "&".join(f"{k}={v}" for k, v in params.items())
+            queryset = TaskFilter(QueryDict(query), queryset=Task.objects.order_by("-created_at", "-id")).qs
+            matched = queryset.count()
+            for depth in DEPTHS:
+                offset = max(0, int(depth * (matched - page_size)))
+                position = queryset.values_list("created_at", flat=True)[offset] if matched else None
+
+                # The cursor a client would hold after paging down to `offset`.
+                paginator = CreatedAtCursorPagination()
+                paginator.base_url = f"/api/tasks/?{query}&page_size={page_size}"
+                cursor_url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=position and str(position)))
+                offset_url = f"/api/tasks/?{query}&limit={page_size}&offset={offset}"
+
+                cursor_ms = summarize(measure(request(cursor_view, cursor_url), repeat))
+                offset_ms = summarize(measure(request(offset_view, offset_url), repeat))
+                rows.append([label, matched, offset,
+                             cursor_ms["p50"], cursor_ms["p95"], offset_ms["p50"], offset_ms["p95"]])
+        return rows
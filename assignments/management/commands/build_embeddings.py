@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from assignments.embeddings import embedding_matrix, get_embedding_provider, refresh_employee_embeddings
+
+
+class Command(BaseCommand):
+    help = "Precompute employee profile embeddings for semantic matching"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=256)
+
+    def handle(self, *args, **options):
+        provider = get_embedding_provider()
+        created = refresh_employee_embeddings(provider, batch_size=options['batch_size'])
+        embedding_matrix.invalidate()
+        self.stdout.write(self.style.SUCCESS(f"Embedded {created} employee profiles with {provider.name}."))
@@ -1,23 +1,88 @@
-from django.core.management.base import BaseCommand
-from assignments.models import Employee
-import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assignments.importing import FORMATS, READERS, ImportFormatError, detect_format, employee_fields, upsert_employees
+
+# Skipped records beyond this are counted but not listed.
+MAX_REPORTED_ERRORS = 20
+
 
 class Command(BaseCommand):
-    help = "Import roles & responsibilities JSON into Employee model"
+    help = ("Import roles & responsibilities into the Employee model from a JSON array, NDJSON or CSV file, "
+            "streaming it in batches (create or update by email)")
 
     def add_arguments(self, parser):
-        parser.add_argument('jsonfile', type=str)
+        parser.add_argument('jsonfile', type=str, help="Path to the export (.json, .ndjson/.jsonl or .csv)")
+        parser.add_argument('--format', choices=FORMATS, help="Input format (default: from the file extension)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Show what would be created/updated without writing")
 
     def handle(self, *args, **options):
-        path = options['jsonfile']
-        with open(path, 'r') as f:
-            data = json.load(f)
-        for item in data:
-            Employee.objects.update_or_create(email=item['email'], defaults={
-                'name': item.get('name'),
-                'role': item.get('role'),
-                'skills': item.get('skills', []),
-                'responsibilities': item.get('responsibilities', ''),
-                'workload_score': item.get('workload_score', 0.0)
-            })
-        self.stdout.write(self.style.SUCCESS("Imported roles successfully."))
+        path, dry_run = options['jsonfile'], options['dry_run']
+        fmt = options['format'] or detect_format(path)
+        batch_size = max(1, options['batch_size'])
+        self.verbosity = options['verbosity']
+        self.totals = {"rows": 0, "created": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+        self.started = time.monotonic()
+
+        batch = []
+        try:
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                for position, record in READERS[fmt](f):
+                    self.totals["rows"] += 1
+                    try:
+                        batch.append(employee_fields(record))
+                    except ValueError as e:
+                        self._skip(fmt, position, e)
+                        continue
+                    if len(batch) >= batch_size:
+                        self._apply(batch, dry_run)
+                        batch = []
+                self._apply(batch, dry_run)
+        except OSError as e:
+            raise CommandError(f"Could not read {path}: {e}")
+        except ImportFormatError as e:
+            done = "nothing was written" if dry_run or not self.totals["created"] + self.totals["updated"] else "earlier batches were kept"
+            raise CommandError(f"{path}: {e} ({done})")
+
+        t = self.totals
+        summary = f"{t['created']} created, {t['updated']} updated, {t['unchanged']} unchanged, {t['skipped']} skipped"
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Dry run, nothing written: {summary}."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {t['rows']} records: {summary}."))
+
+    def _apply(self, batch, dry_run):
+        if not batch:
+            return
+        result = upsert_employees(batch, dry_run=dry_run)
+        self.totals["created"] += len(result.created)
+        self.totals["updated"] += len(result.updated)
+        self.totals["unchanged"] += result.unchanged
+        if dry_run:
+            for row in result.created:
+                self.stdout.write(f"+ {row['email']}: {row['name']} ({row['role']})")
+            for row, changes in result.updated:
+                diff = "; ".join(f"{name} {_short(old)} -> {_short(new)}" for name, (old, new) in changes.items())
+                self.stdout.write(f"~ {row['email']}: {diff}")
+        if self.verbosity >= 1:
+            t = self.totals
+            rate = t["rows"] / max(time.monotonic() - self.started, 1e-6)
+            self.stderr.write(
+                f"{t['rows']} records read: {t['created']} created, {t['updated']} updated, "
+                f"{t['unchanged']} unchanged, {t['skipped']} skipped ({rate:.0f} records/s)"
+            )
+
+    def _skip(self, fmt, position, error):
+        self.totals["skipped"] += 1
+        if self.totals["skipped"] <= MAX_REPORTED_ERRORS:
+            where = f"item {position}" if fmt == "json" else f"line {position}"
+            self.stderr.write(self.style.WARNING(f"Skipped {where}: {error}"))
+        elif self.totals["skipped"] == MAX_REPORTED_ERRORS + 1:
+            self.stderr.write(self.style.WARNING("Further skipped records are only counted"))
+
+
+def _short(value, limit=60):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
@@ -0,0 +1,263 @@
+"""
+Pipeline, LLM and cache metrics in the Prometheus text format (GET /metrics).
+
+Every process (gunicorn/daphne workers, Celery workers) accumulates counter
+and histogram increments locally and adds them to one Redis hash with
+HINCRBYFLOAT at most every METRICS_FLUSH_INTERVAL seconds (and after every
+Celery task), so /metrics served by any web process shows totals across the
+whole deployment. Without REDIS_URL the endpoint shows this process only.
+
+Hash fields are the rendered series ('name_bucket{node="parse",le="0.5"}'),
+so exposition is a single HGETALL. Histogram buckets are stored cumulative,
+as Prometheus expects. Recording never raises: a Redis outage only delays
+the flush (increments are kept and retried).
+"""
+import atexit
+import logging
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = "assignments:metrics"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+class _Metric:
+    def __init__(self, name: str, kind: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = ()):
+        self.name, self.kind, self.help, self.labelnames, self.buckets = name, kind, help, labelnames, buckets
+        REGISTRY[name] = self
+
+    def _labels(self, labels: Dict[str, object], extra: str = "") -> str:
+        parts = [f'{k}="{_escape(labels.get(k, ""))}"' for k in self.labelnames]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter(_Metric):
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, "counter", help, tuple(labelnames))
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        _add({f"{self.name}{self._labels(labels)}": amount})
+
+
+class Histogram(_Metric):
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, "histogram", help, tuple(labelnames), tuple(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        deltas = {}
+        for le in [_le(b) for b in self.buckets if value <= b] + ["+Inf"]:
+            bucket = self._labels(labels, f'le="{le}"')
+            deltas[f"{self.name}_bucket{bucket}"] = 1
+        deltas[f"{self.name}_sum{self._labels(labels)}"] = value
+        deltas[f"{self.name}_count{self._labels(labels)}"] = 1
+        _add(deltas)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+REGISTRY: Dict[str, _Metric] = {}
+
+PIPELINE_NODE_SECONDS = Histogram("assignments_pipeline_node_seconds", "Assignment graph node latency.", ["node"])
+PIPELINE_RUNS = Counter("assignments_pipeline_runs_total", "Assignment pipeline runs by outcome.", ["outcome"])
+PIPELINE_CANDIDATES = Histogram("assignments_pipeline_candidates", "Candidates returned by role matching.", buckets=SIZE_BUCKETS)
+DECISIONS = Counter("assignments_decisions_total", "Assignment decisions by outcome.", ["decision"])
+QUEUE_WAIT_SECONDS = Histogram("assignments_queue_wait_seconds", "Time Celery jobs waited in the broker before starting.", ["task"])
+LLM_REQUEST_SECONDS = Histogram("assignments_llm_request_seconds", "LLM call latency.", ["purpose", "model"])
+LLM_REQUESTS = Counter("assignments_llm_requests_total", "LLM calls by outcome.", ["purpose", "model", "outcome"])
+LLM_ROUTER_ATTEMPTS = Counter("assignments_llm_router_attempts_total", "Provider requests made by the LLM router.", ["provider", "reason", "outcome"])
+LLM_TOKENS = Counter("assignments_llm_tokens_total", "LLM tokens used.", ["purpose", "model", "kind"])
+PROMPT_TOKENS = Histogram("assignments_llm_prompt_tokens", "Prompt size sent, counted locally (tiktoken).", ["purpose"], buckets=TOKEN_BUCKETS)
+PROMPT_COMPACTIONS = Counter("assignments_prompt_compactions_total", "Prompt fields shortened to fit a token budget.", ["field"])
+LLM_COST = Counter("assignments_llm_cost_usd_total", "Estimated LLM spend (LLM_PRICING) in USD.", ["purpose", "model"])
+CACHE_REQUESTS = Counter("assignments_cache_requests_total", "Cache lookups by cache and result.", ["cache", "result"])
+CLASSIFICATIONS = Counter("assignments_message_classifications_total", "Chat message classifications.", ["category", "source"])
+
+
+# -- recording ---------------------------------------------------------------
+
+_lock = threading.Lock()
+_pending: Dict[str, float] = {}  # not yet written to Redis
+_local: Dict[str, float] = {}  # this process's totals, served without Redis
+_last_flush = time.monotonic()
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _le(bound: float) -> str:
+    return str(float(bound)) if not float(bound).is_integer() else f"{bound:.1f}"
+
+
+def _add(deltas: Dict[str, float]) -> None:
+    if not getattr(settings, "METRICS_ENABLED", True):
+        return
+    with _lock:
+        for field, value in deltas.items():
+            _pending[field] = _pending.get(field, 0) + value
+            _local[field] = _local.get(field, 0) + value
+    maybe_flush()
+
+
+def flush() -> None:
+    """Add this process's pending increments to the shared Redis hash."""
+    global _last_flush
+    client = get_redis()
+    with _lock:
+        _last_flush = time.monotonic()
+        if client is None or not _pending:
+            return
+        batch = dict(_pending)
+        _pending.clear()
+    try:
+        pipe = client.pipeline(transaction=False)
+        for field, value in batch.items():
+            pipe.hincrbyfloat(REDIS_KEY, field, value)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"[Metrics] Flush failed, will retry: {e}")
+        with _lock:
+            for field, value in batch.items():
+                _pending[field] = _pending.get(field, 0) + value
+
+
+def maybe_flush() -> None:
+    if time.monotonic() - _last_flush >= getattr(settings, "METRICS_FLUSH_INTERVAL", 5):
+        flush()
+
+
+atexit.register(flush)
+
+
+def timed_node(node: str):
+    """Decorator recording a graph node's latency in PIPELINE_NODE_SECONDS."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with PIPELINE_NODE_SECONDS.time(node=node):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_call(purpose: str, model: str, seconds: float, prompt_tokens: Optional[int] = None,
+                    completion_tokens: Optional[int] = None, ok: bool = True) -> None:
+    model = model or "unknown"
+    LLM_REQUEST_SECONDS.observe(seconds, purpose=purpose, model=model)
+    LLM_REQUESTS.inc(purpose=purpose, model=model, outcome="ok" if ok else "error")
+    if prompt_tokens is None and completion_tokens is None:
+        return
+    prompt_tokens, completion_tokens = prompt_tokens or 0, completion_tokens or 0
+    LLM_TOKENS.inc(prompt_tokens, purpose=purpose, model=model, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, purpose=purpose, model=model, kind="completion")
+    price = getattr(settings, "LLM_PRICING", {}).get(model)
+    if price:
+        LLM_COST.inc((prompt_tokens * price["prompt"] + completion_tokens * price["completion"]) / 1_000_000,
+                     purpose=purpose, model=model)
+
+
+def usage_from(result) -> Tuple[Optional[int], Optional[int]]:
+    """(prompt, completion) tokens of a LangChain message or an OpenAI SDK response; (None, None) if unreported."""
+    usage = getattr(result, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens"), usage.get("output_tokens")
+    usage = getattr(result, "usage", None)
+    if usage is not None:
+        return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+    return None, None
+
+
+# -- exposition --------------------------------------------------------------
+
+_FIELD_RE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?P<labels>\{.*\})?$')
+_LE_RE = re.compile(r',?le="([^"]*)"')
+
+
+def _family(series: str) -> str:
+    if series in REGISTRY:
+        return series
+    for suffix in ("_bucket", "_sum", "_count"):
+        if series.endswith(suffix) and series[: -len(suffix)] in REGISTRY:
+            return series[: -len(suffix)]
+    return series
+
+
+def _sort_key(field: str):
+    match = _FIELD_RE.match(field)
+    name, labels = (match.group("name"), match.group("labels") or "") if match else (field, "")
+    le = _LE_RE.search(labels)
+    bound = math.inf if not le or le.group(1) == "+Inf" else float(le.group(1))
+    suffix_order = {"_bucket": 0, "_sum": 1, "_count": 2}
+    suffix = next((s for s in suffix_order if name.endswith(s)), "")
+    return _LE_RE.sub("", labels), suffix_order.get(suffix, 0), bound
+
+
+def snapshot() -> Dict[str, float]:
+    """Totals across processes (from Redis), or this process's totals without Redis."""
+    client = get_redis()
+    if client is not None:
+        flush()
+        try:
+            raw = client.hgetall(REDIS_KEY)
+            return {k.decode(): float(v) for k, v in raw.items()}
+        except Exception as e:
+            logger.warning(f"[Metrics] Could not read shared metrics, serving this process only: {e}")
+    with _lock:
+        return dict(_local)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render(values: Dict[str, float]) -> str:
+    by_family: Dict[str, list] = {}
+    for field, value in values.items():
+        match = _FIELD_RE.match(field)
+        if match:
+            by_family.setdefault(_family(match.group("name")), []).append((field, value))
+
+    lines = []
+    for name in sorted(set(REGISTRY) | set(by_family)):
+        metric = REGISTRY.get(name)
+        if metric:
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+        for field, value in sorted(by_family.get(name, []), key=lambda item: _sort_key(item[0])):
+            lines.append(f"{field} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Forget recorded values (tests); clears the shared hash too when Redis is configured."""
+    with _lock:
+        _pending.clear()
+        _local.clear()
+    client = get_redis()
+    if client is not None:
+        try:
+            client.delete(REDIS_KEY)
+        except Exception:
+            pass
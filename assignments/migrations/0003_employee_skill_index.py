@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SEARCH_INDEX = "assignments_employee_search_idx"
+
+
+def backfill_employee_skills(apps, schema_editor):
+    Employee = apps.get_model("assignments", "Employee")
+    EmployeeSkill = apps.get_model("assignments", "EmployeeSkill")
+    rows = []
+    for emp in Employee.objects.only("id", "skills").iterator():
+        names = {str(s).strip().lower() for s in emp.skills or [] if str(s).strip()}
+        rows.extend(EmployeeSkill(employee_id=emp.id, name=name[:200]) for name in names)
+    EmployeeSkill.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+def create_search_index(apps, schema_editor):
+    # Full-text GIN index over role + responsibilities; PostgreSQL only.
+    # The expression mirrors SearchVector("role", "responsibilities", config="english").
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON assignments_employee USING gin "
+        "(to_tsvector('english'::regconfig, COALESCE(role, '') || ' ' || COALESCE(responsibilities, '')))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {SEARCH_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0002_task_assignment_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=200)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_entries', to='assignments.employee')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('employee', 'name'), name='unique_employee_skill')],
+            },
+        ),
+        migrations.RunPython(backfill_employee_skills, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
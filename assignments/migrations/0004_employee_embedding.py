@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0003_employee_skill_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeEmbedding',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='embedding', serialize=False, to='assignments.employee')),
+                ('model', models.CharField(max_length=100)),
+                ('vector', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
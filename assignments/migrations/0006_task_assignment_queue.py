@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0005_assignment_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='assignment_enqueued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='assignment_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignment_status', 'priority'], name='task_assignment_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+ACTIVE_STATUSES = ("assigned", "in_progress", "review")
+PRIORITY_WEIGHTS = {"low": 0.5, "medium": 1.0, "high": 2.0}
+
+
+def seed_workload_counters(apps, schema_editor):
+    """Keep the imported score as the baseline and charge the tasks that are already active."""
+    Employee = apps.get_model("assignments", "Employee")
+    Task = apps.get_model("assignments", "Task")
+    capacity = float(getattr(settings, "WORKLOAD_CAPACITY_POINTS", 8.0)) or 1.0
+
+    active = list(Task.objects.filter(status__in=ACTIVE_STATUSES, assigned_to__isnull=False).only("id", "priority", "assigned_to"))
+    totals = {}
+    for task in active:
+        task.workload_weight = PRIORITY_WEIGHTS.get(task.priority, 1.0)
+        count, points = totals.get(task.assigned_to_id, (0, 0.0))
+        totals[task.assigned_to_id] = (count + 1, points + task.workload_weight)
+    Task.objects.bulk_update(active, ["workload_weight"], batch_size=500)
+
+    employees = list(Employee.objects.all())
+    for emp in employees:
+        count, points = totals.get(emp.pk, (0, 0.0))
+        emp.base_workload = emp.workload_score
+        emp.active_tasks, emp.workload_points = count, points
+        emp.workload_score = min(1.0, emp.base_workload + points / capacity)
+    Employee.objects.bulk_update(employees, ["base_workload", "active_tasks", "workload_points", "workload_score"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0007_pipeline_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='active_tasks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='base_workload',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='workload_points',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='effort_level',
+            field=models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], default='medium', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='workload_weight',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(seed_workload_counters, migrations.RunPython.noop),
+    ]
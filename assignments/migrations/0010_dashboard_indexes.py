@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0009_task_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignmentlog',
+            index=models.Index(fields=['-created_at', '-id'], name='log_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignmentlog',
+            index=models.Index(fields=['decision_status', '-created_at', '-id'], name='log_decision_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-created_at', '-id'], name='task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='task_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['priority', '-created_at', '-id'], name='task_priority_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status'], name='task_assignee_status_idx'),
+        ),
+    ]
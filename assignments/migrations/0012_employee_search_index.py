@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:34
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Hand-written in 0003; replaced by the declared index so it is built from the
+# same SearchVector expression that retrieval queries.
+OLD_SEARCH_INDEX = "assignments_employee_search_idx"
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(
+    django.contrib.postgres.search.SearchVector('role', 'responsibilities', config='english'), name='employee_search_idx',
+)
+
+
+def create_search_index(apps, schema_editor):
+    # Full-text index; PostgreSQL only (the state operation below records it everywhere).
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {OLD_SEARCH_INDEX}")
+    schema_editor.add_index(apps.get_model("assignments", "Employee"), SEARCH_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("assignments", "Employee"), SEARCH_INDEX)
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {OLD_SEARCH_INDEX} ON assignments_employee USING gin "
+        "(to_tsvector('english'::regconfig, COALESCE(role, '') || ' ' || COALESCE(responsibilities, '')))"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0011_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='employee', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -1,5 +1,17 @@
-from django.db import models
+import uuid
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.utils import timezone
+
+# Text search configuration of the role/responsibilities index (PostgreSQL).
+SEARCH_CONFIG = "english"
+
+
+def employee_search_vector() -> SearchVector:
+    """The indexed full-text expression; retrieval must query this exact expression for the index to apply."""
+    return SearchVector("role", "responsibilities", config=SEARCH_CONFIG)
 
 
 class Employee(models.Model):
@@ -9,15 +21,70 @@ class Employee(models.Model):
     skills = models.JSONField(default=list)  
     responsibilities = models.TextField(blank=True)
     workload_score = models.FloatField(default=0.0) 
+    # Incrementally maintained load (see workload.py): workload_score = base_workload + workload_points / capacity
+    base_workload = models.FloatField(default=0.0)
+    workload_points = models.FloatField(default=0.0)
+    active_tasks = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            GinIndex(employee_search_vector(), name="employee_search_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.role})"
 
 
+class EmployeeSkill(models.Model):
+    """Lowercased copy of Employee.skills, one row per skill, so matching can use an index."""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='skill_entries')
+    name = models.CharField(max_length=200, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["employee", "name"], name="unique_employee_skill"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.employee_id})"
+
+
+class EmployeeEmbedding(models.Model):
+    """Precomputed profile vector (float32 bytes) for semantic matching; see embeddings.py."""
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, primary_key=True, related_name='embedding')
+    model = models.CharField(max_length=100)
+    vector = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Embedding for {self.employee_id} ({self.model})"
+
+
+class AssignmentBatch(models.Model):
+    """A bulk task submission (POST /api/tasks/bulk/); progress is aggregated from its tasks."""
+    STATUS_CHOICES = [("queued","Queued"), ("completed","Completed")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    total = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Batch {self.id} ({self.status})"
+
+
+class StaleTaskError(Exception):
+    """The task row changed since this instance was read (optimistic concurrency on Task.version)."""
+
+
 class Task(models.Model):
     PRIORITY_CHOICES = [("low","Low"), ("medium","Medium"), ("high","High")]
     STATUS_CHOICES = [("open","Open"), ("assigned","Assigned"), ("in_progress","In Progress"),
                       ("done","Done"), ("review","Review")]
+    EFFORT_CHOICES = [("low","Low"), ("medium","Medium"), ("high","High")]
+    ASSIGNMENT_STATUS_CHOICES = [("pending","Pending"), ("running","Running"),
+                                 ("completed","Completed"), ("failed","Failed")]
 
     title = models.CharField(max_length=500)
     description = models.TextField()
@@ -26,9 +93,50 @@ class Task(models.Model):
     assigned_to = models.ForeignKey(Employee, null=True, blank=True, on_delete=models.SET_NULL, related_name='tasks')
     created_by = models.ForeignKey(Employee, null=True, blank=True, on_delete=models.SET_NULL, related_name='created_tasks')
     confidence_score = models.FloatField(null=True, blank=True)
+    effort_level = models.CharField(max_length=10, choices=EFFORT_CHOICES, default="medium")
+    # Points charged to the assignee's workload while the task is active (see workload.py)
+    workload_weight = models.FloatField(default=0.0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Background assignment job tracking (see run_assignment_pipeline)
+    assignment_status = models.CharField(max_length=20, choices=ASSIGNMENT_STATUS_CHOICES, blank=True, default="")
+    assignment_job_id = models.CharField(max_length=255, blank=True, default="")
+    assignment_result = models.JSONField(null=True, blank=True)
+    batch = models.ForeignKey(AssignmentBatch, null=True, blank=True, on_delete=models.SET_NULL, related_name='tasks')
+    assignment_enqueued_at = models.DateTimeField(null=True, blank=True)
+    assignment_started_at = models.DateTimeField(null=True, blank=True)
+    # Bumped on every write; saves and assignment commits only apply to the version they read.
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["assignment_status", "priority"], name="task_assignment_queue_idx"),
+            # Dashboard lists: cursor order (created_at, id), optionally behind an equality filter (see filters.py).
+            models.Index(fields=["-created_at", "-id"], name="task_created_idx"),
+            models.Index(fields=["status", "-created_at", "-id"], name="task_status_created_idx"),
+            models.Index(fields=["priority", "-created_at", "-id"], name="task_priority_created_idx"),
+            models.Index(fields=["assigned_to", "status"], name="task_assignee_status_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get("using")):
+            bumped = Task._base_manager.filter(pk=self.pk, version=self.version).update(version=models.F("version") + 1)
+            if not bumped:
+                raise StaleTaskError(f"Task {self.pk} was modified concurrently (read version {self.version})")
+            self.version += 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+            super().save(*args, **kwargs)
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # Reloaded state is the new baseline for workload transition tracking.
+        from .workload import snapshot
+        snapshot(self)
+
 
 class AssignmentLog(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='logs')
@@ -38,5 +146,77 @@ class AssignmentLog(models.Model):
     decision_status = models.CharField(max_length=50)  
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="log_created_idx"),
+            models.Index(fields=["decision_status", "-created_at", "-id"], name="log_decision_created_idx"),
+        ]
+
     def __str__(self):
         return f"Log for {self.task_id} ({self.decision_status})"
+
+
+class PipelineCheckpoint(models.Model):
+    """LangGraph checkpoint of an assignment pipeline run (see checkpointer.DjangoCheckpointSaver)."""
+    thread_id = models.CharField(max_length=255)
+    checkpoint_ns = models.CharField(max_length=255, blank=True, default="")
+    checkpoint_id = models.CharField(max_length=64)
+    parent_checkpoint_id = models.CharField(max_length=64, null=True, blank=True)
+    checkpoint_type = models.CharField(max_length=50)
+    checkpoint = models.BinaryField()
+    metadata_type = models.CharField(max_length=50)
+    metadata = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["thread_id", "checkpoint_ns", "checkpoint_id"], name="unique_pipeline_checkpoint"),
+        ]
+
+
+class PipelineCheckpointWrite(models.Model):
+    """Pending channel write of a node that finished inside a checkpointed step."""
+    thread_id = models.CharField(max_length=255)
+    checkpoint_ns = models.CharField(max_length=255, blank=True, default="")
+    checkpoint_id = models.CharField(max_length=64)
+    task_id = models.CharField(max_length=64)
+    idx = models.IntegerField()
+    channel = models.CharField(max_length=255)
+    value_type = models.CharField(max_length=50)
+    value = models.BinaryField()
+    task_path = models.CharField(max_length=255, blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"], name="unique_pipeline_checkpoint_write"),
+        ]
+
+
+class NotificationOutbox(models.Model):
+    """Queued outbound email / Slack message, delivered in batches by tasks.flush_notifications."""
+    CHANNEL_CHOICES = [("email","Email"), ("slack","Slack")]
+    STATUS_CHOICES = [("pending","Pending"), ("sending","Sending"), ("sent","Sent"), ("failed","Failed")]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=255)  # email address or Slack channel / user id
+    subject = models.CharField(max_length=500, blank=True, default="")
+    body = models.TextField(blank=True, default="")  # plain text (Slack text, or email body without a template)
+    template = models.CharField(max_length=255, blank=True, default="")  # "<name>" renders <name>.txt and optional <name>.html
+    context = models.JSONField(default=dict, blank=True)
+    task = models.ForeignKey(Task, null=True, blank=True, on_delete=models.SET_NULL, related_name='notifications')
+    # Set for notifications that must go out once (e.g. per assignment), even if the pipeline step is retried.
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    # Pending: earliest (re)try. Sending: claim expiry, after which a crashed worker's claim is taken over.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx")]
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} ({self.status})"
@@ -1,30 +1,221 @@
+"""
+Outbound notifications through an outbox table.
+
+Callers (the pipeline's decision step, the batch path, notify_assignment)
+only insert NotificationOutbox rows; nothing waits on SMTP or Slack. After
+the inserting transaction commits, tasks.flush_notifications is scheduled to
+run NOTIFICATION_FLUSH_DELAY seconds later on a worker, so a burst of
+notifications is sent as one batch and the pipeline never waits on SMTP or
+Slack. Only when no broker is reachable is the batch flushed in-process
+instead. Celery beat also sweeps the outbox for retries.
+
+deliver_batch() claims due rows with a single UPDATE (claim token, so
+concurrent flushers never send the same row), sends every email over one
+SMTP connection and every Slack message through one WebClient, and
+reschedules failures with exponential backoff up to NOTIFICATION_MAX_ATTEMPTS.
+"""
 import logging
-from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
+import random
+import threading
+import uuid
+from datetime import timedelta
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
 from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import NotificationOutbox, Task
 
 logger = logging.getLogger(__name__)
 
-def send_assignment_email(assignee_email: str, context: dict):
+ASSIGNMENT_TEMPLATE = "assignments/email_assignment"
+FLUSH_SCHEDULED_KEY = "assignments:outbox:flush_scheduled"
+
+_slack_lock = threading.Lock()
+_slack_client = None
+
+
+# -- enqueueing --------------------------------------------------------------
+
+def enqueue(channel: str, recipient: str, *, subject: str = "", body: str = "", template: str = "",
+            context: Optional[dict] = None, task: Optional[Task] = None,
+            dedupe_key: Optional[str] = None) -> Optional[NotificationOutbox]:
+    """Queue one notification; returns None when it is disabled or was already queued (dedupe_key)."""
+    if not recipient:
+        return None
+    if channel == "email" and not getattr(settings, "ENABLE_EMAIL_NOTIFICATIONS", True):
+        return None
+    try:
+        with transaction.atomic():
+            item = NotificationOutbox.objects.create(
+                channel=channel, recipient=recipient, subject=subject, body=body, template=template,
+                context=context or {}, task=task, dedupe_key=dedupe_key,
+            )
+    except IntegrityError:
+        logger.info(f"[Outbox] {dedupe_key} already queued")
+        return None
+    transaction.on_commit(schedule_flush)
+    return item
+
+
+def queue_assignment_email(assignee_email: str, context: dict, task: Optional[Task] = None,
+                           dedupe_key: Optional[str] = None) -> bool:
     """
-    Send a formal assignment email (both text and HTML).
+    Queue the formal assignment email (text + HTML).
     context should contain keys: assignee_name, task_title, task_description,
     confidence_score, task_url (optional), assigned_by, assigned_at, summary_lines (optional list)
     """
+    item = enqueue(
+        "email", assignee_email,
+        subject=f"[Assignment] New Task: {context.get('task_title')}",
+        template=ASSIGNMENT_TEMPLATE, context=context, task=task, dedupe_key=dedupe_key,
+    )
+    return item is not None
+
+
+def schedule_flush() -> None:
+    delay = getattr(settings, "NOTIFICATION_FLUSH_DELAY", 2)
+    # One delayed flush per window picks up everything queued in the meantime.
+    if not cache.add(FLUSH_SCHEDULED_KEY, 1, timeout=delay):
+        return
+    from .tasks import flush_notifications
     try:
-        subject = f"[Assignment] New Task: {context.get('task_title')}"
-        from_email = settings.DEFAULT_FROM_EMAIL
-        to = [assignee_email]
-        text_content = render_to_string("assignments/email_assignment.txt", context)
-        html_content = render_to_string("assignments/email_assignment.html", context)
+        flush_notifications.apply_async(countdown=delay)
+    except Exception as e:
+        logger.warning(f"[Outbox] No broker to schedule the flush, delivering in-process: {e}")
+        cache.delete(FLUSH_SCHEDULED_KEY)
+        deliver_batch()
 
-        msg = EmailMultiAlternatives(subject=subject, body=text_content, from_email=from_email, to=to)
-        msg.attach_alternative(html_content, "text/html")
-        msg.send(fail_silently=False)
 
-        
-        print(f"✅ Assignment email sent to {assignee_email}")
+# -- delivery ----------------------------------------------------------------
 
-    except Exception as e:
-        # Log and swallow to avoid breaking main flow
-        logger.exception("Failed to send assignment email to %s: %s", assignee_email, e)
+@lru_cache(maxsize=64)
+def _template(name: str):
+    """Compiled template, or None if it does not exist (e.g. no HTML variant)."""
+    try:
+        return get_template(name)
+    except TemplateDoesNotExist:
+        return None
+
+
+def _email_message(item: NotificationOutbox, connection) -> EmailMultiAlternatives:
+    text = item.body
+    html = None
+    if item.template:
+        text = _template(f"{item.template}.txt").render(item.context)
+        html_template = _template(f"{item.template}.html")
+        html = html_template.render(item.context) if html_template else None
+    msg = EmailMultiAlternatives(
+        subject=item.subject, body=text, from_email=settings.DEFAULT_FROM_EMAIL, to=[item.recipient], connection=connection
+    )
+    if html:
+        msg.attach_alternative(html, "text/html")
+    return msg
+
+
+def get_slack_client():
+    """Process-wide Slack WebClient (one HTTP session), or None without SLACK_BOT_TOKEN."""
+    global _slack_client
+    token = getattr(settings, "SLACK_BOT_TOKEN", "")
+    if not token:
+        return None
+    with _slack_lock:
+        if _slack_client is None:
+            from slack_sdk.web import WebClient
+
+            _slack_client = WebClient(token=token, timeout=getattr(settings, "SLACK_TIMEOUT", 10))
+        return _slack_client
+
+
+def _backoff(attempts: int) -> timedelta:
+    base = getattr(settings, "NOTIFICATION_RETRY_BASE", 30)
+    cap = getattr(settings, "NOTIFICATION_RETRY_MAX", 3600)
+    return timedelta(seconds=min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2))
+
+
+def _claim(limit: int) -> List[NotificationOutbox]:
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = NotificationOutbox.objects.filter(Q(status="pending") | Q(status="sending"), next_attempt_at__lte=now)
+    ids = list(due.order_by("next_attempt_at", "pk").values_list("pk", flat=True)[:limit])
+    if not ids:
+        return []
+    lease = now + timedelta(seconds=getattr(settings, "NOTIFICATION_CLAIM_TIMEOUT", 300))
+    # Re-check the due condition in the UPDATE: a concurrent flusher may have claimed some of these ids.
+    due.filter(pk__in=ids).update(status="sending", claim_token=token, next_attempt_at=lease, attempts=F("attempts") + 1)
+    return list(NotificationOutbox.objects.filter(claim_token=token, status="sending"))
+
+
+def _send_emails(items: Iterable[NotificationOutbox], failures: dict) -> None:
+    items = list(items)
+    if not items:
+        return
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for item in items:
+            try:
+                connection.send_messages([_email_message(item, connection)])
+            except Exception as e:
+                failures[item.pk] = f"{type(e).__name__}: {e}"
+    except Exception as e:  # could not connect at all
+        for item in items:
+            failures.setdefault(item.pk, f"{type(e).__name__}: {e}")
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def _send_slack(items: Iterable[NotificationOutbox], failures: dict) -> None:
+    items = list(items)
+    if not items:
+        return
+    client = get_slack_client()
+    for item in items:
+        if client is None:
+            failures[item.pk] = "SLACK_BOT_TOKEN is not configured"
+            continue
+        try:
+            client.chat_postMessage(channel=item.recipient, text=item.body)
+        except Exception as e:
+            failures[item.pk] = f"{type(e).__name__}: {e}"
+
+
+def deliver_batch(limit: Optional[int] = None) -> dict:
+    """Send one batch of due notifications. Returns counts of sent / retrying / failed rows."""
+    batch = _claim(limit or getattr(settings, "NOTIFICATION_BATCH_SIZE", 100))
+    failures: dict = {}
+    _send_emails((i for i in batch if i.channel == "email"), failures)
+    _send_slack((i for i in batch if i.channel == "slack"), failures)
+
+    now = timezone.now()
+    max_attempts = getattr(settings, "NOTIFICATION_MAX_ATTEMPTS", 5)
+    counts = {"sent": 0, "retrying": 0, "failed": 0}
+    for item in batch:
+        item.claim_token = ""
+        error = failures.get(item.pk)
+        if error is None:
+            item.status, item.sent_at, item.last_error = "sent", now, ""
+            counts["sent"] += 1
+        elif item.attempts >= max_attempts:
+            item.status, item.last_error = "failed", error
+            counts["failed"] += 1
+            logger.error(f"[Outbox] Giving up on {item} after {item.attempts} attempts: {error}")
+        else:
+            item.status, item.last_error, item.next_attempt_at = "pending", error, now + _backoff(item.attempts)
+            counts["retrying"] += 1
+            logger.warning(f"[Outbox] {item} failed (attempt {item.attempts}), retrying: {error}")
+    NotificationOutbox.objects.bulk_update(batch, ["status", "sent_at", "last_error", "next_attempt_at", "claim_token"])
+    if batch:
+        logger.info(f"[Outbox] Delivered batch: {counts}")
+    counts["claimed"] = len(batch)
+    return counts
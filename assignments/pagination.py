@@ -0,0 +1,18 @@
+"""
+Cursor pagination for the task and assignment-log lists.
+
+Offset pagination makes the database count and skip every earlier row, and
+pages shift under concurrent inserts. A cursor on (created_at, id) turns the next
+page into a range filter on the ordering columns and stays stable while the
+pipeline keeps writing new rows.
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+
+    page_size = getattr(settings, "API_PAGE_SIZE", 50)
+    max_page_size = getattr(settings, "API_MAX_PAGE_SIZE", 500)
@@ -0,0 +1,268 @@
+"""
+The assignment pipeline as a compiled LangGraph StateGraph.
+
+    START ─┬─ parse ─────────────┬─ match ── analyze ──(Send per candidate / chunk)── score ── decide ── END
+           └─ workload_snapshot ─┘                └────────────(no candidates)────────────────┘
+
+parse (LLM-bound) and workload_snapshot run as parallel branches.
+workload_snapshot no longer copies every employee's availability into graph
+state (that made each checkpoint O(employees)): it warms the process-local
+candidate index (skill_index, which carries each employee's workload, and
+the embedding matrix with SEMANTIC_MATCHING) while the parser waits on the
+LLM, and writes nothing to state. match then reads candidates together with
+their workload_score, which analyze ranks by. With the database matcher
+there is nothing to preload and the branch is a no-op.
+
+Confidence scoring fans out with one Send per candidate (or per chunk in
+CONFIDENCE_SCORING_MODE="batch"), bounded by LLM_SCORING_CONCURRENCY. Graph
+state holds only the matched candidates' ids and plain dicts so it
+checkpoints cleanly; with PIPELINE_CHECKPOINTING on, each step is saved
+through DjangoCheckpointSaver and a retried job resumes from the last
+completed node.
+"""
+import logging
+import operator
+import threading
+from typing import Annotated, Any, Dict, List, Optional, TypedDict
+
+from django.conf import settings
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+from .ai_engine import (
+    _bounded_map,
+    _heuristic_score,
+    _no_candidates_result,
+    _pipeline_result,
+    _score_batch,
+    _score_candidate,
+    adjusted_score,
+    decision_node,
+    effort_from,
+    get_llm,
+    role_matching_node,
+    task_parser_node,
+)
+from .checkpointer import DjangoCheckpointSaver
+from .models import Employee, Task
+from .metrics import PIPELINE_CANDIDATES, timed_node
+from .progress import publish
+from .retrieval import matching_backend
+from .skill_index import skill_index
+
+logger = logging.getLogger(__name__)
+
+
+class AssignmentState(TypedDict, total=False):
+    task: Dict[str, Any]  # id / title / description snapshot
+    threshold: float
+    force_reparse: bool
+    parsed: Dict[str, Any]
+    candidates: List[Dict[str, Any]]  # employee profiles, best availability first after analyze
+    scored: Annotated[List[Dict[str, Any]], operator.add]
+    result: Dict[str, Any]
+
+
+class ScoreJob(TypedDict):
+    task: Dict[str, Any]
+    candidates: List[Dict[str, Any]]
+    mode: str  # "llm" | "batch" | "heuristic"
+    reason: str
+
+
+PROFILE_FIELDS = ("id", "name", "email", "role", "skills", "responsibilities", "workload_score")
+
+
+def _task_from(data: Dict[str, Any]) -> Task:
+    return Task(id=data["id"], title=data["title"], description=data["description"])
+
+
+def _employee_from(profile: Dict[str, Any]) -> Employee:
+    return Employee(**{field: profile[field] for field in PROFILE_FIELDS})
+
+
+# -- nodes -------------------------------------------------------------------
+
+@timed_node("parse")
+def parse_node(state: AssignmentState) -> Dict[str, Any]:
+    task = _task_from(state["task"])
+    parsed = task_parser_node(task, bypass_cache=state.get("force_reparse", False))
+    publish(task.id, "parsed", **{k: parsed.get(k) for k in ("keywords", "skills", "technical_tags", "effort_level")})
+    return {"parsed": parsed}
+
+
+@timed_node("workload_snapshot")
+def workload_snapshot_node(state: AssignmentState) -> Dict[str, Any]:
+    """Preload candidate workloads into the in-memory matching index, overlapping the parse call."""
+    if matching_backend() == "memory":
+        skill_index.warm()
+    if getattr(settings, "SEMANTIC_MATCHING", False):
+        from .embeddings import embedding_matrix
+        embedding_matrix.warm()
+    return {}
+
+
+@timed_node("match")
+def match_node(state: AssignmentState) -> Dict[str, Any]:
+    employees = role_matching_node(state["parsed"])
+    PIPELINE_CANDIDATES.observe(len(employees))
+    publish(state["task"]["id"], "candidates", count=len(employees),
+            candidates=[{"id": emp.pk, "name": emp.name, "role": emp.role} for emp in employees])
+    return {"candidates": [{field: getattr(emp, field) for field in PROFILE_FIELDS} for emp in employees]}
+
+
+@timed_node("analyze")
+def analyze_node(state: AssignmentState) -> Dict[str, Any]:
+    # workload_score was read with the candidate rows in match, a step earlier.
+    analyzed = [
+        {**profile, "adjusted_score": adjusted_score(profile["workload_score"])}
+        for profile in state.get("candidates", [])
+    ]
+    analyzed.sort(key=lambda c: -c["adjusted_score"])
+    logger.info("[WorkloadAnalyzer] Adjusted workload scores calculated.")
+    return {"candidates": analyzed}
+
+
+def route_scoring(state: AssignmentState):
+    """Fan out one score job per candidate (per chunk in batch mode), or go straight to decide."""
+    candidates = state.get("candidates", [])
+    if not candidates:
+        return "decide"
+
+    def job(chunk, mode, reason=""):
+        return Send("score", {"task": state["task"], "candidates": chunk, "mode": mode, "reason": reason})
+
+    if get_llm() is None:
+        return [job(candidates, "heuristic", "Heuristic confidence (no LLM).")]
+    if getattr(settings, "CONFIDENCE_SCORING_MODE", "per_candidate") == "batch":
+        top_k = getattr(settings, "CONFIDENCE_BATCH_TOP_K", 30)
+        size = max(1, getattr(settings, "CONFIDENCE_BATCH_SIZE", 15))
+        head, tail = candidates[:top_k], candidates[top_k:]
+        jobs = [job(head[i:i + size], "batch") for i in range(0, len(head), size)]
+        if tail:
+            jobs.append(job(tail, "heuristic", "Heuristic confidence (outside batch top-K)"))
+        return jobs
+    return [job([candidate], "llm") for candidate in candidates]
+
+
+@timed_node("score")
+def score_node(job: ScoreJob) -> Dict[str, Any]:
+    task = _task_from(job["task"])
+    infos = [{"employee": _employee_from(c), "adjusted_score": c["adjusted_score"]} for c in job["candidates"]]
+    timeout = getattr(settings, "LLM_SCORING_TIMEOUT", 30.0)
+
+    if job["mode"] == "heuristic":
+        results = [_heuristic_score(info, job["reason"]) for info in infos]
+    elif job["mode"] == "batch":
+        llm = get_llm()
+        results = _bounded_map(
+            lambda chunk: _score_batch(llm, task, chunk), [infos], 1, timeout,
+            fallback=lambda chunk, reason: [_heuristic_score(info, reason) for info in chunk],
+        )[0]
+    else:
+        llm = get_llm()
+        results = _bounded_map(lambda info: _score_candidate(llm, task, info), infos, 1, timeout, _heuristic_score)
+
+    for r in results:
+        publish(task.id, "scored", employee_id=r["employee"].pk, name=r["employee"].name,
+                confidence=r["confidence"], reason=r["reason"])
+    return {"scored": [
+        {"employee_id": r["employee"].pk, "confidence": r["confidence"], "reason": r["reason"]}
+        for r in results
+    ]}
+
+
+@timed_node("decide")
+def decide_node(state: AssignmentState) -> Dict[str, Any]:
+    task = Task.objects.get(pk=state["task"]["id"])
+    task.effort_level = effort_from(state.get("parsed"))
+    if not state.get("candidates"):
+        publish(task.id, "decision", decision="no_candidates", assigned=False, assignee=None, confidence=0.0,
+                reason="No candidates matched.")
+        return {"result": _no_candidates_result(task)}
+
+    rank = {c["id"]: i for i, c in enumerate(state["candidates"])}
+    entries = sorted(state.get("scored", []), key=lambda s: (-s["confidence"], rank.get(s["employee_id"], len(rank))))
+    employees = Employee.objects.in_bulk([s["employee_id"] for s in entries])
+    scored = [
+        {"employee": employees[s["employee_id"]], "confidence": s["confidence"], "reason": s["reason"]}
+        for s in entries
+        if s["employee_id"] in employees
+    ]
+    logger.info(f"[ConfidenceScorer] Completed for {len(scored)} candidates.")
+    decision = decision_node(task, scored, state.get("threshold", 0.75))
+    publish(task.id, "decision", decision=decision["decision"], assigned=bool(task.assigned_to_id),
+            assignee=decision.get("assignee"), confidence=decision.get("confidence", 0.0), reason=decision.get("reason"))
+    return {"result": _pipeline_result(task, scored, decision)}
+
+
+# -- graph -------------------------------------------------------------------
+
+def build_assignment_graph() -> StateGraph:
+    builder = StateGraph(AssignmentState)
+    builder.add_node("parse", parse_node)
+    builder.add_node("workload_snapshot", workload_snapshot_node)
+    builder.add_node("match", match_node)
+    builder.add_node("analyze", analyze_node)
+    builder.add_node("score", score_node)
+    builder.add_node("decide", decide_node)
+
+    builder.add_edge(START, "parse")
+    builder.add_edge(START, "workload_snapshot")
+    builder.add_edge(["parse", "workload_snapshot"], "match")
+    builder.add_edge("match", "analyze")
+    builder.add_conditional_edges("analyze", route_scoring, ["score", "decide"])
+    builder.add_edge("score", "decide")
+    builder.add_edge("decide", END)
+    return builder
+
+
+_compiled: Dict[bool, Any] = {}
+_compiled_lock = threading.Lock()
+checkpointer = DjangoCheckpointSaver()
+
+
+def get_assignment_graph(checkpointed: bool = True):
+    """Compiled graph, built once per process (with and without the checkpointer)."""
+    with _compiled_lock:
+        if checkpointed not in _compiled:
+            _compiled[checkpointed] = build_assignment_graph().compile(
+                checkpointer=checkpointer if checkpointed else None
+            )
+        return _compiled[checkpointed]
+
+
+def run_assignment_graph(task: Task, threshold: float = 0.75, force_reparse: bool = False, job_id: Optional[str] = None) -> dict:
+    """
+    Run the graph for `task`. With a job_id (the Celery task id, stable across
+    retries) and PIPELINE_CHECKPOINTING on, progress is checkpointed under
+    thread "assignment:<task>:<job>" and an interrupted run is resumed; the
+    checkpoints are dropped once the run completes.
+    """
+    checkpointed = bool(job_id) and getattr(settings, "PIPELINE_CHECKPOINTING", True)
+    graph = get_assignment_graph(checkpointed)
+    thread_id = f"assignment:{task.id}:{job_id}"
+    config = {
+        "configurable": {"thread_id": thread_id},
+        "max_concurrency": getattr(settings, "LLM_SCORING_CONCURRENCY", 8),
+    }
+    initial: AssignmentState = {
+        "task": {"id": task.id, "title": task.title, "description": task.description},
+        "threshold": threshold,
+        "force_reparse": force_reparse,
+    }
+
+    if not checkpointed:
+        return graph.invoke(initial, config)["result"]
+
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        logger.info(f"[Pipeline] Resuming {thread_id} at {snapshot.next}")
+        values = graph.invoke(None, config)
+    elif snapshot.values.get("result") is not None:
+        values = snapshot.values
+    else:
+        values = graph.invoke(initial, config)
+
+    checkpointer.delete_thread(thread_id)
+    return values["result"]
@@ -0,0 +1,43 @@
+"""
+Live progress events for a task's assignment pipeline.
+
+Pipeline steps publish small JSON events to the channel-layer group
+"assignment.<task id>" (Redis via channels_redis when REDIS_URL is set, so a
+Celery worker's events reach the web process). Clients subscribe with
+Server-Sent Events (GET /api/tasks/<id>/events/) or a WebSocket
+(ws/tasks/<id>/progress/) instead of polling the assignment endpoint.
+
+Events, in order: started, parsed, candidates, scored (one per candidate as
+it lands), decision, then completed or failed (retrying precedes a Celery
+retry). Publishing is best-effort: a
+missing or failing channel layer never fails the pipeline, and subscribers
+re-read the task row on every heartbeat so a lost terminal event only
+delays the close.
+"""
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_EVENTS = ("completed", "failed")
+
+
+def group_name(task_id: int) -> str:
+    return f"assignment.{task_id}"
+
+
+def publish(task_id: int, event: str, **data) -> None:
+    if not getattr(settings, "PIPELINE_PROGRESS_ENABLED", True):
+        return
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    message = {"type": "progress.event", "event": event, "task_id": task_id, "ts": time.time(), "data": data}
+    try:
+        async_to_sync(layer.group_send)(group_name(task_id), message)
+    except Exception as e:
+        logger.warning(f"[Progress] Could not publish {event} for Task ID={task_id}: {e}")
@@ -0,0 +1,156 @@
+"""
+Token budgets for the assignment pipeline's LLM prompts.
+
+Task descriptions and employee responsibilities are free text of any length
+(a pasted stack trace or log dump is common), and the scorer repeats the task
+in every candidate prompt. Before a field goes into a prompt it is compacted
+to a token budget: trailing whitespace, blank-line runs and consecutive
+repeated lines (log lines that differ only in numbers/timestamps) are
+collapsed first, and if the text is still too long its head and tail are
+kept around an omission marker. compact_task() does this once per task and
+memoizes the result, so every candidate prompt (including the graph's
+parallel score branches) reuses the same compacted context.
+
+Budgets are per node (PROMPT_TOKEN_BUDGETS) plus per-field caps
+(PROMPT_TASK_CONTEXT_TOKENS, PROMPT_RESPONSIBILITIES_TOKENS).
+
+Tokens are counted with tiktoken for the model in use. tiktoken downloads its
+BPE files on first use (point TIKTOKEN_CACHE_DIR at a pre-populated directory
+in offline deployments); if they cannot be loaded, counting falls back to
+~4 characters per token and truncation works on characters.
+"""
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4o-mini"
+FALLBACK_ENCODING = "o200k_base"
+CHARS_PER_TOKEN = 4
+# A field is never squeezed below this, even when the rest of the prompt is over budget.
+MIN_FIELD_TOKENS = 32
+
+_NUMBERS = re.compile(r"\d+")
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+# Scoring threads ask for the same encoding / task context at once; load and compact each only once.
+_lock = threading.RLock()
+_encodings: Dict[str, object] = {}
+
+
+def _load_encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        logger.warning(f"[Prompts] No tiktoken encoding for {model}, estimating tokens from length: {e}")
+        return None
+
+
+def _encoding(model: str):
+    """tiktoken Encoding for model, or None (estimate from length) when tiktoken or its BPE files are unavailable."""
+    if model not in _encodings:
+        with _lock:
+            if model not in _encodings:
+                _encodings[model] = _load_encoding(model)
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    enc = _encoding(model or DEFAULT_MODEL)
+    if enc is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def budget(purpose: str) -> int:
+    return getattr(settings, "PROMPT_TOKEN_BUDGETS", {}).get(purpose, 2000)
+
+
+def field_budget(purpose: str, frame: str, cap: Optional[int] = None, model: Optional[str] = None) -> int:
+    """Tokens left for one field: the node budget minus the rest of the prompt (`frame`), at most cap."""
+    left = max(MIN_FIELD_TOKENS, budget(purpose) - count_tokens(frame, model))
+    return min(left, cap) if cap else left
+
+
+def _collapse(text: str) -> str:
+    lines, out = text.replace("\r\n", "\n").split("\n"), []
+    i = 0
+    while i < len(lines):
+        line = lines[i].rstrip()
+        shape = _NUMBERS.sub("#", line.strip())
+        j = i + 1
+        while j < len(lines) and shape and _NUMBERS.sub("#", lines[j].strip()) == shape:
+            j += 1
+        out.append(line)
+        if j - i > 1:
+            out.append(f"[... {j - i - 1} similar lines]")
+        i = j
+    return _BLANK_RUNS.sub("\n\n", "\n".join(out)).strip()
+
+
+def truncate(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Keep the first ~2/3 and last ~1/3 of max_tokens, marking what was dropped."""
+    enc = _encoding(model or DEFAULT_MODEL)
+    units = enc.encode(text, disallowed_special=()) if enc else text
+    limit = max_tokens if enc else max_tokens * CHARS_PER_TOKEN
+    if len(units) <= limit:
+        return text
+    head = limit * 2 // 3
+    tail = max(0, limit - head - (12 if enc else 48))  # room for the marker
+    dropped = len(units) - head - tail
+    if enc:
+        start, end = enc.decode(units[:head]), enc.decode(units[len(units) - tail:]) if tail else ""
+        marker = f"\n[... {dropped} tokens omitted ...]\n"
+    else:
+        start, end = units[:head], units[len(units) - tail:] if tail else ""
+        marker = f"\n[... {-(-dropped // CHARS_PER_TOKEN)} tokens omitted ...]\n"
+    return start.rstrip() + marker + end.lstrip()
+
+
+def compact(text: str, max_tokens: int, model: Optional[str] = None, field: str = "text") -> str:
+    """text unchanged if it fits max_tokens, else collapsed and, if still too long, truncated."""
+    if not text or count_tokens(text, model) <= max_tokens:
+        return text or ""
+    metrics.PROMPT_COMPACTIONS.inc(field=field)
+    collapsed = _collapse(text)
+    if count_tokens(collapsed, model) <= max_tokens:
+        return collapsed
+    return truncate(collapsed, max_tokens, model)
+
+
+@dataclass(frozen=True)
+class TaskContext:
+    title: str
+    description: str
+    tokens: int  # title + description
+
+
+@lru_cache(maxsize=256)
+def _task_context(title: str, description: str, max_tokens: int, model: str) -> TaskContext:
+    description = compact(description, max_tokens, model, field="task_description")
+    return TaskContext(title, description, count_tokens(title, model) + count_tokens(description, model))
+
+
+def compact_task(task, max_tokens: Optional[int] = None, model: Optional[str] = None) -> TaskContext:
+    """Task title and description, the description fitted to max_tokens (PROMPT_TASK_CONTEXT_TOKENS); memoized by content."""
+    if max_tokens is None:
+        max_tokens = getattr(settings, "PROMPT_TASK_CONTEXT_TOKENS", 500)
+    with _lock:
+        return _task_context(task.title or "", task.description or "", max_tokens, model or DEFAULT_MODEL)
@@ -0,0 +1,134 @@
+"""
+Assignment queue: priority lanes and backpressure.
+
+assignment_queue is a priority queue (x-max-priority on RabbitMQ,
+priority_steps on Redis); Task.priority maps to a message priority through
+ASSIGNMENT_PRIORITY_MAP so high-priority tasks jump ahead of the backlog.
+Queue depth is read from the tasks table (tasks whose assignment job has not
+started yet), which works the same on every broker. When it exceeds
+ASSIGNMENT_QUEUE_MAX_DEPTH the API refuses new work with 503 + Retry-After
+instead of letting the broker backlog grow without bound; a single bulk
+request larger than the whole queue is refused with 413 instead, since
+waiting would never make room for it.
+
+A task whose message never reached the broker is marked failed on the spot,
+and pending tasks enqueued more than ASSIGNMENT_QUEUE_PENDING_MAX_AGE seconds
+ago (message lost with a broker or worker) are not counted, so neither can
+hold the queue "full" forever.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from .ai_engine import run_assignment_pipeline
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRIORITY_MAP = {"high": 9, "medium": 5, "low": 1}
+
+
+def priority_for(task_priority: str) -> int:
+    """Celery message priority for a Task.priority value (higher map value = served first)."""
+    priority_map = getattr(settings, "ASSIGNMENT_PRIORITY_MAP", DEFAULT_PRIORITY_MAP)
+    priority = priority_map.get(task_priority, priority_map.get("medium", 5))
+    # RabbitMQ serves the highest number first, the Redis transport polls step 0 first.
+    if str(getattr(settings, "CELERY_BROKER_URL", "") or "").startswith(("redis://", "rediss://")):
+        return 9 - priority
+    return priority
+
+
+def _pending():
+    """Tasks queued for assignment whose job has not started yet, within ASSIGNMENT_QUEUE_PENDING_MAX_AGE."""
+    pending = Task.objects.filter(assignment_status="pending", assignment_enqueued_at__isnull=False)
+    max_age = getattr(settings, "ASSIGNMENT_QUEUE_PENDING_MAX_AGE", 3600)
+    if max_age:
+        pending = pending.filter(assignment_enqueued_at__gte=timezone.now() - timezone.timedelta(seconds=max_age))
+    return pending
+
+
+def queue_depth() -> int:
+    return _pending().count()
+
+
+def max_batch_size() -> int:
+    """Largest bulk submission accepted: BULK_TASK_MAX, and never more than the queue can hold."""
+    max_depth = getattr(settings, "ASSIGNMENT_QUEUE_MAX_DEPTH", 0)
+    return min(settings.BULK_TASK_MAX, max_depth) if max_depth else settings.BULK_TASK_MAX
+
+
+def retry_after(incoming: int = 1) -> Optional[int]:
+    """Seconds the client should wait, or None when there is room for `incoming` more jobs."""
+    max_depth = getattr(settings, "ASSIGNMENT_QUEUE_MAX_DEPTH", 0)
+    if not max_depth:
+        return None
+    depth = queue_depth()
+    if depth + incoming <= max_depth:
+        return None
+    logger.warning(f"[Queue] Backpressure: depth {depth} + {incoming} exceeds {max_depth}")
+    return getattr(settings, "ASSIGNMENT_QUEUE_RETRY_AFTER", 30)
+
+
+def mark_enqueue_failed(task_ids: List[int], error: Exception) -> None:
+    """Fail tasks whose job could not be sent, so they neither count as queued nor look in progress."""
+    logger.error(f"[Queue] Could not enqueue assignment for {len(task_ids)} task(s): {error}")
+    Task.objects.filter(pk__in=task_ids, assignment_status="pending").update(
+        assignment_status="failed", assignment_result={"error": f"Could not enqueue assignment: {error}"}
+    )
+
+
+def enqueue_assignment(task: Task):
+    """Send run_assignment_pipeline for `task` on its priority lane, reusing task.assignment_job_id as the Celery id."""
+    try:
+        return run_assignment_pipeline.apply_async(
+            (task.id,), task_id=task.assignment_job_id, priority=priority_for(task.priority)
+        )
+    except Exception as e:
+        mark_enqueue_failed([task.id], e)
+        raise
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def queue_stats(window_minutes: int = 15) -> Dict[str, Any]:
+    """Depth per priority lane plus queue wait times (enqueued -> started) over the recent window."""
+    now = timezone.now()
+    depth = dict.fromkeys(DEFAULT_PRIORITY_MAP, 0)
+    for row in _pending().values("priority").annotate(n=Count("id")):
+        depth[row["priority"]] = row["n"]
+
+    oldest = (
+        _pending()
+        .order_by("assignment_enqueued_at")
+        .values_list("assignment_enqueued_at", flat=True)
+        .first()
+    )
+    started = Task.objects.filter(
+        assignment_started_at__gte=now - timezone.timedelta(minutes=window_minutes),
+        assignment_enqueued_at__isnull=False,
+    ).values_list("assignment_enqueued_at", "assignment_started_at")
+    waits = [max(0.0, (s - e).total_seconds()) for e, s in started]
+
+    return {
+        "depth": sum(depth.values()),
+        "depth_by_priority": depth,
+        "running": Task.objects.filter(assignment_status="running").count(),
+        "max_depth": getattr(settings, "ASSIGNMENT_QUEUE_MAX_DEPTH", 0),
+        "oldest_pending_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+        "wait_seconds": {
+            "window_minutes": window_minutes,
+            "samples": len(waits),
+            "avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "p50": round(_percentile(waits, 50), 3),
+            "p95": round(_percentile(waits, 95), 3),
+            "max": round(max(waits), 3) if waits else 0.0,
+        },
+    }
@@ -0,0 +1,28 @@
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Shared Redis client for settings.REDIS_URL, created lazily once per process.
+    Returns None when Redis is not configured so callers can degrade to
+    process-local behaviour.
+    """
+    global _client
+    url = getattr(settings, "REDIS_URL", None)
+    if not url:
+        return None
+    if _client is None:
+        with _lock:
+            if _client is None:
+                import redis
+
+                _client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2, health_check_interval=30)
+    return _client
@@ -0,0 +1,120 @@
+"""
+Response cache for the polled list endpoints and chat-path counts.
+
+The frontend polls /api/employees/ and /api/tasks/ continuously. Cached
+entries are keyed on a per-model generation number ("employee", "task")
+kept in the Django cache (Redis via django-redis when REDIS_URL is set), so
+invalidation is one INCR instead of a key scan:
+
+- post_save / post_delete signals bump the generation (see invalidate());
+- write paths that bypass signals (queryset update(), bulk_create /
+  bulk_update) call invalidate() themselves.
+
+The list ETag is derived from the generations and the request path, so a
+matching If-None-Match is answered with 304 without reading the database
+or even the cached body. Without Redis the cache is per process (LocMem)
+and bumps from other processes are only seen after RESPONSE_CACHE_TTL.
+"""
+import hashlib
+import logging
+import time
+from functools import partial
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "assignments:cache"
+
+
+def _version_key(name: str) -> str:
+    return f"{KEY_PREFIX}:version:{name}"
+
+
+def _bump(names: Iterable[str]) -> None:
+    for name in names:
+        key = _version_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Missing (never set or evicted): start a fresh generation that cannot collide with old entries.
+            cache.set(key, time.time_ns(), None)
+        except Exception as e:
+            logger.warning(f"[ResponseCache] Could not invalidate {name}: {e}")
+
+
+def invalidate(*names: str) -> None:
+    """
+    Invalidate cached responses depending on these models. Inside a
+    transaction the generation is bumped now and again on commit, so a
+    response cached from pre-commit data in between is not served afterwards.
+    """
+    if transaction.get_connection().in_atomic_block:
+        _bump(names)
+    transaction.on_commit(partial(_bump, names))
+
+
+def versions(names: Iterable[str]) -> Dict[str, int]:
+    names = list(names)
+    current = cache.get_many([_version_key(n) for n in names])
+    result = {}
+    for name in names:
+        key = _version_key(name)
+        if key not in current:
+            cache.add(key, time.time_ns(), None)
+            current[key] = cache.get(key)
+        result[name] = current[key]
+    return result
+
+
+def cached_count(model) -> int:
+    """Model.objects.count(), cached until the model's generation changes."""
+    name = model._meta.model_name
+    key = f"{KEY_PREFIX}:count:{name}:{versions([name])[name]}"
+    return cache.get_or_set(key, model.objects.count, getattr(settings, "RESPONSE_CACHE_TTL", 300))
+
+
+class CachedListMixin:
+    """
+    Serve `list` from the response cache with ETag / If-None-Match support.
+    cache_dependencies names every model whose rows appear in the response.
+    """
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, "RESPONSE_CACHE_ENABLED", True):
+            return super().list(request, *args, **kwargs)
+
+        generations = versions(self.cache_dependencies)
+        fingerprint = ":".join(f"{name}={generations[name]}" for name in self.cache_dependencies)
+        digest = hashlib.blake2b(f"{request.accepted_renderer.format}|{request.get_full_path()}|{fingerprint}".encode(), digest_size=16).hexdigest()
+        etag = f'"{digest}"'
+
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            CACHE_REQUESTS.inc(cache="response", result="not_modified")
+        else:
+            key = f"{KEY_PREFIX}:list:{self.basename}:{digest}"
+            data = cache.get(key)
+            CACHE_REQUESTS.inc(cache="response", result="miss" if data is None else "hit")
+            if data is None:
+                response = super().list(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data, getattr(settings, "RESPONSE_CACHE_TTL", 300))
+            else:
+                response = Response(data)
+
+        response["ETag"] = etag
+        # Clients may keep the body but must revalidate every poll.
+        patch_cache_control(response, no_cache=True, private=True)
+        return response
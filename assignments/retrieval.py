@@ -0,0 +1,119 @@
+"""
+Candidate retrieval for role_matching_node.
+
+Skills are matched through the indexed EmployeeSkill table and keywords
+against role/responsibilities (full-text search backed by a GIN index on
+PostgreSQL, substring matching elsewhere). Scoring, ordering and the top-K
+cut all happen in SQL so only the short list is loaded into Python.
+match_candidates() can instead route to the in-memory index in skill_index.py.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import SEARCH_CONFIG, Employee, EmployeeSkill, employee_search_vector
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_terms(values: Iterable[Any]) -> Set[str]:
+    return {str(v).strip().lower() for v in values or [] if str(v).strip()}
+
+
+def sync_employee_skills(employees: Iterable[Employee]) -> None:
+    """Rewrite the EmployeeSkill rows of the given employees from their skills lists."""
+    employees = list(employees)
+    if not employees:
+        return
+    rows = [
+        EmployeeSkill(employee_id=emp.pk, name=name[:200])
+        for emp in employees
+        for name in sorted(normalize_terms(emp.skills))
+    ]
+    with transaction.atomic():
+        EmployeeSkill.objects.filter(employee_id__in=[emp.pk for emp in employees]).delete()
+        EmployeeSkill.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def _uses_full_text_search() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def matching_backend() -> str:
+    """"database" or "memory": ROLE_MATCHING_BACKEND with "auto" resolved."""
+    backend = getattr(settings, "ROLE_MATCHING_BACKEND", "auto")
+    if backend == "auto":
+        backend = "database" if _uses_full_text_search() else "memory"
+    return backend
+
+
+def match_candidates(parsed: Dict[str, Any], limit: int | None = None) -> List[Tuple[Employee, int]]:
+    """Dispatch to the database or in-memory matcher according to ROLE_MATCHING_BACKEND."""
+    if matching_backend() == "memory":
+        from .skill_index import search_candidates
+        return search_candidates(parsed, limit)
+    return find_candidates(parsed, limit)
+
+
+def find_candidates(parsed: Dict[str, Any], limit: int | None = None) -> List[Tuple[Employee, int]]:
+    """
+    Return (employee, score) pairs ordered by score, then lowest workload.
+    score = 2 * matching skills + matching keywords, same as the original matcher.
+    """
+    skills = normalize_terms(parsed.get("skills", []))
+    keywords = normalize_terms(parsed.get("keywords", []))
+    if not skills and not keywords:
+        return []
+
+    qs = Employee.objects.all()
+    matched = Q(pk__in=EmployeeSkill.objects.filter(name__in=skills).values("employee")) if skills else Q()
+
+    keyword_hits = []
+    if keywords:
+        if _uses_full_text_search():
+            from django.contrib.postgres.search import SearchQuery
+
+            # Same expression as Employee.Meta.indexes, so the GIN index serves the match.
+            qs = qs.annotate(search=employee_search_vector())
+            queries = [SearchQuery(k, config=SEARCH_CONFIG) for k in sorted(keywords)]
+            keyword_hits = [Q(search=q) for q in queries]
+            any_query = queries[0]
+            for q in queries[1:]:
+                any_query = any_query | q
+            any_keyword = Q(search=any_query)
+        else:
+            keyword_hits = [Q(role__icontains=k) | Q(responsibilities__icontains=k) for k in sorted(keywords)]
+            any_keyword = Q()
+            for hit in keyword_hits:
+                any_keyword |= hit
+        matched = matched | any_keyword if skills else any_keyword
+
+    skill_count = Value(0)
+    if skills:
+        skill_count = Coalesce(
+            Subquery(
+                EmployeeSkill.objects.filter(employee=OuterRef("pk"), name__in=skills)
+                .values("employee")
+                .annotate(c=Count("pk"))
+                .values("c"),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+    keyword_count = Value(0)
+    for hit in keyword_hits:
+        keyword_count = keyword_count + Case(When(hit, then=Value(1)), default=Value(0), output_field=IntegerField())
+
+    qs = (
+        qs.filter(matched)
+        .annotate(match_score=skill_count * 2 + keyword_count)
+        .filter(match_score__gt=0)
+        .order_by("-match_score", "workload_score", "pk")
+    )
+    if limit:
+        qs = qs[:limit]
+    return [(emp, emp.match_score) for emp in qs]
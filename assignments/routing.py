@@ -0,0 +1,7 @@
+from django.urls import re_path
+
+from .consumers import AssignmentProgressConsumer
+
+websocket_urlpatterns = [
+    re_path(r"^ws/tasks/(?P<task_id>\d+)/progress/$", AssignmentProgressConsumer.as_asgi()),
+]
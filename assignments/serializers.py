@@ -1,10 +1,30 @@
 from rest_framework import serializers
 from .models import Employee, Task, AssignmentLog
+from .workload import effective_score
 
 class EmployeeSerializer(serializers.ModelSerializer):
+    """workload_score is derived (base_workload + task points); clients write base_workload."""
+
     class Meta:
         model = Employee
         fields = "__all__"
+        read_only_fields = ["workload_score", "workload_points", "active_tasks"]
+
+    def to_internal_value(self, data):
+        # Older clients send workload_score; it was always the employee's baseline.
+        if "workload_score" in data and "base_workload" not in data:
+            data = data.copy()
+            data["base_workload"] = data["workload_score"]
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        validated_data["workload_score"] = effective_score(validated_data.get("base_workload", 0.0), 0.0)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        if "base_workload" in validated_data:
+            validated_data["workload_score"] = effective_score(validated_data["base_workload"], instance.workload_points)
+        return super().update(instance, validated_data)
 
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -14,7 +34,30 @@ class TaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
-        fields = ["id","title","description","priority","status","assigned_to","assigned_to_id","created_by_id","confidence_score","created_at","updated_at"]
+        fields = ["id","title","description","priority","effort_level","status","assigned_to","assigned_to_id","created_by_id","confidence_score","assignment_status","created_at","updated_at"]
+        read_only_fields = ["assignment_status"]
+
+
+class EmployeeSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Employee
+        fields = ["id", "name", "email", "role"]
+        read_only_fields = fields
+
+
+class TaskListSerializer(serializers.ModelSerializer):
+    """Read-only rows for GET /api/tasks/; the assignee is summarised instead of fully nested."""
+    assigned_to = EmployeeSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Task
+        fields = ["id","title","description","priority","effort_level","status","assigned_to","confidence_score","assignment_status","created_at","updated_at"]
+        read_only_fields = fields
+
+
+class BulkTaskSerializer(TaskSerializer):
+    """Item of POST /api/tasks/bulk/; the creator is optional for imported tasks."""
+    created_by_id = serializers.PrimaryKeyRelatedField(queryset=Employee.objects.all(), write_only=True, source='created_by', required=False)
 
 
 class AssignmentLogSerializer(serializers.ModelSerializer):
@@ -1,9 +1,143 @@
-from django.db.models.signals import post_save
+import time
+from celery.signals import before_task_publish, task_postrun, task_prerun
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
-from .models import Task
-from .notifications import send_assignment_email
+from .models import Task, Employee, EmployeeEmbedding
+from . import metrics
+from .response_cache import invalidate
+from .tracing import current_trace_id, reset_trace_id, set_trace_id
+from .workload import apply_transitions, release, snapshot
 import logging
 
 logger = logging.getLogger(__name__)
 
+PROFILE_FIELDS = ("role", "skills", "responsibilities")
+
+
+@receiver(pre_save, sender=Employee)
+def default_base_workload(sender, instance, **kwargs):
+    """A new employee's given workload_score is their baseline (task points are added on top)."""
+    if instance._state.adding and not instance.base_workload:
+        instance.base_workload = instance.workload_score
+
+
+@receiver(post_save, sender=Employee)
+def sync_skill_index(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the normalized EmployeeSkill rows in step with Employee.skills."""
+    if update_fields is not None and "skills" not in update_fields:
+        return
+    from .retrieval import sync_employee_skills
+    sync_employee_skills([instance])
+
+
+@receiver(post_save, sender=Employee)
+def update_memory_skill_index(sender, instance, **kwargs):
+    from .skill_index import skill_index
+    transaction.on_commit(lambda: skill_index.update(instance))
+
+
+@receiver(post_delete, sender=Employee)
+def remove_from_memory_skill_index(sender, instance, **kwargs):
+    from .skill_index import skill_index
+    emp_id = instance.pk
+    transaction.on_commit(lambda: skill_index.remove(emp_id))
+
+
+def _profile(instance):
+    fields = instance.__dict__
+    if all(name in fields for name in PROFILE_FIELDS):
+        return fields["role"], list(fields["skills"] or []), fields["responsibilities"]
+    return None  # deferred fields: unknown
+
+
+@receiver(post_init, sender=Employee)
+def snapshot_employee_profile(sender, instance, **kwargs):
+    """Remember the persisted profile text so a save can tell whether the embedding went stale."""
+    instance._profile_snapshot = _profile(instance)
+
+
+@receiver(post_save, sender=Employee)
+def invalidate_employee_embedding(sender, instance, created, update_fields=None, **kwargs):
+    """Drop the stored profile vector when the profile text changes; only that row is re-embedded, on next use."""
+    if update_fields is not None and not set(PROFILE_FIELDS) & set(update_fields):
+        return
+    before, after = getattr(instance, "_profile_snapshot", None), _profile(instance)
+    instance._profile_snapshot = after
+    if not created and before is not None and before == after:
+        return
+    from .embeddings import embedding_matrix
+    EmployeeEmbedding.objects.filter(employee=instance).delete()
+    emp_id = instance.pk
+    transaction.on_commit(lambda: embedding_matrix.update(emp_id))
+
+
+@receiver(post_delete, sender=Employee)
+def drop_employee_embedding(sender, instance, **kwargs):
+    from .embeddings import embedding_matrix
+    emp_id = instance.pk
+    transaction.on_commit(lambda: embedding_matrix.update(emp_id))
+
+
+@receiver(post_init, sender=Task)
+def snapshot_task_workload(sender, instance, **kwargs):
+    snapshot(instance)
+
+
+@receiver(post_save, sender=Task)
+def track_task_workload(sender, instance, created, update_fields=None, **kwargs):
+    """Charge or release assignee workload when a task's assignee or status changes."""
+    if update_fields is not None and not {"assigned_to", "status"} & set(update_fields):
+        return
+    apply_transitions([instance], created=created)
+
+
+@receiver(post_delete, sender=Task)
+def release_task_workload(sender, instance, **kwargs):
+    release(instance)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_employee_responses(sender, **kwargs):
+    invalidate("employee")
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_responses(sender, **kwargs):
+    invalidate("task")
+
+
+@before_task_publish.connect
+def add_trace_headers(sender=None, headers=None, **kwargs):
+    """Carry the caller's trace id and the publish time (for queue wait) in the Celery message."""
+    if headers is None:
+        return
+    trace_id = current_trace_id()
+    if trace_id:
+        headers.setdefault("trace_id", trace_id)
+    if not headers.get("eta"):  # delayed jobs would count their countdown as queue wait
+        headers["published_at"] = time.time()
+
+
+@task_prerun.connect
+def start_task_trace(sender=None, task=None, **kwargs):
+    trace_id = task.request.get("trace_id")
+    if trace_id:
+        task.request.trace_token = set_trace_id(trace_id)
+    published_at = task.request.get("published_at")
+    if published_at:
+        metrics.QUEUE_WAIT_SECONDS.observe(max(0.0, time.time() - published_at), task=task.name)
+
+
+@task_postrun.connect
+def end_task_trace(sender=None, task=None, **kwargs):
+    token = task.request.get("trace_token")
+    if token is not None:
+        try:
+            reset_trace_id(token)
+        except ValueError:  # postrun in a different context (non-prefork pools)
+            set_trace_id(None)
+        task.request.trace_token = None
+    metrics.flush()
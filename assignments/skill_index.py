@@ -0,0 +1,190 @@
+"""
+Process-local inverted index over employee skills and role/responsibility text.
+
+Used by role_matching_node when candidate retrieval runs in memory rather than
+in the database (ROLE_MATCHING_BACKEND). The index is built once per process,
+updated incrementally from Employee post_save/post_delete signals, and
+invalidated across processes through a version counter in Redis.
+"""
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Set, Tuple
+
+from .models import Employee
+from .redis_client import get_redis
+from .retrieval import normalize_terms
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "assignments:skill_index:version"
+
+
+class _Entry(NamedTuple):
+    skills: frozenset
+    text: str
+    tokens: frozenset
+    workload: float
+
+
+def _entry_for(emp: Employee) -> _Entry:
+    text = f"{emp.role} {emp.responsibilities or ''}".lower()
+    # Whitespace tokens keep punctuation, so "k in text" == "k in some token" for single-word k.
+    return _Entry(frozenset(normalize_terms(emp.skills)), text, frozenset(text.split()), emp.workload_score)
+
+
+class EmployeeSkillIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._version = None
+        self._entries: Dict[int, _Entry] = {}
+        self._skills: Dict[str, Set[int]] = defaultdict(set)
+        self._tokens: Dict[str, Set[int]] = defaultdict(set)
+        self._keyword_cache: Dict[str, frozenset] = {}
+
+    # -- maintenance -------------------------------------------------------
+
+    def rebuild(self) -> None:
+        with self._lock:
+            version = self._remote_version()
+            self._entries, self._skills, self._tokens = {}, defaultdict(set), defaultdict(set)
+            self._keyword_cache = {}
+            fields = ("id", "role", "responsibilities", "skills", "workload_score")
+            for emp in Employee.objects.only(*fields).iterator(chunk_size=2000):
+                self._add(emp.pk, _entry_for(emp))
+            self._built = True
+            self._version = version
+            logger.info(f"[SkillIndex] Built for {len(self._entries)} employees (version {version})")
+
+    def update(self, emp: Employee) -> None:
+        with self._lock:
+            if self._built:
+                self._remove(emp.pk)
+                self._add(emp.pk, _entry_for(emp))
+                self._keyword_cache = {}
+        self._bump_version()
+
+    def remove(self, emp_id: int) -> None:
+        with self._lock:
+            if self._built:
+                self._remove(emp_id)
+                self._keyword_cache = {}
+        self._bump_version()
+
+    def invalidate(self) -> None:
+        """Drop the local index and tell other processes to rebuild theirs."""
+        with self._lock:
+            self._built = False
+        self._bump_version()
+
+    def _add(self, emp_id: int, entry: _Entry) -> None:
+        self._entries[emp_id] = entry
+        for skill in entry.skills:
+            self._skills[skill].add(emp_id)
+        for token in entry.tokens:
+            self._tokens[token].add(emp_id)
+
+    def _remove(self, emp_id: int) -> None:
+        entry = self._entries.pop(emp_id, None)
+        if not entry:
+            return
+        for skill in entry.skills:
+            self._skills[skill].discard(emp_id)
+            if not self._skills[skill]:
+                del self._skills[skill]
+        for token in entry.tokens:
+            self._tokens[token].discard(emp_id)
+            if not self._tokens[token]:
+                del self._tokens[token]
+
+    # -- cross-process versioning -----------------------------------------
+
+    def _remote_version(self):
+        client = get_redis()
+        if client is None:
+            return None
+        try:
+            return int(client.get(VERSION_KEY) or 0)
+        except Exception as e:
+            logger.warning(f"[SkillIndex] Could not read index version from Redis: {e}")
+            return None
+
+    def _bump_version(self) -> None:
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            new_version = int(client.incr(VERSION_KEY))
+        except Exception as e:
+            logger.warning(f"[SkillIndex] Could not bump index version in Redis: {e}")
+            return
+        with self._lock:
+            # Our own change is already applied; anything else in between means rebuild.
+            if self._built and self._version is not None and new_version == self._version + 1:
+                self._version = new_version
+            else:
+                self._built = False
+
+    def warm(self) -> None:
+        """Build or reload the index now (if stale) so the next search does not pay for it."""
+        with self._lock:
+            self._ensure_fresh()
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            if not self._built:
+                self.rebuild()
+                return
+            remote = self._remote_version()
+            if remote is not None and remote != self._version:
+                self.rebuild()
+
+    # -- queries -----------------------------------------------------------
+
+    def _keyword_matches(self, keyword: str) -> frozenset:
+        cached = self._keyword_cache.get(keyword)
+        if cached is not None:
+            return cached
+        parts = keyword.split()
+        if len(parts) == 1:
+            ids = set()
+            for token, posting in self._tokens.items():
+                if keyword in token:
+                    ids |= posting
+        else:
+            # Multi-word keyword: narrow by its first word, then check the full phrase.
+            ids = {
+                emp_id
+                for emp_id in self._keyword_matches(parts[0])
+                if keyword in self._entries[emp_id].text
+            }
+        result = frozenset(ids)
+        self._keyword_cache[keyword] = result
+        return result
+
+    def search(self, parsed: Dict[str, Any], limit: int | None = None) -> List[Tuple[int, int]]:
+        """Return (employee_id, score) ranked like retrieval.find_candidates."""
+        skills = normalize_terms(parsed.get("skills", []))
+        keywords = normalize_terms(parsed.get("keywords", []))
+        with self._lock:
+            self._ensure_fresh()
+            scores: Dict[int, int] = defaultdict(int)
+            for skill in skills:
+                for emp_id in self._skills.get(skill, ()):
+                    scores[emp_id] += 2
+            for keyword in keywords:
+                for emp_id in self._keyword_matches(keyword):
+                    scores[emp_id] += 1
+            ranked = sorted(scores.items(), key=lambda x: (-x[1], self._entries[x[0]].workload, x[0]))
+        return ranked[:limit] if limit else ranked
+
+
+skill_index = EmployeeSkillIndex()
+
+
+def search_candidates(parsed: Dict[str, Any], limit: int | None = None) -> List[Tuple[Employee, int]]:
+    """(employee, score) pairs from the in-memory index, loading only the returned rows."""
+    ranked = skill_index.search(parsed, limit)
+    employees = Employee.objects.in_bulk([emp_id for emp_id, _ in ranked])
+    return [(employees[emp_id], score) for emp_id, score in ranked if emp_id in employees]
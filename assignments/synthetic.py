@@ -0,0 +1,156 @@
+"""
+Synthetic employee directories and task corpora for the bench_* commands.
+
+Roles are drawn with a head-heavy weighting (many engineers, few DBAs), each
+employee's skills come mostly from their role family with Zipf-like
+popularity (python is far more common than airflow) plus the occasional
+cross-family skill, and workloads follow Beta(2, 3). Everything is drawn
+from a seeded numpy Generator, so a given seed always yields the same rows.
+
+DeterministicLLM stands in for the chat model: it answers parser prompts with
+the vocabulary skills found in the task text and scores candidates by skill
+overlap, with no network and no randomness.
+"""
+import json
+import re
+import time
+import zlib
+from typing import Iterator, List
+
+import numpy as np
+
+from .models import Employee, Task
+
+# role -> (relative headcount, skill family)
+ROLES = {
+    "Backend Engineer": (30, "backend"),
+    "Frontend Developer": (22, "frontend"),
+    "Full Stack Developer": (15, "backend"),
+    "Data Engineer": (9, "data"),
+    "DevOps Engineer": (8, "devops"),
+    "Mobile Developer": (6, "mobile"),
+    "QA Engineer": (5, "qa"),
+    "Database Administrator": (2, "data"),
+    "Product Manager": (3, "product"),
+}
+
+# Most popular first: popularity falls off as 1 / rank**ZIPF_EXPONENT.
+SKILL_FAMILIES = {
+    "backend": ["python", "django", "api", "postgresql", "rest", "celery", "redis", "java", "spring", "go", "graphql", "kafka"],
+    "frontend": ["javascript", "react", "typescript", "css", "html", "tailwindcss", "nextjs", "vue", "redux", "webpack"],
+    "data": ["sql", "python", "postgresql", "etl", "spark", "airflow", "pandas", "dbt", "snowflake", "replication"],
+    "devops": ["docker", "kubernetes", "aws", "terraform", "linux", "ci", "prometheus", "nginx", "ansible", "gcp"],
+    "mobile": ["android", "ios", "kotlin", "swift", "react-native", "flutter", "firebase"],
+    "qa": ["testing", "selenium", "pytest", "cypress", "automation", "jmeter"],
+    "product": ["planning", "roadmap", "jira", "analytics", "stakeholder management", "ux research"],
+}
+ZIPF_EXPONENT = 1.1
+
+VOCABULARY = sorted({skill for family in SKILL_FAMILIES.values() for skill in family})
+
+TASK_VERBS = ["Build", "Fix", "Migrate", "Optimize", "Document", "Refactor", "Review", "Automate"]
+TASK_OBJECTS = ["billing service", "login flow", "report export", "search page", "deployment pipeline",
+                "nightly sync", "onboarding screens", "audit log", "invoice upload", "dashboard"]
+
+
+def _zipf_weights(n: int) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** ZIPF_EXPONENT
+    return weights / weights.sum()
+
+
+_ROLE_NAMES = list(ROLES)
+_ROLE_WEIGHTS = np.array([ROLES[r][0] for r in _ROLE_NAMES], dtype=float) / sum(ROLES[r][0] for r in _ROLE_NAMES)
+_FAMILY_WEIGHTS = {family: _zipf_weights(len(skills)) for family, skills in SKILL_FAMILIES.items()}
+
+
+def _skills(rng: np.random.Generator, family: str, count: int) -> List[str]:
+    pool = SKILL_FAMILIES[family]
+    count = min(count, len(pool))
+    return [str(s) for s in rng.choice(pool, size=count, replace=False, p=_FAMILY_WEIGHTS[family])]
+
+
+def generate_employees(count: int, seed: int = 0, email_domain: str = "bench.invalid") -> Iterator[Employee]:
+    """Unsaved Employee instances (bulk_create them; EmployeeSkill rows need sync_employee_skills)."""
+    rng = np.random.default_rng(seed)
+    roles = rng.choice(len(_ROLE_NAMES), size=count, p=_ROLE_WEIGHTS)
+    for i, role_idx in enumerate(roles):
+        role = _ROLE_NAMES[role_idx]
+        family = ROLES[role][1]
+        skills = _skills(rng, family, 2 + int(rng.poisson(3)))
+        if rng.random() < 0.2:  # cross-family skill
+            other = str(rng.choice(list(SKILL_FAMILIES)))
+            skills += [s for s in _skills(rng, other, 1) if s not in skills]
+        workload = round(float(rng.beta(2, 3)), 2)
+        yield Employee(
+            name=f"Synthetic Employee {i}",
+            email=f"synthetic-{i}@{email_domain}",
+            role=role,
+            skills=skills,
+            responsibilities=f"Owns {family} work: {', '.join(skills[:3])}",
+            workload_score=workload,
+            base_workload=workload,
+        )
+
+
+def generate_tasks(count: int, seed: int = 0) -> Iterator[Task]:
+    """Unsaved Task instances mentioning one to three skills of one family, weighted like the directory."""
+    rng = np.random.default_rng(seed + 1)
+    families = rng.choice(len(_ROLE_NAMES), size=count, p=_ROLE_WEIGHTS)
+    priorities = ["low", "medium", "medium", "high"]
+    for i, role_idx in enumerate(families):
+        family = ROLES[_ROLE_NAMES[role_idx]][1]
+        skills = _skills(rng, family, 1 + int(rng.integers(0, 3)))
+        title = f"{rng.choice(TASK_VERBS)} {rng.choice(TASK_OBJECTS)} with {skills[0]}"
+        yield Task(
+            title=title[:255],
+            description=f"Synthetic task {i}. Needs {', '.join(skills)}.",
+            priority=priorities[i % len(priorities)],
+        )
+
+
+class DeterministicLLM:
+    """
+    Chat-model stand-in for the pipeline (invoke(prompt) -> object with .content).
+    latency simulates the provider round trip, in seconds.
+    """
+    model_name = "deterministic-bench"
+
+    _skill_pattern = re.compile(r"(?<![\w-])(" + "|".join(re.escape(s) for s in sorted(VOCABULARY, key=len, reverse=True)) + r")(?![\w-])")
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def _terms(self, text: str) -> List[str]:
+        return sorted(set(self._skill_pattern.findall(text.lower())))
+
+    @staticmethod
+    def _line(prompt: str, prefix: str) -> str:
+        match = re.search(rf"^{prefix}(.*)$", prompt, re.M)
+        return match.group(1) if match else ""
+
+    def _confidence(self, task_skills: List[str], candidate_skills: List[str], salt: str) -> float:
+        overlap = len(set(task_skills) & set(candidate_skills)) / max(1, len(task_skills))
+        jitter = (zlib.crc32(salt.encode()) % 100) / 1000  # stable tie-break in [0, 0.1)
+        return round(min(1.0, 0.3 + 0.6 * overlap + jitter), 2)
+
+    def invoke(self, prompt: str):
+        if self.latency:
+            time.sleep(self.latency)
+        if "precise JSON generator" in prompt:
+            text = self._line(prompt, "Title: ") + " " + self._line(prompt, "Description: ")
+            skills = self._terms(text)
+            content = json.dumps({"keywords": skills, "skills": skills, "technical_tags": skills[:2], "effort_level": "medium"})
+        else:
+            task_skills = self._terms(self._line(prompt, "Task: ") + " " + self._line(prompt, "Description: "))
+            rows = re.findall(r"^(\d+) \| ([^|]+) \| [^|]+ \| ([^|]*) \|", prompt, re.M)
+            if rows:  # batch ranking prompt
+                content = json.dumps([
+                    {"employee_id": int(emp_id), "confidence": self._confidence(task_skills, self._terms(skills), emp_id), "reason": "skill overlap"}
+                    for emp_id, _name, skills in rows
+                ])
+            else:
+                candidate = self._line(prompt, "Candidate: ")
+                confidence = self._confidence(task_skills, self._terms(self._line(prompt, "Skills: ")), candidate)
+                content = json.dumps({"confidence": confidence, "reason": "skill overlap"})
+        return type("Response", (), {"content": content})()
+
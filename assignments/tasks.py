@@ -1,39 +1,53 @@
-from slack_sdk.web import WebClient
 from django.conf import settings
+from celery import shared_task
 from .models import Task, Employee
-import os
+from .notifications import deliver_batch, enqueue, schedule_flush
+from .workload import reconcile_workloads
 
-slack_token = os.getenv('SLACK_BOT_TOKEN')
-slack_client = WebClient(token=slack_token) if slack_token else None
 
 def notify_assignment(task_id: int, assignee_id: int | None, decision_status: str):
-    task = Task.objects.get(id=task_id)
+    """Queue Slack messages to the assignee and creator, plus a summary email, in the notification outbox."""
+    task = Task.objects.select_related("created_by").get(id=task_id)
     creator = task.created_by
+    assignee = Employee.objects.get(id=assignee_id) if assignee_id else None
     # Slack notify assigned user
-    if assignee_id and slack_client:
-        assignee = Employee.objects.get(id=assignee_id)
-        try:
-            slack_client.chat_postMessage(
-                channel=assignee.email,  # might need mapping from employee to slack_id in real setup
-                text=f"You have been assigned task: *{task.title}* (Confidence: {task.confidence_score:.2f})"
-            )
-        except Exception as e:
-            # log error
-            print("Slack notify failed:", e)
+    if assignee:
+        enqueue(
+            "slack", assignee.email,  # might need mapping from employee to slack_id in real setup
+            body=f"You have been assigned task: *{task.title}* (Confidence: {task.confidence_score:.2f})", task=task,
+        )
     # notify creator
-    if slack_client and creator:
-        try:
-            slack_client.chat_postMessage(
-                channel=creator.email,
-                text=f"Task *{task.title}* processed. Decision: {decision_status} (Confidence: {task.confidence_score})"
-            )
-        except Exception as e:
-            print("Slack notify failed:", e)
-    # fallback: send email via Django EmailBackend
-    from django.core.mail import send_mail
-    send_mail(
-        subject=f"Task processed: {task.title}",
-        message=f"Decision: {decision_status}\nConfidence: {task.confidence_score}",
-        from_email=os.getenv('EMAIL_HOST_USER'),
-        recipient_list=[creator.email] + ([assignee.email] if assignee_id else [])
-    )
+    if creator:
+        enqueue(
+            "slack", creator.email,
+            body=f"Task *{task.title}* processed. Decision: {decision_status} (Confidence: {task.confidence_score})", task=task,
+        )
+    # email summary
+    for recipient in filter(None, [creator and creator.email, assignee and assignee.email]):
+        enqueue(
+            "email", recipient,
+            subject=f"Task processed: {task.title}",
+            body=f"Decision: {decision_status}\nConfidence: {task.confidence_score}", task=task,
+        )
+
+
+@shared_task
+def flush_notifications() -> dict:
+    """Deliver due outbox rows in one batch; scheduled after enqueueing and swept by CELERY_BEAT_SCHEDULE."""
+    counts = deliver_batch()
+    if counts["claimed"] >= getattr(settings, "NOTIFICATION_BATCH_SIZE", 100):
+        schedule_flush()  # backlog larger than one batch
+    return counts
+
+
+@shared_task
+def reconcile_workload_counters() -> int:
+    """Periodic (CELERY_BEAT_SCHEDULE) repair of incrementally maintained workload counters."""
+    return reconcile_workloads()
+
+
+@shared_task
+def purge_pipeline_checkpoints() -> int:
+    """Periodic (CELERY_BEAT_SCHEDULE) removal of checkpoints left by failed or abandoned pipeline runs."""
+    from .pipeline_graph import checkpointer
+    return checkpointer.purge_stale(getattr(settings, "PIPELINE_CHECKPOINT_TTL", 86400))
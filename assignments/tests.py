@@ -1,25 +1,1320 @@
-from django.test import TestCase
-from .models import Employee, Task
-from django.urls import reverse
+import asyncio
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from celery.app.task import Context as CeleryContext
+from channels.testing import WebsocketCommunicator
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+import numpy as np
+from .models import AssignmentBatch, AssignmentLog, Employee, EmployeeEmbedding, NotificationOutbox, StaleTaskError, Task
+from django.utils import timezone
 from rest_framework.test import APIClient
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
+from .ai_engine import get_llm, run_assignment_pipeline, run_assignment_batch, finalize_assignment_batch, confidence_scorer_node, role_matching_node, task_parser_node
+from .llm_clients import get_http_client, get_openai_client, reset_clients
+from .llm_router import LLMUnavailable, get_router
+from .llm_cache import parser_cache
+from . import classifier
+from .utils import _classify_with_openai, classify_message_openai, handle_chat_message
+from . import metrics, prompts
+from .signals import add_trace_headers, end_task_trace, start_task_trace
+from .tracing import current_trace_id, trace
+from .response_cache import invalidate
+from .notifications import deliver_batch, enqueue, queue_assignment_email
+from .progress import group_name as progress_group
+from .routing import websocket_urlpatterns
+from .async_views import create_task, task_assignment
+from .retrieval import find_candidates
+from .embeddings import HashingEmbeddingProvider, embedding_matrix, get_embedding_provider
+from .workload import reconcile_workloads
+from .skill_index import skill_index, search_candidates, VERSION_KEY
 
-class AssignmentFlowTests(TestCase):
+class AssignmentFlowTests(TransactionTestCase):
     def setUp(self):
+        skill_index.invalidate()
         self.client = APIClient()
         Employee.objects.create(name="Dhruv", email="dhruv@example.com", role="Backend Engineer", skills=["python","django","api"], workload_score=0.2)
-        Employee.objects.create(name="Manaal", email="manaal@example.com", role="PM", skills=["planning"], workload_score=0.6)
+        self.pm = Employee.objects.create(name="Manaal", email="manaal@example.com", role="PM", skills=["planning"], workload_score=0.6)
 
-    @patch("assignment.ai_engine.get_llm")
-    def test_create_task_triggers_assignment(self, mock_llm):
+    @patch("assignments.views.enqueue_assignment", side_effect=lambda task: run_assignment_pipeline.apply((task.id,), task_id=task.assignment_job_id))
+    @patch("assignments.pipeline_graph.get_llm")
+    @patch("assignments.ai_engine.get_llm")
+    def test_create_task_triggers_assignment(self, mock_llm, mock_graph_llm, mock_enqueue):
         # Mock LLM behaviour to avoid network calls
         class DummyLLM:
-            def generate(self, prompts):
-                class G:
-                    text = '{"keywords":["api","upload"], "skills":["python","django"], "technical_tags":["api"], "effort_level":"medium"}'
-                return type("R",(object,),{"generations":[[G()]]})
-        mock_llm.return_value = DummyLLM()
-        res = self.client.post("/api/tasks/", {"title":"Create API for uploading invoice PDFs", "description":"Upload PDFs", "created_by_id": None}, format="json")
+            model_name = "dummy"
+
+            def invoke(self, prompt):
+                if "precise JSON generator" in prompt:
+                    content = '{"keywords":["api","upload"], "skills":["python","django"], "technical_tags":["api"], "effort_level":"medium"}'
+                else:
+                    content = '{"confidence": 0.9, "reason": "python and django"}'
+                return type("R",(object,),{"content": content})
+        mock_llm.return_value = mock_graph_llm.return_value = DummyLLM()
+        res = self.client.post("/api/tasks/", {"title":"Create API for uploading invoice PDFs", "description":"Upload PDFs", "created_by_id": self.pm.id}, format="json")
         self.assertEqual(res.status_code, 201)
         data = res.json()
-        self.assertIn("assignment_result", data)
+        self.assertIn("confidence_breakdown", data)
+        self.assertEqual(data["assigned_to"], "Dhruv")
+
+
+class AsyncAssignmentJobTests(TransactionTestCase):
+    # The pipeline graph runs parallel branches on worker threads, which need committed rows.
+    def setUp(self):
+        skill_index.invalidate()
+        self.client = APIClient()
+        self.dev = Employee.objects.create(name="Dhruv", email="dhruv@example.com", role="Backend Engineer", skills=["python","django","api"], workload_score=0.2)
+
+    @patch("assignments.views.classify_message_openai", return_value={"type": "task"})
+    @patch("assignments.queueing.run_assignment_pipeline", new_callable=MagicMock)
+    def test_async_create_returns_job_handle(self, mock_pipeline, _mock_classify):
+        res = self.client.post("/api/tasks/?async=true", {"title": "Build django api", "description": "python api", "created_by_id": self.dev.id}, format="json")
+        self.assertEqual(res.status_code, 202)
+        data = res.json()
+        task = Task.objects.get(pk=data["id"])
+        self.assertEqual(task.assignment_status, "pending")
+        self.assertEqual(data["job_id"], task.assignment_job_id)
+        self.assertTrue(res["Location"].endswith(f"/api/tasks/{task.id}/assignment/"))
+        mock_pipeline.apply_async.assert_called_once_with((task.id,), task_id=task.assignment_job_id, priority=5)
+        mock_pipeline.apply_async.return_value.get.assert_not_called()
+
+    def test_assignment_status_endpoint_reports_pipeline_result(self):
+        task = Task.objects.create(title="Backend api work", description="python api", assignment_status="pending")
+        res = self.client.get(f"/api/tasks/{task.id}/assignment/")
+        self.assertEqual(res.json()["assignment_status"], "pending")
+
+        result = run_assignment_pipeline(task.id)  # runs inline, no LLM key -> heuristic mode
+        task.refresh_from_db()
+        self.assertEqual(task.assignment_status, "completed")
+        self.assertEqual(task.assignment_result, result)
+
+        data = self.client.get(f"/api/tasks/{task.id}/assignment/?wait=1").json()
+        self.assertEqual(data["assignment_status"], "completed")
+        self.assertEqual(data["assigned_to"], "Dhruv")
+        self.assertEqual(data["confidence_breakdown"], result["confidence_breakdown"])
+        self.assertEqual(data["email_sent"], data["email_queued"])  # kept for existing clients
+
+    @override_settings(ASSIGNMENT_WSGI_LONG_POLL_MAX=0.2)
+    def test_wsgi_long_poll_is_capped(self):
+        task = Task.objects.create(title="Backend api work", description="python api", assignment_status="running")
+        started = time.monotonic()
+        data = self.client.get(f"/api/tasks/{task.id}/assignment/?wait=30").json()
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(data["assignment_status"], "running")
+
+
+class BulkTaskSubmissionTests(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        self.client = APIClient()
+        self.dev = Employee.objects.create(name="Dhruv", email="dhruv@example.com", role="Backend Engineer", skills=["python","django","api"], workload_score=0.2)
+
+    @override_settings(BULK_ASSIGNMENT_CHUNK_SIZE=2)
+    @patch("assignments.views.chord")
+    def test_bulk_create_inserts_tasks_and_queues_chunks(self, mock_chord):
+        payload = {"tasks": [{"title": f"Backend api work {i}", "description": "python api"} for i in range(5)]}
+        res = self.client.post("/api/tasks/bulk/", payload, format="json")
+        self.assertEqual(res.status_code, 202)
+        data = res.json()
+        batch = AssignmentBatch.objects.get(pk=data["batch_id"])
+        self.assertEqual(batch.total, 5)
+        self.assertEqual(set(batch.tasks.values_list("assignment_status", flat=True)), {"pending"})
+        chunks = list(mock_chord.call_args.args[0])
+        self.assertEqual([len(c.args[0]) for c in chunks], [2, 2, 1])
+        self.assertTrue(res["Location"].endswith(f"/api/tasks/bulk/{batch.id}/"))
+
+    def test_bulk_create_rejects_invalid_payload(self):
+        self.assertEqual(self.client.post("/api/tasks/bulk/", {"tasks": []}, format="json").status_code, 400)
+        res = self.client.post("/api/tasks/bulk/", [{"description": "missing title"}], format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(AssignmentBatch.objects.exists())
+
+    def test_batch_job_writes_results_and_progress(self):
+        batch = AssignmentBatch.objects.create(total=2)
+        tasks = [
+            Task.objects.create(title="Backend api work", description="python django api", batch=batch, assignment_status="pending"),
+            Task.objects.create(title="Paint the office", description="walls", batch=batch, assignment_status="pending"),
+        ]
+        summary = run_assignment_batch([t.id for t in tasks])
+        self.assertEqual(summary["processed"], 2)
+
+        matched, unmatched = [Task.objects.get(pk=t.id) for t in tasks]
+        self.assertEqual(matched.assignment_status, "completed")
+        self.assertEqual(matched.assignment_result["recommended_assignee"], "Dhruv")
+        self.assertEqual(unmatched.assignment_result["recommended_assignee"], None)
+        self.assertEqual(AssignmentLog.objects.filter(task=matched).count(), summary["assigned"])
+        self.assertEqual(list(AssignmentLog.objects.filter(task=unmatched).values_list("decision_status", flat=True)), ["no_candidates"])
+
+        progress = self.client.get(f"/api/tasks/bulk/{batch.id}/").json()
+        self.assertEqual(progress["counts"]["completed"], 2)
+        self.assertEqual(progress["progress"], 1.0)
+        self.assertEqual(progress["status"], "queued")
+
+        finalize_assignment_batch([summary], str(batch.id))
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, "completed")
+        self.assertIsNotNone(batch.completed_at)
+
+    def test_batch_matching_shares_one_employee_snapshot(self):
+        from .ai_engine import batch_role_matching
+        Employee.objects.create(name="Asha", email="asha@example.com", role="Frontend Developer", skills=["react"], workload_score=0.1)
+        parsed = {1: {"skills": ["python"], "keywords": []}, 2: {"skills": ["react"], "keywords": []}, 3: {"skills": ["cobol"], "keywords": []}}
+        skill_index.warm()
+        with self.assertNumQueries(1):
+            matched = batch_role_matching(parsed)
+        self.assertEqual({task_id: [emp.name for emp in emps] for task_id, emps in matched.items()},
+                         {1: ["Dhruv"], 2: ["Asha"], 3: []})
+
+
+class AssignmentQueueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.dev = Employee.objects.create(name="Dhruv", email="dhruv@example.com", role="Backend Engineer", skills=["python"], workload_score=0.2)
+
+    @override_settings(CELERY_BROKER_URL="amqp://guest@localhost//")
+    @patch("assignments.views.classify_message_openai", return_value={"type": "task"})
+    @patch("assignments.queueing.run_assignment_pipeline", new_callable=MagicMock)
+    def test_task_priority_selects_lane(self, mock_pipeline, _mock_classify):
+        self.client.post("/api/tasks/?async=true", {"title": "Hotfix", "description": "prod down", "priority": "high", "created_by_id": self.dev.id}, format="json")
+        self.assertEqual(mock_pipeline.apply_async.call_args.kwargs["priority"], 9)
+        with override_settings(CELERY_BROKER_URL="redis://localhost:6379/0"):
+            self.client.post("/api/tasks/?async=true", {"title": "Hotfix", "description": "prod down", "priority": "high", "created_by_id": self.dev.id}, format="json")
+        self.assertEqual(mock_pipeline.apply_async.call_args.kwargs["priority"], 0)
+
+    @override_settings(ASSIGNMENT_QUEUE_MAX_DEPTH=2, ASSIGNMENT_QUEUE_RETRY_AFTER=12)
+    @patch("assignments.views.classify_message_openai", return_value={"type": "task"})
+    @patch("assignments.queueing.run_assignment_pipeline", new_callable=MagicMock)
+    def test_backpressure_when_queue_is_full(self, mock_pipeline, _mock_classify):
+        now = timezone.now()
+        Task.objects.bulk_create([Task(title=f"t{i}", description="x", assignment_status="pending", assignment_enqueued_at=now) for i in range(2)])
+        res = self.client.post("/api/tasks/?async=true", {"title": "One more", "description": "x", "created_by_id": self.dev.id}, format="json")
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res["Retry-After"], "12")
+        mock_pipeline.apply_async.assert_not_called()
+        self.assertEqual(Task.objects.count(), 2)
+
+        # Jobs whose messages were lost long ago no longer hold the queue full.
+        Task.objects.update(assignment_enqueued_at=now - timezone.timedelta(hours=2))
+        res = self.client.post("/api/tasks/?async=true", {"title": "One more", "description": "x", "created_by_id": self.dev.id}, format="json")
+        self.assertEqual(res.status_code, 202)
+
+    @override_settings(ASSIGNMENT_QUEUE_MAX_DEPTH=3, BULK_TASK_MAX=10)
+    def test_bulk_larger_than_queue_is_rejected_without_retry(self):
+        res = self.client.post("/api/tasks/bulk/", [{"title": f"t{i}", "description": "x"} for i in range(4)], format="json")
+        self.assertEqual(res.status_code, 413)
+        self.assertNotIn("Retry-After", res)
+        self.assertEqual(res.json()["detail"], "At most 3 tasks per request.")
+
+    @patch("assignments.views.classify_message_openai", return_value={"type": "task"})
+    @patch("assignments.queueing.run_assignment_pipeline", new_callable=MagicMock)
+    def test_task_is_failed_when_it_cannot_be_enqueued(self, mock_pipeline, _mock_classify):
+        mock_pipeline.apply_async.side_effect = ConnectionError("broker down")
+        client = APIClient(raise_request_exception=False)
+        res = client.post("/api/tasks/?async=true", {"title": "Lost", "description": "x", "created_by_id": self.dev.id}, format="json")
+        self.assertEqual(res.status_code, 500)
+        task = Task.objects.get(title="Lost")
+        self.assertEqual(task.assignment_status, "failed")
+        self.assertIn("broker down", task.assignment_result["error"])
+
+    def test_queue_stats_reports_depth_and_wait(self):
+        now = timezone.now()
+        Task.objects.create(title="a", description="x", priority="high", assignment_status="pending", assignment_enqueued_at=now)
+        Task.objects.create(title="b", description="x", assignment_status="completed",
+                            assignment_enqueued_at=now - timezone.timedelta(seconds=4), assignment_started_at=now)
+        data = self.client.get("/api/tasks/queue-stats/").json()
+        self.assertEqual(data["depth"], 1)
+        self.assertEqual(data["depth_by_priority"]["high"], 1)
+        self.assertEqual(data["wait_seconds"]["samples"], 1)
+        self.assertAlmostEqual(data["wait_seconds"]["max"], 4.0, places=2)
+
+
+class ConcurrentConfidenceScoringTests(TestCase):
+    def setUp(self):
+        self.task = Task.objects.create(title="Build django api", description="python api")
+        self.candidates = [
+            {"employee": Employee.objects.create(name=f"Dev {i}", email=f"dev{i}@example.com", role="Backend Engineer", skills=["python"]), "adjusted_score": 0.5}
+            for i in range(6)
+        ]
+
+    @override_settings(LLM_SCORING_CONCURRENCY=3, LLM_SCORING_TIMEOUT=0.5)
+    def test_scores_in_parallel_with_bounded_concurrency_and_timeout_fallback(self):
+        lock = threading.Lock()
+        state = {"in_flight": 0, "peak": 0}
+
+        class SlowLLM:
+            def invoke(self, prompt):
+                with lock:
+                    state["in_flight"] += 1
+                    state["peak"] = max(state["peak"], state["in_flight"])
+                try:
+                    time.sleep(2.0 if "Dev 0" in prompt else 0.2)
+                    return type("R", (), {"content": '{"confidence": 0.9, "reason": "good fit"}'})()
+                finally:
+                    with lock:
+                        state["in_flight"] -= 1
+
+        with patch("assignments.ai_engine.get_llm", return_value=SlowLLM()):
+            started = time.monotonic()
+            scored = confidence_scorer_node(self.task, self.candidates)
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 1.5)
+        self.assertLessEqual(state["peak"], 3)
+        by_name = {s["employee"].name: s for s in scored}
+        self.assertEqual(by_name["Dev 0"]["confidence"], 0.5)
+        self.assertEqual(by_name["Dev 0"]["reason"], "Fallback heuristic (LLM timed out)")
+        self.assertTrue(all(by_name[f"Dev {i}"]["confidence"] == 0.9 for i in range(1, 6)))
+
+    @override_settings(LLM_SCORING_CONCURRENCY=2, LLM_SCORING_TIMEOUT=0.2, LLM_SCORING_DEADLINE=0.4)
+    def test_calls_queued_behind_a_hung_provider_fall_back_at_the_deadline(self):
+        release, calls = threading.Event(), []
+        self.addCleanup(release.set)
+
+        class HungLLM:
+            def invoke(self, prompt):
+                calls.append(prompt)
+                release.wait(5)
+                raise RuntimeError("provider hung")
+
+        with patch("assignments.ai_engine.get_llm", return_value=HungLLM()):
+            started = time.monotonic()
+            scored = confidence_scorer_node(self.task, self.candidates)
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(len(calls), 2)  # the pool never freed up for the queued four
+        self.assertEqual(len(scored), 6)
+        self.assertTrue(all(s["reason"] == "Fallback heuristic (LLM timed out)" for s in scored))
+
+    @override_settings(CONFIDENCE_SCORING_MODE="batch", CONFIDENCE_BATCH_TOP_K=5, CONFIDENCE_BATCH_SIZE=2)
+    def test_batch_mode_ranks_chunks_and_falls_back_for_missing_ids(self):
+        prompts = []
+        skipped = self.candidates[1]["employee"]
+
+        class RankingLLM:
+            def invoke(self, prompt):
+                prompts.append(prompt)
+                ids = [int(line.split(" | ")[0]) for line in prompt.splitlines() if " | Backend Engineer | " in line]
+                ranking = [{"employee_id": i, "confidence": 0.8, "reason": "ranked"} for i in ids if i != skipped.id]
+                ranking.append({"employee_id": 999999, "confidence": 1.0, "reason": "not a candidate"})
+                return type("R", (), {"content": json.dumps({"rankings": ranking})})()
+
+        with patch("assignments.ai_engine.get_llm", return_value=RankingLLM()):
+            scored = confidence_scorer_node(self.task, self.candidates)
+
+        self.assertEqual(len(prompts), 3)
+        by_name = {s["employee"].name: s for s in scored}
+        self.assertEqual(len(scored), 6)
+        self.assertEqual(by_name[skipped.name]["reason"], "Fallback heuristic (missing from batch ranking)")
+        self.assertEqual(by_name["Dev 5"]["reason"], "Heuristic confidence (outside batch top-K)")
+        self.assertEqual(by_name["Dev 0"]["confidence"], 0.8)
+
+
+class FakePipelineLLM:
+    """Answers parser prompts with fixed skills and scoring prompts with a per-candidate confidence."""
+    model_name = "fake"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def invoke(self, prompt):
+        with self.lock:
+            self.calls.append(prompt)
+        if "precise JSON generator" in prompt:
+            content = '{"keywords": ["api"], "skills": ["python"], "technical_tags": [], "effort_level": "medium"}'
+        else:
+            content = '{"confidence": %s, "reason": "fit"}' % ("0.9" if "Asha" in prompt else "0.6")
+        return type("R", (), {"content": content})()
+
+
+class AssignmentGraphTests(TransactionTestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        parser_cache.clear()
+        self.llm = FakePipelineLLM()
+        for name in ("Asha", "Ben", "Chen"):
+            Employee.objects.create(name=name, email=f"{name.lower()}@example.com", role="Backend Engineer", skills=["python"], workload_score=0.3)
+        self.task = Task.objects.create(title="Build api", description="python service")
+
+    def _patch_llm(self):
+        return patch("assignments.ai_engine.get_llm", return_value=self.llm), patch("assignments.pipeline_graph.get_llm", return_value=self.llm)
+
+    def test_graph_fans_out_one_score_per_candidate(self):
+        from .pipeline_graph import get_assignment_graph
+
+        graph = get_assignment_graph(checkpointed=False).get_graph()
+        start_targets = {e.target for e in graph.edges if e.source == "__start__"}
+        self.assertEqual(start_targets, {"parse", "workload_snapshot"})
+
+        p1, p2 = self._patch_llm()
+        with p1, p2:
+            result = run_assignment_pipeline(self.task.id)
+        self.assertEqual(len(self.llm.calls), 4)  # one parse + one per candidate
+        self.assertEqual(result["recommended_assignee"], "Asha")
+        self.assertEqual([b["name"] for b in result["confidence_breakdown"]][0], "Asha")
+        self.assertTrue(result["email_queued"])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.assigned_to.name, "Asha")
+
+    def test_checkpointed_run_resumes_after_failure(self):
+        from . import pipeline_graph
+        from .models import PipelineCheckpoint
+
+        real_decision = pipeline_graph.decision_node
+        failures = [RuntimeError("db down")]
+
+        def flaky_decision(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return real_decision(*args, **kwargs)
+
+        p1, p2 = self._patch_llm()
+        with p1, p2, patch("assignments.pipeline_graph.decision_node", side_effect=flaky_decision):
+            with self.assertRaises(RuntimeError):
+                pipeline_graph.run_assignment_graph(self.task, job_id="job-1")
+            self.assertTrue(PipelineCheckpoint.objects.filter(thread_id=f"assignment:{self.task.id}:job-1").exists())
+            calls_before_retry = len(self.llm.calls)
+            result = pipeline_graph.run_assignment_graph(self.task, job_id="job-1")
+
+        self.assertEqual(len(self.llm.calls), calls_before_retry)  # parse and scoring were not repeated
+        self.assertEqual(result["recommended_assignee"], "Asha")
+        self.assertFalse(PipelineCheckpoint.objects.exists())
+
+    def test_abandoned_checkpoints_are_purged(self):
+        from . import pipeline_graph
+        from .models import PipelineCheckpoint
+        from .tasks import purge_pipeline_checkpoints
+
+        p1, p2 = self._patch_llm()
+        with p1, p2, patch("assignments.pipeline_graph.decision_node", side_effect=RuntimeError("db down")):
+            for job_id in ("old", "recent"):
+                with self.assertRaises(RuntimeError):
+                    pipeline_graph.run_assignment_graph(self.task, job_id=job_id)
+        PipelineCheckpoint.objects.filter(thread_id__endswith=":old").update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+
+        self.assertEqual(purge_pipeline_checkpoints(), 1)
+        self.assertEqual(
+            set(PipelineCheckpoint.objects.values_list("thread_id", flat=True)),
+            {f"assignment:{self.task.id}:recent"},
+        )
+
+    def test_pipeline_publishes_progress_events(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(progress_group(self.task.id), channel)
+
+        p1, p2 = self._patch_llm()
+        with p1, p2:
+            run_assignment_pipeline(self.task.id)
+
+        async def drain():
+            messages = []
+            while True:
+                try:
+                    messages.append(await asyncio.wait_for(layer.receive(channel), 0.05))
+                except asyncio.TimeoutError:
+                    return messages
+
+        events = [m["event"] for m in async_to_sync(drain)()]
+        self.assertEqual(events[:3], ["started", "parsed", "candidates"])
+        self.assertEqual(events[3:6], ["scored"] * 3)
+        self.assertEqual(events[6:], ["decision", "completed"])
+
+
+class MeteredLLM(FakePipelineLLM):
+    model_name = "gpt-4o-mini"
+
+    def invoke(self, prompt):
+        result = super().invoke(prompt)
+        result.usage_metadata = {"input_tokens": 100, "output_tokens": 20}
+        return result
+
+
+class CharEncoding:
+    """tiktoken stand-in: one token per character."""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+
+LOG_DUMP = "Checkout times out under load.\n" + "".join(
+    f"2025-03-0{i % 9 + 1} 12:00:{i % 60:02d} ERROR pool exhausted conn={i}\n" for i in range(400)
+) + "Started after the 2.3 deploy."
+
+
+class PromptBudgetTests(TestCase):
+    def setUp(self):
+        prompts._task_context.cache_clear()
+        metrics.reset()
+
+    def test_repeated_log_lines_are_collapsed(self):
+        text = prompts.compact(LOG_DUMP, 200, field="task_description")
+        self.assertIn("[... 399 similar lines]", text)
+        self.assertTrue(text.startswith("Checkout times out"))
+        self.assertTrue(text.endswith("Started after the 2.3 deploy."))
+        self.assertLessEqual(prompts.count_tokens(text), 200)
+        self.assertEqual(prompts.compact("short", 200), "short")
+
+    def test_truncation_keeps_head_and_tail_with_tiktoken(self):
+        text = "".join(f"word{i} " for i in range(2000))
+        with patch("assignments.prompts._encoding", return_value=CharEncoding()):
+            self.assertEqual(prompts.count_tokens("abc"), 3)
+            short = prompts.compact(text, 300)
+            self.assertLessEqual(prompts.count_tokens(short), 300 + 30)
+        self.assertTrue(short.startswith("word0 word1 "))
+        self.assertTrue(short.endswith("word1999"))
+        self.assertRegex(short, r"\[\.\.\. \d+ tokens omitted \.\.\.\]")
+
+    @override_settings(PROMPT_TOKEN_BUDGETS={"score": 400}, PROMPT_TASK_CONTEXT_TOKENS=150, PROMPT_RESPONSIBILITIES_TOKENS=40)
+    def test_scorer_compacts_task_once_for_all_candidates(self):
+        llm = FakePipelineLLM()
+        task = Task(id=1, title="Fix checkout", description=LOG_DUMP.replace("\n", " ") * 3)
+        infos = [
+            {"employee": Employee(id=i, name=name, role="Backend Engineer", skills=["python"], workload_score=0.2,
+                                  responsibilities="Owns payments. " * 200), "adjusted_score": 0.9}
+            for i, name in enumerate(["Asha", "Ben", "Chen"], start=1)
+        ]
+        with patch("assignments.ai_engine.get_llm", return_value=llm):
+            scored = confidence_scorer_node(task, infos)
+
+        self.assertEqual(scored[0]["employee"].name, "Asha")
+        self.assertEqual(prompts._task_context.cache_info().misses, 1)
+        self.assertEqual(len(llm.calls), 3)
+        for prompt in llm.calls:
+            self.assertIn("tokens omitted", prompt)
+            self.assertLessEqual(prompts.count_tokens(prompt), 400)
+        # The fake model reports no usage, so the counted tokens are recorded.
+        self.assertRegex(
+            metrics.render(metrics.snapshot()),
+            r'assignments_llm_tokens_total\{purpose="score",model="fake",kind="prompt"\} [1-9]',
+        )
+
+
+class ObservabilityTests(TransactionTestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        parser_cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+
+    def scrape(self):
+        res = self.client.get("/metrics")
+        self.assertEqual(res.status_code, 200)
+        return res.content.decode()
+
+    def test_pipeline_run_is_metered(self):
+        llm = MeteredLLM()
+        Employee.objects.create(name="Asha", email="asha@example.com", role="Backend Engineer", skills=["python"], workload_score=0.3)
+        task = Task.objects.create(title="Build api", description="python service")
+        with patch("assignments.ai_engine.get_llm", return_value=llm), patch("assignments.pipeline_graph.get_llm", return_value=llm):
+            run_assignment_pipeline(task.id)
+
+        body = self.scrape()
+        self.assertIn("# TYPE assignments_pipeline_node_seconds histogram", body)
+        for node in ("parse", "workload_snapshot", "match", "analyze", "score", "decide"):
+            self.assertIn(f'assignments_pipeline_node_seconds_count{{node="{node}"}} 1', body)
+        self.assertIn('assignments_llm_tokens_total{purpose="parse",model="gpt-4o-mini",kind="prompt"} 100', body)
+        self.assertIn('assignments_llm_tokens_total{purpose="score",model="gpt-4o-mini",kind="completion"} 20', body)
+        self.assertIn('assignments_llm_cost_usd_total{purpose="score",model="gpt-4o-mini"} 2.7e-05', body)
+        self.assertIn('assignments_pipeline_candidates_bucket{le="1.0"} 1', body)
+        self.assertIn('assignments_decisions_total{decision="auto_assign"} 1', body)
+        self.assertIn('assignments_pipeline_runs_total{outcome="completed"} 1', body)
+        self.assertIn('assignments_cache_requests_total{cache="task_parser",result="misses"} 1', body)
+
+    def test_classification_tokens_are_recorded(self):
+        client = MagicMock()
+        client.chat.completions.create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="task"))],
+            usage=SimpleNamespace(prompt_tokens=40, completion_tokens=1),
+        )
+        with patch("assignments.utils.get_openai_client", return_value=client):
+            self.assertEqual(_classify_with_openai("The login page is broken on mobile"), "task")
+        self.assertIn('assignments_llm_tokens_total{purpose="classify",model="gpt-4o-mini",kind="prompt"} 40', self.scrape())
+
+    def test_trace_id_follows_request_into_celery_job(self):
+        res = self.client.get("/api/employees/", HTTP_X_REQUEST_ID="req-0123456789")
+        self.assertEqual(res["X-Trace-Id"], "req-0123456789")
+        self.assertEqual(len(self.client.get("/api/employees/")["X-Trace-Id"]), 32)
+
+        headers = {}
+        with trace("req-0123456789"):
+            add_trace_headers(headers=headers)
+        self.assertEqual(headers["trace_id"], "req-0123456789")
+
+        job = MagicMock(request=CeleryContext(trace_id=headers["trace_id"], published_at=headers["published_at"] - 2))
+        job.name = "assignments.ai_engine.run_assignment_pipeline"
+        start_task_trace(task=job)
+        self.assertEqual(current_trace_id(), "req-0123456789")
+        end_task_trace(task=job)
+        self.assertIsNone(current_trace_id())
+        self.assertIn('assignments_queue_wait_seconds_bucket{task="assignments.ai_engine.run_assignment_pipeline",le="2.5"} 1', self.scrape())
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+
+class ProgressStreamTests(TestCase):
+    def _event(self, task_id, event, **data):
+        return get_channel_layer().group_send(
+            progress_group(task_id), {"type": "progress.event", "event": event, "task_id": task_id, "ts": 0, "data": data}
+        )
+
+    async def test_sse_stream_relays_events_until_completed(self):
+        task = await Task.objects.acreate(title="Build api", description="x", assignment_status="running")
+        response = await self.async_client.get(f"/api/tasks/{task.id}/events/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b"event: status"))
+
+        await self._event(task.id, "scored", name="Dhruv", confidence=0.9)
+        await self._event(task.id, "completed", result={"recommended_assignee": "Dhruv"})
+        frames = [frame async for frame in stream]
+        self.assertEqual([f.split(b"\n")[0] for f in frames], [b"event: scored", b"event: completed"])
+        self.assertIn(b'"confidence": 0.9', frames[0])
+
+    async def test_finished_task_stream_closes_after_status(self):
+        task = await Task.objects.acreate(title="Build api", description="x", assignment_status="completed", assignment_result={})
+        response = await self.async_client.get(f"/api/tasks/{task.id}/events/")
+        frames = [frame async for frame in response.streaming_content]
+        self.assertEqual(len(frames), 1)
+        self.assertIn(b'"assignment_status": "completed"', frames[0])
+        self.assertEqual((await self.async_client.get("/api/tasks/999999/events/")).status_code, 404)
+
+    async def test_websocket_streams_progress(self):
+        task = await Task.objects.acreate(title="Build api", description="x", assignment_status="running")
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/tasks/{task.id}/progress/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())["data"]["assignment_status"], "running")
+
+        await self._event(task.id, "decision", assignee="Dhruv", assigned=True)
+        self.assertEqual((await communicator.receive_json_from())["event"], "decision")
+        await self._event(task.id, "failed", error="boom")
+        self.assertEqual((await communicator.receive_json_from())["data"], {"error": "boom"})
+        self.assertEqual((await communicator.receive_output())["type"], "websocket.close")
+
+
+class AsyncTaskCreationTests(TransactionTestCase):
+    def setUp(self):
+        classifier.clear_cache()
+        self.factory = AsyncRequestFactory()
+        self.dev = Employee.objects.create(name="Dhruv", email="dhruv@example.com", role="Backend Engineer", skills=["python"])
+
+    def _post(self, body, query=""):
+        return self.factory.post(f"/api/tasks/{query}", json.dumps(body), content_type="application/json")
+
+    def _finish_later(self, task):
+        def finish():
+            Task.objects.filter(pk=task.id).update(
+                assignment_status="completed", assigned_to=self.dev, confidence_score=0.9,
+                assignment_result={"recommended_assignee": "Dhruv", "confidence_score": 0.9, "reasoning": "fit"},
+            )
+            connection.close()
+        threading.Timer(0.3, finish).start()
+
+    async def test_sync_create_awaits_openai_and_the_job(self):
+        completion = MagicMock()
+        completion.choices[0].message.content = "task"
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value=completion)
+
+        with patch("assignments.utils.get_async_openai_client", return_value=client), \
+                patch("assignments.async_views.enqueue_assignment", side_effect=self._finish_later):
+            res = await create_task(self._post({"title": "The login page is broken on mobile", "description": "x", "created_by_id": self.dev.id}))
+
+        self.assertEqual(res.status_code, 201)
+        data = json.loads(res.content)
+        self.assertEqual((data["assigned_to"], data["confidence_score"]), ("Dhruv", 0.9))
+        client.chat.completions.create.assert_awaited_once()
+
+    async def test_async_flag_and_chat_messages(self):
+        with patch("assignments.async_views.enqueue_assignment") as enqueue:
+            res = await create_task(self._post({"title": "Build django api", "description": "x", "created_by_id": self.dev.id}, "?async=true"))
+        self.assertEqual(res.status_code, 202)
+        data = json.loads(res.content)
+        self.assertTrue(data["events_url"].endswith(f"/api/tasks/{data['id']}/events/"))
+        enqueue.assert_called_once()
+
+        res = await create_task(self._post({"title": "hello"}))
+        self.assertEqual(json.loads(res.content)["type"], "greeting")
+
+    @override_settings(ASSIGNMENT_WSGI_LONG_POLL_MAX=0)
+    async def test_async_long_poll_waits_past_the_wsgi_cap(self):
+        task = await Task.objects.acreate(title="Build api", description="x", assignment_status="running")
+        self._finish_later(task)
+        res = await task_assignment(self.factory.get(f"/api/tasks/{task.id}/assignment/?wait=5"), task.id)
+        data = json.loads(res.content)
+        self.assertEqual((data["assignment_status"], data["assigned_to"]), ("completed", "Dhruv"))
+
+        res = await task_assignment(self.factory.get("/api/tasks/0/assignment/"), 0)
+        self.assertEqual(res.status_code, 404)
+
+
+class WorkloadCounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.dev = Employee.objects.create(name="Dhruv", email="dhruv@example.com", role="Backend Engineer", skills=["python"], workload_score=0.2)
+        self.pm = Employee.objects.create(name="Manaal", email="manaal@example.com", role="PM", skills=["planning"], workload_score=0.1)
+
+    def _refresh(self):
+        self.dev.refresh_from_db()
+        self.pm.refresh_from_db()
+
+    @override_settings(WORKLOAD_CAPACITY_POINTS=10)
+    def test_assignment_and_status_transitions_update_counters(self):
+        task = Task.objects.create(title="Hotfix", description="x", priority="high", effort_level="medium")
+        res = self.client.post(f"/api/tasks/{task.id}/manual_assign/", {"assignee_id": self.dev.id, "decision": "approve"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self._refresh()
+        self.assertEqual((self.dev.active_tasks, self.dev.workload_points), (1, 2.0))
+        self.assertAlmostEqual(self.dev.workload_score, 0.4)
+
+        task.refresh_from_db()
+        task.assigned_to = self.pm
+        task.save()
+        self._refresh()
+        self.assertEqual((self.dev.active_tasks, self.dev.workload_points), (0, 0.0))
+        self.assertAlmostEqual(self.dev.workload_score, 0.2)
+        self.assertEqual(self.pm.active_tasks, 1)
+
+        self.client.patch(f"/api/tasks/{task.id}/", {"status": "done"}, format="json")
+        self._refresh()
+        self.assertEqual((self.pm.active_tasks, self.pm.workload_points), (0, 0.0))
+        self.assertAlmostEqual(self.pm.workload_score, 0.1)
+
+    def test_delete_releases_and_reconcile_repairs_drift(self):
+        task = Task.objects.create(title="a", description="x", assigned_to=self.dev, status="assigned")
+        Task.objects.create(title="b", description="x", assigned_to=self.dev, status="in_progress", priority="low")
+        task.delete()
+        self._refresh()
+        self.assertEqual((self.dev.active_tasks, self.dev.workload_points), (1, 0.5))
+
+        Employee.objects.filter(pk=self.dev.pk).update(active_tasks=7, workload_points=9.0, workload_score=1.0)
+        Task.objects.filter(title="b").update(status="done")  # bypasses signals
+        self.assertEqual(reconcile_workloads(), 1)
+        self._refresh()
+        self.assertEqual((self.dev.active_tasks, self.dev.workload_points), (0, 0.0))
+        self.assertAlmostEqual(self.dev.workload_score, 0.2)
+
+    @override_settings(WORKLOAD_CAPACITY_POINTS=10)
+    def test_api_writes_the_baseline_not_the_derived_score(self):
+        Task.objects.create(title="a", description="x", assigned_to=self.dev, status="assigned", priority="high", effort_level="medium")
+        res = self.client.patch(f"/api/employees/{self.dev.id}/", {"base_workload": 0.5}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertAlmostEqual(res.json()["workload_score"], 0.7)
+
+        # Older clients still send workload_score; it updates the baseline and task points stay on top.
+        self.client.patch(f"/api/employees/{self.dev.id}/", {"workload_score": 0.3}, format="json")
+        self._refresh()
+        self.assertEqual((self.dev.base_workload, self.dev.workload_points), (0.3, 2.0))
+        self.assertAlmostEqual(self.dev.workload_score, 0.5)
+
+        res = self.client.post("/api/employees/", {"name": "Ben", "email": "ben@example.com", "role": "QA", "skills": [], "workload_score": 0.4}, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual((res.json()["base_workload"], res.json()["workload_score"]), (0.4, 0.4))
+
+class ListQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        people = [Employee.objects.create(name=f"Dev {i}", email=f"dev{i}@example.com", role="Engineer") for i in range(5)]
+        for i in range(30):
+            task = Task.objects.create(title=f"Task {i}", description="x", assigned_to=people[i % 5], status="assigned")
+            AssignmentLog.objects.create(task=task, reasoning_text="auto", confidence=0.9, decision_status="auto_assigned")
+
+    def _query_count(self, url):
+        # Query count must not grow with page size: one SELECT with the joins, no COUNT.
+        with self.assertNumQueries(1):
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return res.json()
+
+    def test_task_list_is_one_query_per_page(self):
+        small = self._query_count("/api/tasks/?page_size=5")
+        data = self._query_count("/api/tasks/?page_size=25")
+        self.assertEqual(len(small["results"]), 5)
+        self.assertEqual(len(data["results"]), 25)
+        self.assertEqual(data["results"][0]["title"], "Task 29")
+        self.assertEqual(set(data["results"][0]["assigned_to"]), {"id", "name", "email", "role"})
+
+        rest = self._query_count(data["next"])
+        self.assertEqual([t["title"] for t in rest["results"]], [f"Task {i}" for i in range(4, -1, -1)])
+        self.assertIsNone(rest["next"])
+
+    def test_assignment_log_list_is_one_query_per_page(self):
+        data = self._query_count("/api/assignment_logs/?page_size=30")
+        self.assertEqual(len(data["results"]), 30)
+        self.assertEqual(data["results"][0]["task_title"], "Task 29")
+        self.assertEqual(data["results"][0]["assigned_to"], "Dev 4")
+        self.assertEqual(data["results"][0]["task_status"], "assigned")
+
+
+    def test_dashboard_filters_keep_a_single_query(self):
+        dev = Employee.objects.get(name="Dev 2")
+        Task.objects.filter(title__in=["Task 2", "Task 7"]).update(status="in_progress", priority="high")
+        data = self._query_count(f"/api/tasks/?assigned_to={dev.id}&status=assigned&status=in_progress")
+        self.assertEqual(len(data["results"]), 6)
+        data = self._query_count("/api/tasks/?priority=high")
+        self.assertEqual([t["title"] for t in data["results"]], ["Task 7", "Task 2"])
+        self.assertEqual(self.client.get("/api/tasks/?status=bogus").status_code, 400)
+
+        AssignmentLog.objects.filter(task__title="Task 3").update(decision_status="needs_review")
+        data = self._query_count("/api/assignment_logs/?decision_status=needs_review")
+        self.assertEqual([log["task_title"] for log in data["results"]], ["Task 3"])
+
+    def test_pagination_benchmark_command_runs(self):
+        out = StringIO()
+        call_command("bench_task_pages", tasks=120, employees=4, page_size=10, repeat=1, stdout=out)
+        self.assertIn("cursor p50", out.getvalue())
+        self.assertEqual(Task.objects.count(), 30)  # synthetic rows rolled back
+
+
+class ImportRolesTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.existing = Employee.objects.create(name="Asha", email="asha@example.com", role="Backend Engineer",
+                                                skills=["python"], workload_score=0.2)
+        Employee.objects.filter(pk=self.existing.pk).update(workload_points=4.0)
+        EmployeeEmbedding.objects.create(employee=self.existing, model="hashing", vector=b"")
+
+    def write(self, name, content):
+        path = f"{self.dir.name}/{name}"
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("import_roles", path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_ndjson_upserts_in_batches_and_refreshes_indexes(self):
+        path = self.write("people.ndjson", "\n".join([
+            json.dumps({"name": "Asha", "email": "asha@example.com", "role": "Data Engineer", "skills": ["python", "spark"], "workload_score": 0.1}),
+            json.dumps({"name": "Ben", "email": "ben@example.com", "role": "QA Engineer", "skills": ["Pytest"], "workload_score": 0.5}),
+            "{not json",
+            json.dumps({"name": "No Email"}),
+            json.dumps({"name": "Chen", "email": "chen@example.com", "role": "DevOps Engineer", "skills": []}),
+        ]))
+        with patch("assignments.importing._refresh_indexes") as refresh:
+            out, err = self.run_import(path, "--batch-size", "2")
+
+        self.assertIn("Imported 5 records: 2 created, 1 updated, 0 unchanged, 2 skipped.", out)
+        self.assertIn("Skipped line 3: invalid JSON", err)
+        self.assertIn("Skipped line 4: missing email", err)
+        self.assertEqual(refresh.call_count, 2)  # once per written batch, not per row
+
+        asha = Employee.objects.get(email="asha@example.com")
+        self.assertEqual(asha.role, "Data Engineer")
+        self.assertEqual(asha.workload_points, 4.0)  # active task load is kept
+        self.assertAlmostEqual(asha.workload_score, 0.1 + 4.0 / 8)
+        self.assertEqual(set(asha.skill_entries.values_list("name", flat=True)), {"python", "spark"})
+        self.assertFalse(EmployeeEmbedding.objects.filter(employee=asha).exists())
+        ben = Employee.objects.get(email="ben@example.com")
+        self.assertEqual((ben.workload_score, ben.base_workload), (0.5, 0.5))
+        self.assertEqual(list(ben.skill_entries.values_list("name", flat=True)), ["pytest"])
+
+        out, _ = self.run_import(path)
+        self.assertIn("0 created, 0 updated, 3 unchanged, 2 skipped", out)
+
+    def test_csv_and_json_array_dry_run_shows_diff_without_writing(self):
+        csv_path = self.write("people.csv", (
+            "name,email,role,skills,workload_score\n"
+            "Asha,asha@example.com,Backend Engineer,python;django,0.2\n"
+            "Dev,dev@example.com,Mobile Developer,\"kotlin, swift\",\n"
+        ))
+        out, _ = self.run_import(csv_path, "--dry-run")
+        self.assertIn("+ dev@example.com: Dev (Mobile Developer)", out)
+        self.assertIn("~ asha@example.com: skills ['python'] -> ['python', 'django']", out)
+        self.assertIn("Dry run, nothing written: 1 created, 1 updated, 0 unchanged, 0 skipped.", out)
+        self.assertFalse(Employee.objects.filter(email="dev@example.com").exists())
+
+        self.run_import(csv_path)
+        self.assertEqual(Employee.objects.get(email="dev@example.com").skills, ["kotlin", "swift"])
+
+        json_path = self.write("people.json", json.dumps([
+            {"name": "Asha", "email": "asha@example.com", "role": "Backend Engineer", "skills": ["python", "django"], "workload_score": 0.2},
+        ]))
+        out, _ = self.run_import(json_path, "--dry-run")
+        self.assertIn("0 created, 0 updated, 1 unchanged", out)
+
+        broken = self.write("broken.json", '[{"email": "x@example.com"} {"email": "y@example.com"}]')
+        with self.assertRaisesMessage(CommandError, "Expected ',' or ']' after item 1"):
+            self.run_import(broken)
+
+
+class PipelineBenchmarkTests(TransactionTestCase):
+    def test_bench_pipeline_reports_every_stage_and_cleans_up(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = StringIO()
+            call_command("bench_pipeline", sizes="40", tasks=3, profile_tasks=1, output=f"{tmp}/report.json", stdout=out)
+            call_command("bench_pipeline", sizes="40", tasks=3, profile_tasks=0, output=f"{tmp}/again.json",
+                         compare=f"{tmp}/report.json", stdout=out)
+            with open(f"{tmp}/report.json") as fh:
+                report = json.load(fh)
+        stages = [r["stage"] for r in report["results"]]
+        self.assertEqual(stages, ["role_matching_node", "workload_analyzer_node", "confidence_scorer_node", "decision_node", "run_assignment_pipeline"])
+        pipeline = report["results"][-1]
+        self.assertGreater(pipeline["queries_per_call"], 0)
+        self.assertGreater(pipeline["peak_kib"], 0)
+        self.assertIn("Compared with", out.getvalue())
+        self.assertFalse(Employee.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.dev = Employee.objects.create(name="Dhruv", email="dhruv@example.com", role="Backend Engineer", skills=["python"])
+        self.task = Task.objects.create(title="Build api", description="x")
+
+    def test_polls_are_served_from_cache_until_a_write(self):
+        first = self.client.get("/api/employees/")
+        etag = first["ETag"]
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/employees/")
+            not_modified = self.client.get("/api/employees/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.dev.role = "Staff Engineer"
+        self.dev.save()
+        changed = self.client.get("/api/employees/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+        self.assertEqual(changed.json()[0]["role"], "Staff Engineer")
+
+    def test_signal_bypassing_writes_invalidate_task_list(self):
+        etag = self.client.get("/api/tasks/")["ETag"]
+        self.client.post(f"/api/tasks/{self.task.id}/manual_assign/", {"assignee_id": self.dev.id, "decision": "approve"}, format="json")
+        res = self.client.get("/api/tasks/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["results"][0]["assigned_to"]["name"], "Dhruv")
+
+        Employee.objects.filter(pk=self.dev.pk).update(name="Dhruv S")
+        self.assertEqual(self.client.get("/api/tasks/").json()["results"][0]["assigned_to"]["name"], "Dhruv")  # cached
+        invalidate("employee")
+        self.assertEqual(self.client.get("/api/tasks/").json()["results"][0]["assigned_to"]["name"], "Dhruv S")
+
+    def test_chat_counts_are_cached(self):
+        handle_chat_message("show tasks")
+        with self.assertNumQueries(1):  # recent tasks only; the count is cached
+            res = handle_chat_message("show tasks")
+        self.assertIn("Total tasks: 1", res.data["response"])
+        Task.objects.create(title="Write docs", description="x")
+        self.assertIn("Total tasks: 2", handle_chat_message("show tasks").data["response"])
+
+
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.task = Task.objects.create(title="Build api", description="x")
+        self.context = {"assignee_name": "Dhruv", "task_title": "Build api", "task_description": "x", "confidence_score": 0.9,
+                        "assigned_by": "AI Task Engine", "assigned_at": "2025-01-01 10:00", "summary_lines": ["Reason: python"]}
+
+    def test_enqueue_defers_delivery_to_one_flush(self):
+        with patch("assignments.tasks.flush_notifications.apply_async") as flush, self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(queue_assignment_email("dhruv@example.com", self.context, task=self.task, dedupe_key="assignment:1"))
+            self.assertFalse(queue_assignment_email("dhruv@example.com", self.context, task=self.task, dedupe_key="assignment:1"))
+            enqueue("email", "manaal@example.com", subject="Task processed", body="Decision: auto_assign")
+        flush.assert_called_once()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(NotificationOutbox.objects.filter(status="pending").count(), 2)
+
+    def test_flush_runs_in_process_only_without_a_broker(self):
+        with patch("assignments.tasks.flush_notifications.apply_async", side_effect=ConnectionError("no broker")), \
+                self.captureOnCommitCallbacks(execute=True):
+            queue_assignment_email("dhruv@example.com", self.context, task=self.task)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_batch_is_sent_over_one_connection(self):
+        queue_assignment_email("dhruv@example.com", self.context, task=self.task)
+        enqueue("email", "manaal@example.com", subject="Task processed", body="Decision: auto_assign")
+        with patch("assignments.notifications.get_connection", wraps=mail.get_connection) as get_connection:
+            counts = deliver_batch()
+        get_connection.assert_called_once()
+        self.assertEqual(counts["sent"], 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn("Build api", mail.outbox[0].body)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+        self.assertFalse(NotificationOutbox.objects.exclude(status="sent").exists())
+
+    @override_settings(NOTIFICATION_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_give_up(self):
+        item = enqueue("email", "dhruv@example.com", subject="Hi", body="x")
+        with patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=OSError("smtp down")):
+            self.assertEqual(deliver_batch()["retrying"], 1)
+            item.refresh_from_db()
+            self.assertEqual((item.status, item.attempts), ("pending", 1))
+            self.assertGreater(item.next_attempt_at, timezone.now())
+            self.assertEqual(deliver_batch()["claimed"], 0)  # not due yet
+
+            NotificationOutbox.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_batch()["failed"], 1)
+        item.refresh_from_db()
+        self.assertEqual(item.status, "failed")
+        self.assertIn("smtp down", item.last_error)
+
+
+class ConcurrentAssignmentStressTests(TransactionTestCase):
+    @override_settings(WORKLOAD_CAPACITY_POINTS=4, WORKLOAD_ASSIGN_LIMIT=1.0)
+    def test_parallel_pipelines_never_overbook_employees(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        skill_index.invalidate()
+        for i in range(3):  # base 0.5 + 2 medium tasks (1 point each) / 4 = 1.0 -> room for two tasks each
+            Employee.objects.create(name=f"Dev {i}", email=f"dev{i}@example.com", role="Backend Engineer", skills=["python"], workload_score=0.5)
+        tasks = [Task.objects.create(title=f"Backend api work {i}", description="python api") for i in range(12)]
+
+        def run(task_id):
+            try:
+                return run_assignment_pipeline(task_id, threshold=0.5)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(run, [t.id for t in tasks]))
+
+        self.assertEqual(len(results), 12)
+        self.assertEqual(Task.objects.filter(status="assigned").count(), 6)
+        for emp in Employee.objects.all():
+            self.assertEqual(emp.active_tasks, 2)
+            self.assertLessEqual(emp.workload_score, 1.0)
+        self.assertEqual(reconcile_workloads(), 0)
+        self.assertEqual(Task.objects.filter(assigned_to__isnull=True).count(), 6)
+
+    def test_stale_task_save_is_rejected(self):
+        dev = Employee.objects.create(name="Dhruv", email="dhruv@example.com", role="Backend Engineer", skills=["python"])
+        task = Task.objects.create(title="Hotfix", description="x")
+        stale = Task.objects.get(pk=task.pk)
+        self.assertEqual(APIClient().post(f"/api/tasks/{task.id}/manual_assign/", {"assignee_id": dev.id}, format="json").status_code, 200)
+
+        stale.title = "Hotfix (edited)"
+        with self.assertRaises(StaleTaskError):
+            stale.save()
+        task.refresh_from_db()
+        self.assertEqual((task.assigned_to_id, task.title), (dev.id, "Hotfix"))
+
+
+class RoleMatchingRetrievalTests(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        self.backend = Employee.objects.create(name="Dhruv", email="dhruv@example.com", role="Backend Engineer", skills=["Python", "Django"], responsibilities="Builds REST APIs", workload_score=0.5)
+        self.busy = Employee.objects.create(name="Omar", email="omar@example.com", role="Backend Engineer", skills=["python"], workload_score=0.9)
+        self.idle = Employee.objects.create(name="Lena", email="lena@example.com", role="Backend Engineer", skills=["PYTHON"], workload_score=0.1)
+        Employee.objects.create(name="Aisha", email="aisha@example.com", role="Frontend Developer", skills=["React"], workload_score=0.1)
+
+    def test_skills_are_normalized_on_save(self):
+        self.assertEqual(set(self.backend.skill_entries.values_list("name", flat=True)), {"python", "django"})
+        self.backend.skills = ["Go"]
+        self.backend.save()
+        self.assertEqual(list(self.backend.skill_entries.values_list("name", flat=True)), ["go"])
+
+    def test_scores_and_ranks_in_a_single_query(self):
+        with self.assertNumQueries(1):
+            ranked = find_candidates({"skills": ["Python", "django"], "keywords": ["api", "kubernetes"]})
+        self.assertEqual([(emp.name, score) for emp, score in ranked], [("Dhruv", 5), ("Lena", 2), ("Omar", 2)])
+
+    @override_settings(ROLE_MATCHING_TOP_K=2)
+    def test_role_matching_node_returns_top_k(self):
+        self.assertEqual([emp.name for emp in role_matching_node({"skills": ["python"], "keywords": []})], ["Lena", "Dhruv"])
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def incr(self, key):
+        self.store[key] = int(self.store.get(key, 0)) + 1
+        return self.store[key]
+
+
+class MemorySkillIndexTests(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        self.dhruv = Employee.objects.create(name="Dhruv", email="dhruv@example.com", role="Backend Engineer", skills=["Python", "Django"], responsibilities="Builds REST APIs", workload_score=0.5)
+        self.lena = Employee.objects.create(name="Lena", email="lena@example.com", role="Data Engineer", skills=["python"], responsibilities="Owns ETL pipelines", workload_score=0.1)
+        self.parsed = {"skills": ["python", "django"], "keywords": ["api", "engineer", "rest apis"]}
+
+    def test_matches_database_ranking(self):
+        memory = [(emp.name, score) for emp, score in search_candidates(self.parsed)]
+        database = [(emp.name, score) for emp, score in find_candidates(self.parsed)]
+        self.assertEqual(memory, database)
+        self.assertEqual(memory, [("Dhruv", 7), ("Lena", 3)])
+
+    def test_applies_changes_incrementally_after_commit(self):
+        search_candidates(self.parsed)
+        with patch.object(skill_index, "rebuild", side_effect=AssertionError("should not rebuild")):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.lena.skills = ["Python", "Django"]
+                self.lena.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.dhruv.delete()
+            self.assertEqual([(emp.name, score) for emp, score in search_candidates(self.parsed)], [("Lena", 5)])
+
+    def test_rebuilds_when_another_process_bumps_the_redis_version(self):
+        redis = FakeRedis()
+        with patch("assignments.skill_index.get_redis", return_value=redis):
+            search_candidates(self.parsed)
+            Employee.objects.filter(pk=self.lena.pk).update(skills=["python", "django"], responsibilities="Builds REST APIs", workload_score=0.0)
+            self.assertEqual(search_candidates(self.parsed)[0][0], self.dhruv)  # still the cached view
+            redis.incr(VERSION_KEY)  # another worker saved an employee
+            self.assertEqual(search_candidates(self.parsed)[0][0], self.lena)
+
+
+class SemanticMatchingTests(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        embedding_matrix.invalidate()
+        self.dba = Employee.objects.create(name="Priya", email="priya@example.com", role="Database Administrator", skills=["PostgreSQL", "Replication"], workload_score=0.3)
+        Employee.objects.create(name="Aisha", email="aisha@example.com", role="Frontend Developer", skills=["React", "TailwindCSS"], workload_score=0.1)
+
+    def test_hashing_provider_places_related_terms_close_together(self):
+        provider = HashingEmbeddingProvider(dim=512)
+        pg, tuning, react = provider.embed(["PostgreSQL", "Postgres tuning", "React components"])
+        cos = lambda a, b: float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+        self.assertGreater(cos(pg, tuning), cos(pg, react) + 0.2)
+
+    @override_settings(SEMANTIC_MATCHING=True)
+    def test_semantic_stage_finds_candidates_the_lexical_matcher_misses(self):
+        parsed = {"skills": ["Postgres tuning"], "keywords": [], "technical_tags": []}
+        self.assertEqual(find_candidates(parsed), [])
+        self.assertEqual(role_matching_node(parsed), [self.dba])
+        self.assertEqual(EmployeeEmbedding.objects.count(), 2)
+
+        with patch.object(HashingEmbeddingProvider, "embed", wraps=get_embedding_provider().embed) as embed:
+            role_matching_node(parsed)
+        self.assertEqual(embed.call_count, 1)  # only the task vector; profiles come from the stored matrix
+
+    @override_settings(SEMANTIC_MATCHING=True)
+    def test_profile_edit_refreshes_only_that_row(self):
+        parsed = {"skills": ["Postgres tuning"], "keywords": [], "technical_tags": []}
+        role_matching_node(parsed)
+        stored = EmployeeEmbedding.objects.get(employee=self.dba).vector
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Employee.objects.get(pk=self.dba.pk).save()  # workload-only saves look the same
+        self.assertEqual(EmployeeEmbedding.objects.get(employee=self.dba).vector, stored)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dba.role, self.dba.skills = "React Developer", ["React"]
+            self.dba.save()
+        with patch.object(HashingEmbeddingProvider, "embed", wraps=get_embedding_provider().embed) as embed, \
+                patch("assignments.embeddings.EmbeddingMatrix._build") as rebuild:
+            self.assertEqual(role_matching_node(parsed), [])
+        rebuild.assert_not_called()
+        self.assertEqual([len(call.args[0]) for call in embed.call_args_list], [1, 1])  # the edited profile, the task
+        self.assertNotEqual(EmployeeEmbedding.objects.get(employee=self.dba).vector, stored)
+
+
+class TaskParserCacheTests(TestCase):
+    def setUp(self):
+        parser_cache.clear()
+        self.calls = []
+        calls = self.calls
+
+        class ParserLLM:
+            model_name = "gpt-4o-mini"
+
+            def invoke(self, prompt):
+                calls.append(prompt)
+                return type("R", (), {"content": '{"keywords": ["invoice"], "skills": ["python"], "technical_tags": [], "effort_level": "low"}'})()
+
+        self.llm = ParserLLM()
+
+    def test_near_identical_tasks_share_one_llm_call(self):
+        first = Task.objects.create(title="Fix invoice upload", description="PDF upload fails  for large files")
+        repost = Task.objects.create(title="  fix INVOICE upload ", description="pdf upload fails for large\nfiles")
+        with patch("assignments.ai_engine.get_llm", return_value=self.llm):
+            self.assertEqual(task_parser_node(first), task_parser_node(repost))
+            self.assertEqual(len(self.calls), 1)
+
+            task_parser_node(repost, bypass_cache=True)
+            self.assertEqual(len(self.calls), 2)
+
+        stats = parser_cache.stats()
+        self.assertEqual((stats["local_hits"], stats["misses"], stats["bypassed"]), (1, 1, 1))
+
+
+@override_settings(OPENAI_API_KEY="sk-test-pooled")
+class PooledLLMClientTests(TestCase):
+    def setUp(self):
+        reset_clients()
+        self.addCleanup(reset_clients)
+
+    def test_clients_are_reused_and_share_one_http_pool(self):
+        llm = get_llm()
+        self.assertIs(get_llm(), llm)
+        self.assertIs(get_openai_client()._client, get_http_client())
+        self.assertIs(llm.client._client._client, get_http_client())
+
+    def test_forked_process_gets_fresh_clients(self):
+        llm = get_llm()
+        with patch("assignments.llm_clients.os.getpid", return_value=-1):
+            self.assertIsNot(get_llm(), llm)
+
+
+class LocalMessageClassifierTests(TestCase):
+    def setUp(self):
+        classifier.clear_cache()
+
+    def test_clear_cut_messages_are_classified_without_the_llm(self):
+        cases = {
+            "hello": "greeting",
+            "what can you do?": "help",
+            "show tasks": "unknown",
+            "Fix the team page layout": "task",
+            "Create API for uploading invoice PDFs": "task",
+            "The login page is broken on mobile": None,
+        }
+        for message, expected in cases.items():
+            self.assertEqual(classifier.classify_locally(message), expected, message)
+
+    def test_task_titles_with_chat_words_are_not_settled_as_chat(self):
+        for message in ("Payment helper crashes on checkout", "Employee onboarding API returns 500",
+                        "Team calendar sync broken", "Staff directory search is slow", "Hi-res image upload fails"):
+            self.assertIsNone(classifier.classify_locally(message), message)
+        self.assertEqual(classifier.classify_locally("hi there"), "greeting")
+        self.assertEqual(classifier.classify_locally("who is on the team"), "unknown")
+
+    @patch("assignments.utils._classify_with_openai", return_value="task")
+    def test_only_ambiguous_messages_reach_openai_and_results_are_cached(self, mock_openai):
+        self.assertEqual(classify_message_openai("Build a Django REST API for reports"), {"type": "task"})
+        mock_openai.assert_not_called()
+
+        ambiguous = "The login page is broken on mobile"
+        self.assertEqual(classify_message_openai(ambiguous), {"type": "task"})
+        self.assertEqual(classify_message_openai("  the LOGIN page is broken on mobile "), {"type": "task"})
+        mock_openai.assert_called_once_with(ambiguous)
+
+        self.assertEqual(classify_message_openai("hi").data["type"], "greeting")
+
+
+class StubLLMServer:
+    """Local stand-in for a provider API: answers chat/messages requests after `delay` seconds."""
+
+    def __init__(self, delay=0.0, content='{"confidence": 0.8, "reason": "fit"}', status=200):
+        self.delay, self.content, self.status, self.requests = delay, content, status, []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append((self.path, dict(self.headers), body))
+                time.sleep(stub.delay)
+                if self.path.endswith("/messages"):
+                    payload = {"content": [{"type": "text", "text": stub.content}], "usage": {"input_tokens": 12, "output_tokens": 5}}
+                else:
+                    payload = {"choices": [{"message": {"content": stub.content}}], "usage": {"prompt_tokens": 12, "completion_tokens": 5}}
+                data = json.dumps(payload).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.block_on_close = False  # do not wait for deliberately slow responses
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(OPENAI_API_KEY="sk-test", ANTHROPIC_API_KEY="ak-test", MISTRAL_API_KEY="mk-test",
+                   LLM_PROVIDERS=["openai", "anthropic", "mistral"], LLM_HEDGE_DEFAULT_DELAY=0.1,
+                   LLM_HEDGE_MIN_DELAY=0.05, LLM_ROUTER_TIMEOUT=5)
+class LLMRouterTests(TestCase):
+    def setUp(self):
+        reset_clients()
+        metrics.reset()
+        self.addCleanup(reset_clients)
+
+    def router(self, **servers):
+        urls = {}
+        for name, server in servers.items():
+            self.addCleanup(server.close)
+            urls[name] = server.url
+        with override_settings(LLM_PROVIDERS=list(servers), LLM_PROVIDER_URLS=urls):
+            return get_router()
+
+    def test_slow_primary_is_hedged_to_next_provider(self):
+        openai, anthropic = StubLLMServer(delay=1.0), StubLLMServer(delay=0.01, content='{"confidence": 0.9}')
+        router = self.router(openai=openai, anthropic=anthropic)
+
+        start = time.perf_counter()
+        result = router.invoke("Rate this candidate")
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertEqual((result.provider, result.content), ("anthropic", '{"confidence": 0.9}'))
+        path, headers, body = anthropic.requests[0]
+        self.assertEqual((path, headers["x-api-key"], body["model"]), ("/v1/messages", "ak-test", "claude-3-5-haiku-latest"))
+        self.assertEqual(openai.requests[0][1]["Authorization"], "Bearer sk-test")
+        self.assertIn('assignments_llm_router_attempts_total{provider="anthropic",reason="hedge",outcome="won"} 1',
+                      metrics.render(metrics.snapshot()))
+
+    def test_errors_and_invalid_json_fail_over(self):
+        router = self.router(openai=StubLLMServer(status=503), anthropic=StubLLMServer(content="Sure! Happy to help."),
+                             mistral=StubLLMServer(content='Here you go: {"confidence": 0.7}'))
+        result = router.invoke("Rate this candidate")
+        self.assertEqual(result.provider, "mistral")
+        self.assertEqual(result.usage_metadata, {"input_tokens": 12, "output_tokens": 5})
+
+        router = self.router(openai=StubLLMServer(status=500))
+        with self.assertRaises(LLMUnavailable):
+            router.invoke("Rate this candidate")
+
+    def test_faster_provider_is_preferred_and_failing_one_cools_down(self):
+        router = self.router(openai=StubLLMServer(), anthropic=StubLLMServer())
+        for _ in range(25):
+            router.stats["openai"].success(0.9)
+            router.stats["anthropic"].success(0.2)
+        self.assertEqual([p.name for p in router.ranked()], ["anthropic", "openai"])
+        self.assertAlmostEqual(router.hedge_delay(router.ranked()[0]), 0.2)
+        self.assertEqual(router.model_name, "router:openai/gpt-4o-mini,anthropic/claude-3-5-haiku-latest")
+
+        with override_settings(LLM_ROUTER_FAILURE_THRESHOLD=2):
+            router.stats["anthropic"].failure()
+            router.stats["anthropic"].failure()
+        self.assertEqual([p.name for p in router.ranked()], ["openai", "anthropic"])
+        self.assertEqual(router.model_name, "router:openai/gpt-4o-mini,anthropic/claude-3-5-haiku-latest")
+
+    def test_pipeline_runs_through_router(self):
+        openai = StubLLMServer(content='{"keywords": ["api"], "skills": ["python"], "technical_tags": [], "effort_level": "medium"}')
+        router = self.router(openai=openai, anthropic=StubLLMServer(delay=2.0))  # hedged only on a slow run, never first
+        with patch("assignments.ai_engine.get_router", return_value=router):
+            self.assertIs(get_llm(), router)
+            parsed = task_parser_node(Task(id=1, title="Build api", description="python service"), bypass_cache=True)
+        self.assertEqual(parsed["skills"], ["python"])
+        self.assertIn('assignments_llm_tokens_total{purpose="parse",model="gpt-4o-mini",kind="prompt"} 12',
+                      metrics.render(metrics.snapshot()))
+
@@ -0,0 +1,92 @@
+"""
+Trace ids tying an HTTP request to the Celery runs it causes.
+
+TraceIdMiddleware takes the id from an incoming W3C `traceparent` or
+`X-Request-ID` header (or generates one), keeps it in a contextvar for the
+request and returns it as X-Trace-Id. Celery messages published while a
+trace id is set carry it in a `trace_id` header, and the worker restores it
+around the task (receivers in signals.py), so log lines on both sides,
+tagged with %(trace_id)s by TraceIdFilter, can be joined.
+"""
+import contextvars
+import re
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics
+
+HEADER = "X-Trace-Id"
+
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+_VALID = re.compile(r"^[A-Za-z0-9-]{8,64}$")
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def set_trace_id(trace_id: Optional[str]) -> contextvars.Token:
+    return _trace_id.set(trace_id)
+
+
+def reset_trace_id(token: contextvars.Token) -> None:
+    _trace_id.reset(token)
+
+
+@contextmanager
+def trace(trace_id: Optional[str] = None):
+    token = set_trace_id(trace_id or new_trace_id())
+    try:
+        yield current_trace_id()
+    finally:
+        reset_trace_id(token)
+
+
+def trace_id_from_headers(headers) -> str:
+    traceparent = headers.get("traceparent", "")
+    parts = traceparent.split("-")
+    if len(parts) == 4 and _VALID.match(parts[1]):
+        return parts[1]
+    request_id = headers.get("X-Request-ID", "")
+    return request_id if _VALID.match(request_id) else new_trace_id()
+
+
+class TraceIdMiddleware:
+    """Runs each request under a trace id (sync or async, without a thread hop under ASGI)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with trace(trace_id_from_headers(request.headers)) as trace_id:
+            response = self.get_response(request)
+        response[HEADER] = trace_id
+        metrics.maybe_flush()
+        return response
+
+    async def __acall__(self, request):
+        with trace(trace_id_from_headers(request.headers)) as trace_id:
+            response = await self.get_response(request)
+        response[HEADER] = trace_id
+        return response
+
+
+class TraceIdFilter:
+    """logging filter adding `trace_id` ("-" outside a trace) to every record."""
+
+    def filter(self, record) -> bool:
+        record.trace_id = current_trace_id() or "-"
+        return True
@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework import routers
-from assignments.views import EmployeeViewSet, TaskViewSet, AssignmentLogViewSet
+from assignments.views import EmployeeViewSet, TaskViewSet, AssignmentLogViewSet, assignment_events
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 router = routers.DefaultRouter()
@@ -11,6 +12,14 @@ router.register(r"assignment_logs", AssignmentLogViewSet)
 urlpatterns = [
     path("schema/", SpectacularAPIView.as_view(), name="schema"),
     path("schema/swagger-ui/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+    path("tasks/<int:pk>/events/", assignment_events, name="task-assignment-events"),
     path("", include(router.urls)),
     path("webhook/slack/", include("assignments.urls_slack")),  # slack webhook endpoint
 ]
+
+if settings.ASYNC_VIEWS:
+    # ASGI mode: POST /api/tasks/ and assignment long-polls await OpenAI and the job on the event loop.
+    from assignments.async_views import task_assignment, task_collection
+
+    urlpatterns.insert(0, path("tasks/", task_collection, name="task-collection-async"))
+    urlpatterns.insert(1, path("tasks/<int:pk>/assignment/", task_assignment, name="task-assignment-async"))
@@ -1,15 +1,18 @@
-from openai import OpenAI
 import logging
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from rest_framework.response import Response
-from decouple import config as env
 
 from .models import Task, Employee
+from .llm_clients import get_async_openai_client, get_openai_client
+from .response_cache import cached_count
+from . import classifier, metrics
+from .classifier import GREETINGS, HELP_KEYWORDS, STATUS_KEYWORDS, TEAM_KEYWORDS
 
 logger = logging.getLogger(__name__)
 
-OPENAI_API_KEY = env("OPENAI_API_KEY")
-
-from rest_framework.response import Response
+CLASSIFIER_MODEL = "gpt-4o-mini"
 
 def handle_chat_message(message: str) -> Response:
     """
@@ -24,8 +27,7 @@ def handle_chat_message(message: str) -> Response:
 
     msg_lower = message.lower().strip()
 
-    greetings = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening", "greetings", "howdy"]
-    if any(msg_lower.startswith(greeting) or msg_lower == greeting for greeting in greetings):
+    if any(msg_lower.startswith(greeting) or msg_lower == greeting for greeting in GREETINGS):
         return Response({
             "type": "greeting",
             "response": "👋 Hello! I'm your AI Task Assignment Assistant. I can help you with:\n\n"
@@ -37,8 +39,7 @@ def handle_chat_message(message: str) -> Response:
         })
 
     
-    help_keywords = ["help", "what can you do", "capabilities", "commands", "how to", "guide"]
-    if any(keyword in msg_lower for keyword in help_keywords):
+    if any(keyword in msg_lower for keyword in HELP_KEYWORDS):
         return Response({
             "type": "help",
             "response": "🤖 Here's what I can do:\n\n"
@@ -60,10 +61,9 @@ def handle_chat_message(message: str) -> Response:
         })
 
    
-    status_keywords = ["show task", "list task", "task status", "assignments", "what tasks", "recent task"]
-    if any(keyword in msg_lower for keyword in status_keywords):
+    if any(keyword in msg_lower for keyword in STATUS_KEYWORDS):
         try:
-            tasks = Task.objects.all().order_by("-created_at")[:5]
+            tasks = Task.objects.select_related("assigned_to").order_by("-created_at")[:5]
             if not tasks:
                 return Response({
                     "type": "info",
@@ -78,7 +78,7 @@ def handle_chat_message(message: str) -> Response:
 
             return Response({
                 "type": "task_list",
-                "response": f"📋 Recent Tasks:\n\n" + "\n".join(task_list) + f"\n\nTotal tasks: {Task.objects.count()}"
+                "response": f"📋 Recent Tasks:\n\n" + "\n".join(task_list) + f"\n\nTotal tasks: {cached_count(Task)}"
             })
         except Exception as e:
             logger.error(f"Error fetching tasks: {e}")
@@ -88,8 +88,7 @@ def handle_chat_message(message: str) -> Response:
             })
 
    
-    team_keywords = ["employee", "team", "staff", "who is", "team member", "workers"]
-    if any(keyword in msg_lower for keyword in team_keywords):
+    if any(keyword in msg_lower for keyword in TEAM_KEYWORDS):
         try:
             employees = Employee.objects.all()[:10]
             if not employees:
@@ -105,7 +104,7 @@ def handle_chat_message(message: str) -> Response:
 
             return Response({
                 "type": "employee_list",
-                "response": f"👥 Team Members:\n\n" + "\n".join(emp_list) + f"\n\nTotal employees: {Employee.objects.count()}"
+                "response": f"👥 Team Members:\n\n" + "\n".join(emp_list) + f"\n\nTotal employees: {cached_count(Employee)}"
             })
         except Exception as e:
             logger.error(f"Error fetching employees: {e}")
@@ -144,37 +143,106 @@ def handle_chat_message(message: str) -> Response:
     })
 
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+def _resolve_without_openai(message: str) -> tuple[str | None, str]:
+    category = classifier.get_cached(message)
+    if category is not None:
+        return category, "cache"
+    if getattr(settings, "LOCAL_CLASSIFIER_ENABLED", True):
+        return classifier.classify_locally(message), "local"
+    return None, "local"
+
 
 def classify_message_openai(message: str) -> dict:
     """
-    Uses OpenAI to classify the message type: 'greeting', 'help', 'task', 'unknown'.
+    Classify the message type: 'greeting', 'help', 'task', 'unknown'.
+    Clear-cut messages are resolved locally (classifier.classify_locally) and
+    results are cached by message hash; only ambiguous text reaches OpenAI.
     Returns a dict with 'type' and 'response' (optional for non-task messages).
     """
-    try:
-        prompt = f"""
+    category, source = _resolve_without_openai(message)
+    if category is None:
+        category = _classify_with_openai(message)
+        source = "openai"
+        if category is None:
+            return {"type": "unknown"}
+
+    classifier.remember(message, category)
+    metrics.CLASSIFICATIONS.inc(category=category, source=source)
+    logger.info(f"🔹 Message classified as: {category} ({source})")
+    return handle_chat_message(message) if category != "task" else {"type": "task"}
+
+
+async def aclassify_message_openai(message: str) -> dict:
+    """classify_message_openai for async views: the OpenAI call is awaited on the loop's AsyncOpenAI client."""
+    category, source = _resolve_without_openai(message)
+    if category is None:
+        category = await _aclassify_with_openai(message)
+        source = "openai"
+        if category is None:
+            return {"type": "unknown"}
+
+    classifier.remember(message, category)
+    metrics.CLASSIFICATIONS.inc(category=category, source=source)
+    logger.info(f"🔹 Message classified as: {category} ({source})")
+    if category == "task":
+        return {"type": "task"}
+    return await sync_to_async(handle_chat_message)(message)
+
+
+def _classification_messages(message: str) -> list:
+    prompt = f"""
             Classify the following message into one of these categories: 
             'greeting', 'help', 'task', 'unknown'.
             Return only the category name. Message: "{message}"
         """
-
+    return [
+        {"role": "system", "content": "You are an assistant that classifies messages into types."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _category_from(response) -> str:
+    category = response.choices[0].message.content.strip().lower()
+    if category not in classifier.CATEGORIES:
+        category = "unknown"
+    logger.info(f"🔹 OpenAI classified message as: {category}")
+    return category
+
+
+def _classify_with_openai(message: str) -> str | None:
+    """Uses OpenAI to classify the message; None if the call is unavailable or fails."""
+    client = get_openai_client()
+    if client is None:
+        logger.warning("⚠️ No OpenAI API key found; skipping message classification.")
+        return None
+    response, start = None, time.perf_counter()
+    try:
         response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an assistant that classifies messages into types."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0
+            model=CLASSIFIER_MODEL, messages=_classification_messages(message), temperature=0
         )
-
-        category = response.choices[0].message.content.strip().lower()
-
-       
-        if category not in ["greeting", "help", "task", "unknown"]:
-            category = "unknown"
-
-        logger.info(f"🔹 OpenAI classified message as: {category}")
-        return handle_chat_message(message) if category != "task" else {"type": "task"}
+        return _category_from(response)
+    except Exception as e:
+        logger.error(f"Error classifying message via OpenAI: {e}")
+        return None
+    finally:
+        metrics.record_llm_call("classify", CLASSIFIER_MODEL, time.perf_counter() - start,
+                                *metrics.usage_from(response), ok=response is not None)
+
+
+async def _aclassify_with_openai(message: str) -> str | None:
+    client = get_async_openai_client()
+    if client is None:
+        logger.warning("⚠️ No OpenAI API key found; skipping message classification.")
+        return None
+    response, start = None, time.perf_counter()
+    try:
+        response = await client.chat.completions.create(
+            model=CLASSIFIER_MODEL, messages=_classification_messages(message), temperature=0
+        )
+        return _category_from(response)
     except Exception as e:
         logger.error(f"Error classifying message via OpenAI: {e}")
-        return {"type": "unknown"}
\ No newline at end of file
+        return None
+    finally:
+        metrics.record_llm_call("classify", CLASSIFIER_MODEL, time.perf_counter() - start,
+                                *metrics.usage_from(response), ok=response is not None)
@@ -1,28 +1,216 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Employee, Task, AssignmentLog
-from .serializers import EmployeeSerializer, TaskSerializer, AssignmentLogSerializer
+from .models import Employee, Task, AssignmentLog, AssignmentBatch, StaleTaskError
+from .serializers import EmployeeSerializer, EmployeeSummarySerializer, TaskSerializer, TaskListSerializer, BulkTaskSerializer, AssignmentLogSerializer
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
 from rest_framework.permissions import AllowAny
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
+from django_filters.rest_framework import DjangoFilterBackend
+from celery import chord
 
-from .ai_engine import run_assignment_pipeline
+from .ai_engine import run_assignment_batch, finalize_assignment_batch
+from .workload import apply_transitions
+from .assigning import assign_task
+from .filters import AssignmentLogFilter, TaskFilter
+from .pagination import CreatedAtCursorPagination
+from .response_cache import CachedListMixin, invalidate
+from . import metrics
+from .progress import TERMINAL_EVENTS, group_name as progress_group
+from .queueing import enqueue_assignment, mark_enqueue_failed, max_batch_size, priority_for, queue_stats, retry_after
+from .tracing import current_trace_id
 from .utils import classify_message_openai
 
+import asyncio
+import json
+import time
+import uuid
 import logging
 logger = logging.getLogger(__name__)
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+def _queue_full_response(wait: int) -> Response:
+    return Response(
+        {"detail": "Assignment queue is full, retry later.", "retry_after": wait},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(wait)},
+    )
+
+
+def _assignment_payload(task: Task, result: dict) -> dict:
+    """Shape a pipeline result the way the frontend expects it."""
+    assigned_to = task.assigned_to.name if task.assigned_to else result.get("recommended_assignee")
+    raw_conf = result.get("confidence_score", 0.0)
+    try:
+        confidence = float(raw_conf)
+    except (TypeError, ValueError):
+        confidence = 0.0
+    return {
+        "id": task.id,
+        "title": task.title,
+        "assigned_to": assigned_to,
+        "confidence_score": confidence,
+        "assignment_reason": result.get("reasoning", "No reasoning provided"),
+        "confidence_breakdown": result.get("confidence_breakdown", []),
+        "email_queued": result.get("email_queued", result.get("email_sent", False)),
+        # Deprecated alias of email_queued kept for existing clients: the notification was queued, not yet delivered.
+        "email_sent": result.get("email_queued", result.get("email_sent", False)),
+        "type": "task",
+    }
+
+
+def _wants_async(request) -> bool:
+    """?async=true|false wins, then `Prefer: respond-async`, then the ASYNC_TASK_ASSIGNMENT setting."""
+    flag = request.GET.get("async")
+    if flag is not None:
+        return flag.lower() in ("1", "true", "yes")
+    if "respond-async" in request.headers.get("Prefer", ""):
+        return True
+    return settings.ASYNC_TASK_ASSIGNMENT
+
+
+def _accepted_payload(request, task: Task) -> dict:
+    """202 body for a queued assignment job: where to poll or stream its progress."""
+    return {
+        "id": task.id,
+        "title": task.title,
+        "job_id": task.assignment_job_id,
+        "assignment_status": task.assignment_status,
+        "status_url": request.build_absolute_uri(reverse("task-assignment", args=[task.id])),
+        "events_url": request.build_absolute_uri(reverse("task-assignment-events", args=[task.id])),
+        "trace_id": current_trace_id(),
+        "type": "task",
+    }
+
+
+def _assignment_status(task: Task) -> dict:
+    """Current state of the task's assignment job (GET .../assignment/ and the progress streams)."""
+    data = {
+        "id": task.id,
+        "title": task.title,
+        "job_id": task.assignment_job_id or None,
+        "assignment_status": task.assignment_status,
+    }
+    if task.assignment_status == "completed":
+        data.update(_assignment_payload(task, task.assignment_result or {}))
+    elif task.assignment_status == "failed":
+        data["error"] = (task.assignment_result or {}).get("error", "Assignment pipeline failed")
+    return data
+
+
+def load_assignment_status(task_id) -> dict | None:
+    task = Task.objects.select_related("assigned_to").filter(pk=task_id).first()
+    return _assignment_status(task) if task else None
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def _progress_stream(task_id: int, first: dict):
+    """
+    Relay channel-layer progress events for one task as SSE frames, starting
+    with the current status. Heartbeats re-read the task row, so the stream
+    still closes if the terminal event was published before we subscribed
+    or lost in transit.
+    """
+    layer = get_channel_layer()
+    channel = await layer.new_channel()
+    group = progress_group(task_id)
+    await layer.group_add(group, channel)
+    try:
+        yield _sse("status", first)
+        if first["assignment_status"] in ("completed", "failed"):
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.PIPELINE_PROGRESS_STREAM_TIMEOUT
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(layer.receive(channel), min(settings.PIPELINE_PROGRESS_HEARTBEAT, remaining))
+            except asyncio.TimeoutError:
+                current = await sync_to_async(load_assignment_status)(task_id)
+                if current is None or current["assignment_status"] in ("completed", "failed"):
+                    yield _sse("status", current)
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse(message["event"], message["data"])
+            if message["event"] in TERMINAL_EVENTS:
+                return
+        yield _sse("timeout", {"detail": "Progress stream timed out; poll the assignment endpoint."})
+    finally:
+        await layer.group_discard(group, channel)
+
+
+async def assignment_events(request, pk):
+    """
+    GET /api/tasks/<id>/events/ — Server-Sent Events stream of the task's
+    pipeline progress (see assignments/progress.py). Async, so under ASGI a
+    waiting client holds no worker thread.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    first = await sync_to_async(load_assignment_status)(pk)
+    if first is None:
+        return JsonResponse({"detail": "Not found."}, status=404)
+    response = StreamingHttpResponse(_progress_stream(int(pk), first), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # let nginx pass events through unbuffered
+    return response
+
+
+def metrics_endpoint(request):
+    """
+    GET /metrics — Prometheus scrape target (see assignments/metrics.py).
+    With METRICS_TOKEN set, scrapers must send "Authorization: Bearer <token>".
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(metrics.snapshot()), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class EmployeeViewSet(CachedListMixin, viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
+    cache_dependencies = ("employee",)
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(CachedListMixin, viewsets.ModelViewSet):
     permission_classes = [AllowAny]
-    queryset = Task.objects.all().order_by("-created_at")
+    queryset = Task.objects.select_related("assigned_to").order_by("-created_at")
     serializer_class = TaskSerializer
+    cache_dependencies = ("task", "employee")  # rows embed the assignee summary
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = TaskFilter
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            # Only the columns TaskListSerializer renders, assignee joined in the same query.
+            queryset = queryset.only(
+                *TaskListSerializer.Meta.fields,
+                *(f"assigned_to__{field}" for field in EmployeeSummarySerializer.Meta.fields),
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return TaskListSerializer
+        return super().get_serializer_class()
 
     def create(self, request, *args, **kwargs):
         message_content = request.data.get("title") or request.data.get("description") or ""
@@ -32,32 +220,136 @@ class TaskViewSet(viewsets.ModelViewSet):
         if isinstance(classification_result, Response):
             return classification_result
 
+        wait = retry_after()
+        if wait is not None:
+            return _queue_full_response(wait)
+
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        task = serializer.save()
+        task = serializer.save(assignment_status="pending", assignment_job_id=str(uuid.uuid4()), assignment_enqueued_at=timezone.now())
         logger.info(f"Saved Task ID={task.id}, title={task.title}")
-        result = run_assignment_pipeline.delay(task.id).get(timeout=120)
-        assigned_to = task.assigned_to.name if task.assigned_to else result.get("recommended_assignee")
-        raw_conf = result.get("confidence_score", 0.0)
+        job = enqueue_assignment(task)
+
+        if _wants_async(request):
+            data = _accepted_payload(request, task)
+            return Response(data, status=status.HTTP_202_ACCEPTED, headers={"Location": data["status_url"]})
+
+        result = job.get(timeout=settings.ASSIGNMENT_SYNC_TIMEOUT)
+        task.refresh_from_db()
+        return Response(_assignment_payload(task, result), status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["get"])
+    def assignment(self, request, pk=None):
+        """
+        Status/result of the task's assignment job. Pass ?wait=<seconds> to
+        long-poll until the job finishes. Each waiting request holds a worker
+        thread here, so the wait is capped by ASSIGNMENT_WSGI_LONG_POLL_MAX;
+        longer waits belong on the events stream or the async view (ASYNC_VIEWS).
+        """
+        task = self.get_object()
+        try:
+            wait = min(float(request.query_params.get("wait", 0)), settings.ASSIGNMENT_LONG_POLL_MAX,
+                       settings.ASSIGNMENT_WSGI_LONG_POLL_MAX)
+        except ValueError:
+            return Response({"detail": "wait must be a number of seconds."}, status=status.HTTP_400_BAD_REQUEST)
+
+        deadline = time.monotonic() + wait
+        while task.assignment_status in ("pending", "running") and time.monotonic() < deadline:
+            time.sleep(min(settings.ASSIGNMENT_LONG_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+            task.refresh_from_db(fields=["assignment_status", "assignment_result", "assigned_to", "confidence_score"])
+
+        return Response(_assignment_status(task), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Submit many tasks at once: {"tasks": [...]} or a bare list. Tasks are
+        inserted with one bulk_create and assigned by chunked Celery jobs
+        (BULK_ASSIGNMENT_CHUNK_SIZE tasks each). Returns 202 with a batch handle;
+        per-message classification is skipped since the caller is submitting tasks.
+        """
+        items = request.data.get("tasks") if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "Expected a non-empty list of tasks."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > max_batch_size():
+            return Response({"detail": f"At most {max_batch_size()} tasks per request."},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        wait = retry_after(len(items))
+        if wait is not None:
+            return _queue_full_response(wait)
+
+        serializer = BulkTaskSerializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        now = timezone.now()
+        with transaction.atomic():
+            batch = AssignmentBatch.objects.create(total=len(items))
+            tasks = Task.objects.bulk_create(
+                [Task(**data, batch=batch, assignment_status="pending", assignment_enqueued_at=now) for data in serializer.validated_data],
+                batch_size=500,
+            )
+            apply_transitions(tasks, created=True)  # bulk_create skips post_save
+            invalidate("task")
+        task_ids = [task.id for task in tasks]
+
+        # Chunk per priority lane so high-priority chunks jump ahead of the backlog.
+        size = settings.BULK_ASSIGNMENT_CHUNK_SIZE
+        chunks = []
+        for lane in sorted({priority_for(t.priority) for t in tasks}, reverse=True):
+            lane_ids = [t.id for t in tasks if priority_for(t.priority) == lane]
+            chunks += [
+                run_assignment_batch.s(lane_ids[i:i + size]).set(priority=lane)
+                for i in range(0, len(lane_ids), size)
+            ]
+        try:
+            chord(chunks)(finalize_assignment_batch.s(str(batch.id)))
+        except Exception as e:
+            mark_enqueue_failed(task_ids, e)
+            raise
+        logger.info(f"Queued batch {batch.id} with {len(task_ids)} tasks in {len(chunks)} chunks")
+
+        status_url = request.build_absolute_uri(reverse("task-bulk-status", args=[batch.id]))
+        return Response({
+            "batch_id": str(batch.id),
+            "total": batch.total,
+            "task_ids": task_ids,
+            "status": batch.status,
+            "status_url": status_url,
+        }, status=status.HTTP_202_ACCEPTED, headers={"Location": status_url})
+
+    @action(detail=False, methods=["get"], url_path="queue-stats")
+    def queue_stats(self, request):
+        """Assignment queue depth per priority lane and recent queue wait times, for worker autoscaling."""
         try:
-            confidence = float(raw_conf)
-        except (TypeError, ValueError):
-            confidence = 0.0
-        reason = result.get("reasoning", "No reasoning provided")
-        breakdown = result.get("confidence_breakdown", [])
-        email_sent = result.get("email_sent", False)
+            window = int(request.query_params.get("window", 15))
+        except ValueError:
+            return Response({"detail": "window must be a number of minutes."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(queue_stats(window), status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["get"], url_path=r"bulk/(?P<batch_id>[0-9a-f-]+)")
+    def bulk_status(self, request, batch_id=None):
+        """Aggregate progress of a bulk submission."""
+        batch = get_object_or_404(AssignmentBatch, pk=batch_id)
+        counts = dict.fromkeys(["pending", "running", "completed", "failed"], 0)
+        for row in batch.tasks.values("assignment_status").annotate(n=Count("id")):
+            counts[row["assignment_status"]] = row["n"]
+        done = counts["completed"] + counts["failed"]
         return Response({
-            "id": task.id,
-            "title": task.title,
-            "assigned_to": assigned_to,
-            "confidence_score": confidence,
-            "assignment_reason": reason,
-            "confidence_breakdown": breakdown,
-            "email_sent": email_sent,
-            "type": "task",
-        }, status=status.HTTP_201_CREATED)
+            "batch_id": str(batch.id),
+            "status": batch.status,
+            "total": batch.total,
+            "counts": counts,
+            "assigned": batch.tasks.filter(status="assigned").count(),
+            "progress": round(done / batch.total, 3) if batch.total else 1.0,
+            "created_at": batch.created_at,
+            "completed_at": batch.completed_at,
+        }, status=status.HTTP_200_OK)
 
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except StaleTaskError:
+            return Response({"detail": "Task was modified concurrently; reload and retry."}, status=status.HTTP_409_CONFLICT)
 
     @action(detail=True, methods=["post"])
     def manual_assign(self, request, pk=None):
@@ -65,15 +357,33 @@ class TaskViewSet(viewsets.ModelViewSet):
         assignee_id = request.data.get("assignee_id")
         decision = request.data.get("decision")  # "approve" / "reassign"
         assignee = get_object_or_404(Employee, pk=assignee_id)
-        task.assigned_to = assignee
-        task.status = "assigned"
-        task.confidence_score = float(request.data.get("confidence", 0))
-        task.save()
+        confidence = float(request.data.get("confidence", 0))
+        # Managers may override capacity; only the assignment columns are written, against the version read.
+        for attempt in range(settings.ASSIGNMENT_COMMIT_RETRIES + 1):
+            try:
+                assign_task(task, assignee, confidence)
+                break
+            except StaleTaskError:
+                if attempt == settings.ASSIGNMENT_COMMIT_RETRIES:
+                    return Response({"detail": "Task is being modified concurrently; retry."}, status=status.HTTP_409_CONFLICT)
+                task.refresh_from_db()
         AssignmentLog.objects.create(task=task, reasoning_text=f"Manual assignment: {decision}", confidence=task.confidence_score, decision_status="manager_assigned")
         return Response(TaskSerializer(task).data, status=status.HTTP_200_OK)
 
 
 class AssignmentLogViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
-    queryset = AssignmentLog.objects.all().order_by("-created_at")
+    queryset = AssignmentLog.objects.select_related("task__assigned_to").order_by("-created_at")
     serializer_class = AssignmentLogSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AssignmentLogFilter
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            queryset = queryset.only(
+                "id", "task", "reasoning_text", "confidence", "reviewed_by", "decision_status", "created_at",
+                "task__title", "task__status", "task__assigned_to", "task__assigned_to__name",
+            )
+        return queryset
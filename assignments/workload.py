@@ -0,0 +1,149 @@
+"""
+Incrementally maintained employee workload.
+
+Each active task (assigned / in progress / review) charges its assignee
+WORKLOAD_PRIORITY_WEIGHTS[priority] * WORKLOAD_EFFORT_WEIGHTS[effort] points.
+Charges and releases are applied with F-expressions in a single UPDATE per
+employee, so concurrent assignments never lose increments, and
+Employee.workload_score is kept current as
+
+    min(1, base_workload + workload_points / WORKLOAD_CAPACITY_POINTS)
+
+which workload_analyzer_node reads straight off the row. base_workload is the
+imported baseline (import_roles). Transitions are detected from a snapshot
+taken when a Task is loaded (post_init) and applied from post_save; code that
+bypasses signals (bulk_update) calls apply_transitions itself.
+reconcile_workloads() recomputes the counters from the tasks table and runs
+periodically from Celery beat to repair any drift.
+"""
+import logging
+from collections import defaultdict
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Sum, Value
+from django.db.models.functions import Greatest, Least
+
+from .models import Employee, Task
+from .response_cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("assigned", "in_progress", "review")
+SNAPSHOT_ATTR = "_workload_snapshot"
+
+
+def task_weight(priority: str, effort_level: str) -> float:
+    priority_weights = getattr(settings, "WORKLOAD_PRIORITY_WEIGHTS", {"low": 0.5, "medium": 1.0, "high": 2.0})
+    effort_weights = getattr(settings, "WORKLOAD_EFFORT_WEIGHTS", {"low": 0.5, "medium": 1.0, "high": 2.0})
+    return round(priority_weights.get(priority, 1.0) * effort_weights.get(effort_level, 1.0), 4)
+
+
+def _capacity() -> float:
+    return float(getattr(settings, "WORKLOAD_CAPACITY_POINTS", 8.0)) or 1.0
+
+
+def score_expression(points=None):
+    """SQL for the effective workload_score, from base_workload and (optionally new) workload_points."""
+    points = F("workload_points") if points is None else points
+    return Least(Value(1.0), F("base_workload") + points / Value(_capacity()), output_field=FloatField())
+
+
+def effective_score(base_workload: float, workload_points: float) -> float:
+    """Python counterpart of score_expression() for a row being written directly."""
+    return min(1.0, base_workload + workload_points / _capacity())
+
+
+def adjust(employee_id: int, points: float, count: int) -> None:
+    """Atomically add points / active task count to one employee and refresh its workload_score."""
+    new_points = F("workload_points") + Value(points)
+    Employee.objects.filter(pk=employee_id).update(
+        workload_points=new_points,
+        active_tasks=Greatest(F("active_tasks") + count, Value(0)),
+        workload_score=score_expression(new_points),
+    )
+    invalidate("employee")
+
+
+def snapshot(task: Task) -> None:
+    """Remember the persisted assignee/status/weight so the next save can be diffed against it."""
+    fields = task.__dict__
+    if all(name in fields for name in ("assigned_to_id", "status", "workload_weight")):
+        setattr(task, SNAPSHOT_ATTR, (fields["assigned_to_id"], fields["status"], fields["workload_weight"]))
+    else:
+        # Deferred fields: unknown previous state; reconciliation covers it.
+        setattr(task, SNAPSHOT_ATTR, None)
+
+
+def apply_transitions(tasks: Iterable[Task], created: bool = False, persist_weights: bool = True) -> List[Task]:
+    """
+    Charge/release assignee workloads for tasks whose assignee or status changed
+    since they were loaded. Returns the tasks that were newly charged (their
+    workload_weight is set in memory; persisted unless persist_weights=False).
+    """
+    deltas = defaultdict(lambda: [0.0, 0])
+    charged = []
+    for task in tasks:
+        previous: Optional[tuple] = (None, None, 0.0) if created else getattr(task, SNAPSHOT_ATTR, None)
+        if previous is None:
+            logger.debug(f"[Workload] No snapshot for Task ID={task.pk}; skipping incremental update")
+            snapshot(task)
+            continue
+        old_emp, old_status, old_weight = previous
+        was_active = old_emp is not None and old_status in ACTIVE_STATUSES
+        is_active = task.assigned_to_id is not None and task.status in ACTIVE_STATUSES
+        moved = old_emp != task.assigned_to_id
+
+        if was_active and (not is_active or moved):
+            deltas[old_emp][0] -= old_weight
+            deltas[old_emp][1] -= 1
+        if is_active and (not was_active or moved):
+            task.workload_weight = task_weight(task.priority, task.effort_level)
+            deltas[task.assigned_to_id][0] += task.workload_weight
+            deltas[task.assigned_to_id][1] += 1
+            charged.append(task)
+        snapshot(task)
+
+    with transaction.atomic():
+        if charged and persist_weights:
+            Task.objects.bulk_update(charged, ["workload_weight"])
+        for employee_id, (points, count) in deltas.items():
+            if points or count:
+                adjust(employee_id, points, count)
+    return charged
+
+
+def release(task: Task) -> None:
+    """Task deleted: give its points back if it was still counted."""
+    previous = getattr(task, SNAPSHOT_ATTR, None)
+    if previous and previous[0] is not None and previous[1] in ACTIVE_STATUSES:
+        adjust(previous[0], -previous[2], -1)
+
+
+def reconcile_workloads() -> int:
+    """Recompute every employee's counters from the tasks table. Returns how many had drifted."""
+    with transaction.atomic():
+        employees = list(
+            Employee.objects.select_for_update()
+            .only("id", "base_workload", "workload_points", "active_tasks", "workload_score")
+        )
+        totals = {
+            row["assigned_to"]: (row["n"], row["points"] or 0.0)
+            for row in Task.objects.filter(status__in=ACTIVE_STATUSES, assigned_to__isnull=False)
+            .values("assigned_to")
+            .annotate(n=Count("id"), points=Sum("workload_weight"))
+        }
+        drifted = []
+        for emp in employees:
+            count, points = totals.get(emp.pk, (0, 0.0))
+            score = effective_score(emp.base_workload, points)
+            if emp.active_tasks != count or abs(emp.workload_points - points) > 1e-6 or abs(emp.workload_score - score) > 1e-6:
+                emp.active_tasks, emp.workload_points, emp.workload_score = count, points, score
+                drifted.append(emp)
+        Employee.objects.bulk_update(drifted, ["active_tasks", "workload_points", "workload_score"], batch_size=500)
+        if drifted:
+            invalidate("employee")
+    if drifted:
+        logger.warning(f"[Workload] Reconciled {len(drifted)} employees with drifted counters")
+    return len(drifted)
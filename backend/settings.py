@@ -12,6 +12,7 @@ SECRET_KEY = 'django-insecure-8%nwg5did=_-(bz#ow8qgn848ouzws0n5cn=wd4**rbso$52^^
 DEBUG = True
 
 INSTALLED_APPS = [
+    "daphne",  # ASGI runserver: streaming progress endpoints (SSE / WebSocket)
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -21,6 +22,8 @@ INSTALLED_APPS = [
     'corsheaders',
     "rest_framework",
     "drf_spectacular",
+    "django_filters",
+    "channels",
     "assignments.apps.AssignmentsConfig",
 ]
 
@@ -51,13 +54,179 @@ DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
 
 # Controls
 ENABLE_EMAIL_NOTIFICATIONS = env("ENABLE_EMAIL_NOTIFICATIONS", "true") == "true"
-USE_CELERY_FOR_EMAIL = env("USE_CELERY_FOR_EMAIL", "false") == "true"
+# Notifications are queued in the NotificationOutbox table and sent in batches
+# (one SMTP connection / Slack client per batch) by the flush_notifications
+# Celery task, NOTIFICATION_FLUSH_DELAY seconds after the first enqueue; only
+# without a reachable broker are they sent in-process after the commit.
+# USE_CELERY_FOR_EMAIL is no longer read: delivery always goes through Celery.
+NOTIFICATION_FLUSH_DELAY = int(env("NOTIFICATION_FLUSH_DELAY", 2))
+NOTIFICATION_BATCH_SIZE = int(env("NOTIFICATION_BATCH_SIZE", 100))
+NOTIFICATION_MAX_ATTEMPTS = int(env("NOTIFICATION_MAX_ATTEMPTS", 5))
+NOTIFICATION_RETRY_BASE = int(env("NOTIFICATION_RETRY_BASE", 30))  # seconds, doubled per attempt
+NOTIFICATION_RETRY_MAX = int(env("NOTIFICATION_RETRY_MAX", 3600))
+NOTIFICATION_CLAIM_TIMEOUT = int(env("NOTIFICATION_CLAIM_TIMEOUT", 300))  # a crashed sender's rows are retried after this
+NOTIFICATION_SWEEP_INTERVAL = int(env("NOTIFICATION_SWEEP_INTERVAL", 60))
+SLACK_BOT_TOKEN = env("SLACK_BOT_TOKEN", "")
+SLACK_TIMEOUT = int(env("SLACK_TIMEOUT", 10))
+
+# Task creation: when true, POST /api/tasks/ returns 202 with a job handle
+# instead of waiting for the assignment pipeline (override per request with ?async=)
+ASYNC_TASK_ASSIGNMENT = env("ASYNC_TASK_ASSIGNMENT", "false") == "true"
+# Serve POST /api/tasks/ from async views (assignments/async_views.py); enable when running under daphne/uvicorn
+ASYNC_VIEWS = env("ASYNC_VIEWS", "false") == "true"
+ASSIGNMENT_SYNC_TIMEOUT = int(env("ASSIGNMENT_SYNC_TIMEOUT", 120))
+# GET /api/tasks/<id>/assignment/?wait=: the async view (ASYNC_VIEWS) waits up to ASSIGNMENT_LONG_POLL_MAX;
+# the WSGI view sleeps on a worker thread, so it never waits longer than ASSIGNMENT_WSGI_LONG_POLL_MAX
+ASSIGNMENT_LONG_POLL_MAX = float(env("ASSIGNMENT_LONG_POLL_MAX", 30))
+ASSIGNMENT_WSGI_LONG_POLL_MAX = float(env("ASSIGNMENT_WSGI_LONG_POLL_MAX", 3))
+ASSIGNMENT_LONG_POLL_INTERVAL = float(env("ASSIGNMENT_LONG_POLL_INTERVAL", 0.5))
+# POST /api/tasks/bulk/: max tasks per request (never above ASSIGNMENT_QUEUE_MAX_DEPTH), tasks per Celery batch job
+BULK_TASK_MAX = int(env("BULK_TASK_MAX", 1000))
+BULK_ASSIGNMENT_CHUNK_SIZE = int(env("BULK_ASSIGNMENT_CHUNK_SIZE", 25))
 
 # LLM provider keys available from env
 OPENAI_API_KEY = env("OPENAI_API_KEY", default=None)
 ANTHROPIC_API_KEY = env("ANTHROPIC_API_KEY", default=None)
+MISTRAL_API_KEY = env("MISTRAL_API_KEY", default=None)
+
+# Pipeline LLM providers in order of preference. With more than one, get_llm() routes through
+# assignments/llm_router.py: latency-ranked, hedged after the leader's p95, failover on errors.
+LLM_PROVIDERS = [p.strip() for p in env("LLM_PROVIDERS", "openai").split(",") if p.strip()]
+LLM_PROVIDER_MODELS = {
+    "openai": env("OPENAI_MODEL", "gpt-4o-mini"),
+    "anthropic": env("ANTHROPIC_MODEL", "claude-3-5-haiku-latest"),
+    "mistral": env("MISTRAL_MODEL", "mistral-small-latest"),
+}
+LLM_PROVIDER_URLS = {
+    "openai": env("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+    "anthropic": env("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1"),
+    "mistral": env("MISTRAL_BASE_URL", "https://api.mistral.ai/v1"),
+}
+LLM_HEDGE_DEFAULT_DELAY = float(env("LLM_HEDGE_DEFAULT_DELAY", 2.0))  # until a provider has enough samples
+LLM_HEDGE_MIN_DELAY = float(env("LLM_HEDGE_MIN_DELAY", 0.25))
+LLM_HEDGE_MAX_DELAY = float(env("LLM_HEDGE_MAX_DELAY", 10.0))
+LLM_MAX_HEDGES = int(env("LLM_MAX_HEDGES", 1))
+LLM_ROUTER_TIMEOUT = float(env("LLM_ROUTER_TIMEOUT", 60))
+LLM_ROUTER_FAILURE_THRESHOLD = int(env("LLM_ROUTER_FAILURE_THRESHOLD", 3))  # consecutive failures before cooldown
+LLM_ROUTER_COOLDOWN = float(env("LLM_ROUTER_COOLDOWN", 30))
+LLM_ROUTER_WINDOW = int(env("LLM_ROUTER_WINDOW", 200))  # latency samples kept per provider
+LLM_ROUTER_MAX_WORKERS = int(env("LLM_ROUTER_MAX_WORKERS", 32))
+
+# Message classification: local rules first, LLM only for ambiguous text; results cached by message hash
+LOCAL_CLASSIFIER_ENABLED = env("LOCAL_CLASSIFIER_ENABLED", "true") == "true"
+MESSAGE_CLASSIFIER_CACHE_TTL = int(env("MESSAGE_CLASSIFIER_CACHE_TTL", 3600))
+MESSAGE_CLASSIFIER_CACHE_SIZE = int(env("MESSAGE_CLASSIFIER_CACHE_SIZE", 4096))
+
+# Task parser result cache (in-process LRU + Redis when REDIS_URL is set)
+PARSER_CACHE_ENABLED = env("PARSER_CACHE_ENABLED", "true") == "true"
+PARSER_CACHE_TTL = int(env("PARSER_CACHE_TTL", 86400))
+PARSER_CACHE_MAXSIZE = int(env("PARSER_CACHE_MAXSIZE", 1024))
+
+# Role matching: how many top-scoring candidates reach workload analysis / scoring
+ROLE_MATCHING_TOP_K = int(env("ROLE_MATCHING_TOP_K", 25))
+# "database" (SQL scoring, full-text on PostgreSQL), "memory" (process-local skill index),
+# or "auto" (database on PostgreSQL, memory elsewhere)
+ROLE_MATCHING_BACKEND = env("ROLE_MATCHING_BACKEND", "auto")
+
+# Semantic (embedding) stage on top of lexical matching; EMBEDDING_PROVIDER is "hash" (local, offline) or "openai"
+SEMANTIC_MATCHING = env("SEMANTIC_MATCHING", "false") == "true"
+SEMANTIC_MATCHING_WEIGHT = float(env("SEMANTIC_MATCHING_WEIGHT", 2.0))
+SEMANTIC_MIN_SIMILARITY = float(env("SEMANTIC_MIN_SIMILARITY", 0.15))
+EMBEDDING_PROVIDER = env("EMBEDDING_PROVIDER", "hash")
+EMBEDDING_MODEL = env("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIM = int(env("EMBEDDING_DIM", 512))
+
+# Shared Redis (cross-process cache invalidation, caching); optional
+REDIS_URL = env("REDIS_URL", default=None)
+
+# Django cache: Redis when configured (shared by web and worker processes), else per-process memory
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "SOCKET_CONNECT_TIMEOUT": 2,
+                "SOCKET_TIMEOUT": 2,
+                "IGNORE_EXCEPTIONS": True,  # a Redis outage degrades to uncached reads
+            },
+        }
+    }
+    DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Channel layer for live pipeline progress (assignments/progress.py); Redis so worker events reach web processes
+if REDIS_URL:
+    CHANNEL_LAYERS = {"default": {"BACKEND": "channels_redis.core.RedisChannelLayer", "CONFIG": {"hosts": [REDIS_URL]}}}
+else:
+    CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+PIPELINE_PROGRESS_ENABLED = env("PIPELINE_PROGRESS_ENABLED", "true") == "true"
+PIPELINE_PROGRESS_HEARTBEAT = float(env("PIPELINE_PROGRESS_HEARTBEAT", 15))  # seconds between keep-alives / status re-checks
+PIPELINE_PROGRESS_STREAM_TIMEOUT = float(env("PIPELINE_PROGRESS_STREAM_TIMEOUT", 300))
+
+# Cached list responses / counts (assignments/response_cache.py)
+RESPONSE_CACHE_ENABLED = env("RESPONSE_CACHE_ENABLED", "true") == "true"
+RESPONSE_CACHE_TTL = int(env("RESPONSE_CACHE_TTL", 300))
+
+# Prometheus metrics (GET /metrics, assignments/metrics.py): per-process increments are
+# flushed into a Redis hash every METRICS_FLUSH_INTERVAL seconds so any web process
+# serves totals for all web and Celery processes. METRICS_TOKEN guards the endpoint.
+METRICS_ENABLED = env("METRICS_ENABLED", "true") == "true"
+METRICS_FLUSH_INTERVAL = float(env("METRICS_FLUSH_INTERVAL", 5))
+METRICS_TOKEN = env("METRICS_TOKEN", "")
+# USD per 1M tokens, for assignments_llm_cost_usd_total
+LLM_PRICING = {
+    "gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
+    "gpt-4o": {"prompt": 2.50, "completion": 10.00},
+    "claude-3-5-haiku-latest": {"prompt": 0.80, "completion": 4.00},
+    "mistral-small-latest": {"prompt": 0.10, "completion": 0.30},
+}
+
+# Pooled LLM HTTP clients (one keep-alive pool per worker process)
+LLM_HTTP_MAX_CONNECTIONS = int(env("LLM_HTTP_MAX_CONNECTIONS", 20))
+LLM_ASYNC_MAX_CONNECTIONS = int(env("LLM_ASYNC_MAX_CONNECTIONS", 200))  # per event loop (ASGI worker)
+LLM_HTTP_MAX_KEEPALIVE = int(env("LLM_HTTP_MAX_KEEPALIVE", 10))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(env("LLM_HTTP_KEEPALIVE_EXPIRY", 30))
+LLM_HTTP_TIMEOUT = float(env("LLM_HTTP_TIMEOUT", 60))
+LLM_HTTP_CONNECT_TIMEOUT = float(env("LLM_HTTP_CONNECT_TIMEOUT", 5))
+LLM_MAX_RETRIES = int(env("LLM_MAX_RETRIES", 2))
+
+# Confidence scoring fan-out: parallel LLM calls per task and per-call timeout (seconds)
+LLM_SCORING_CONCURRENCY = int(env("LLM_SCORING_CONCURRENCY", 8))
+LLM_SCORING_TIMEOUT = float(env("LLM_SCORING_TIMEOUT", 30))
+# Cap on one scoring fan-out from submission, covering calls still queued behind a hung provider
+LLM_SCORING_DEADLINE = float(env("LLM_SCORING_DEADLINE", 60))
+# "per_candidate" (one prompt per candidate) or "batch" (rank the top-K in chunked prompts)
+CONFIDENCE_SCORING_MODE = env("CONFIDENCE_SCORING_MODE", "per_candidate")
+CONFIDENCE_BATCH_TOP_K = int(env("CONFIDENCE_BATCH_TOP_K", 30))
+CONFIDENCE_BATCH_SIZE = int(env("CONFIDENCE_BATCH_SIZE", 15))
+# Prompt token budgets (assignments/prompts.py): long task descriptions and responsibilities are
+# compacted to fit; the task context is compacted once and reused by every candidate prompt.
+PROMPT_TOKEN_BUDGETS = {
+    "parse": int(env("PROMPT_BUDGET_PARSE", 1500)),
+    "score": int(env("PROMPT_BUDGET_SCORE", 1000)),
+    "score_batch": int(env("PROMPT_BUDGET_SCORE_BATCH", 4000)),
+}
+PROMPT_TASK_CONTEXT_TOKENS = int(env("PROMPT_TASK_CONTEXT_TOKENS", 500))
+PROMPT_RESPONSIBILITIES_TOKENS = int(env("PROMPT_RESPONSIBILITIES_TOKENS", 150))
+# Incremental workload model (assignments/workload.py): active task points = priority weight * effort weight
+WORKLOAD_PRIORITY_WEIGHTS = {"low": 0.5, "medium": 1.0, "high": 2.0}
+WORKLOAD_EFFORT_WEIGHTS = {"low": 0.5, "medium": 1.0, "high": 2.0}
+WORKLOAD_CAPACITY_POINTS = float(env("WORKLOAD_CAPACITY_POINTS", 8))  # points that add 1.0 to workload_score
+WORKLOAD_RECONCILE_INTERVAL = int(env("WORKLOAD_RECONCILE_INTERVAL", 3600))
+# Auto-assignment skips candidates whose workload would exceed this; conflicting commits are retried
+WORKLOAD_ASSIGN_LIMIT = float(env("WORKLOAD_ASSIGN_LIMIT", 1.0))
+ASSIGNMENT_COMMIT_RETRIES = int(env("ASSIGNMENT_COMMIT_RETRIES", 3))
+# Checkpoint each assignment graph step so retried jobs resume from the last completed node
+PIPELINE_CHECKPOINTING = env("PIPELINE_CHECKPOINTING", "true") == "true"
+PIPELINE_MAX_RETRIES = int(env("PIPELINE_MAX_RETRIES", 2))
+# Checkpoint threads with no new step for this long (failed / abandoned runs) are purged hourly
+PIPELINE_CHECKPOINT_TTL = int(env("PIPELINE_CHECKPOINT_TTL", 86400))
 
 MIDDLEWARE = [
+    'assignments.tracing.TraceIdMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -68,7 +237,18 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Log lines carry the request's trace id (X-Trace-Id), in web and Celery processes alike.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {"trace_id": {"()": "assignments.tracing.TraceIdFilter"}},
+    "formatters": {"traced": {"format": "%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"}},
+    "handlers": {"console": {"class": "logging.StreamHandler", "filters": ["trace_id"], "formatter": "traced"}},
+    "loggers": {"assignments": {"handlers": ["console"], "level": env("LOG_LEVEL", "INFO"), "propagate": False}},
+}
+
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ["X-Trace-Id"]
 
 CORS_ALLOW_CREDENTIALS = True
 
@@ -98,6 +278,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = "backend.asgi.application"
 
 DATABASES = {
     "default": {
@@ -161,16 +342,39 @@ SPECTACULAR_SETTINGS = {
     "SECURITY": [{"BearerAuth": []}],
 }
 
+# Task / assignment-log lists are cursor-paginated (assignments/pagination.py); ?page_size= up to the max.
+API_PAGE_SIZE = int(env("API_PAGE_SIZE", 50))
+API_MAX_PAGE_SIZE = int(env("API_MAX_PAGE_SIZE", 500))
+
+# Assignment queue: priority lanes keyed on Task.priority (see assignments/queueing.py).
+# Unbounded at the broker; backpressure is applied by the API via ASSIGNMENT_QUEUE_MAX_DEPTH.
+ASSIGNMENT_PRIORITY_MAP = {"high": 9, "medium": 5, "low": 1}  # 0-9, higher is served first
+ASSIGNMENT_QUEUE_MAX_DEPTH = int(env("ASSIGNMENT_QUEUE_MAX_DEPTH", 500))  # 0 disables backpressure
+ASSIGNMENT_QUEUE_RETRY_AFTER = int(env("ASSIGNMENT_QUEUE_RETRY_AFTER", 30))
+# Pending tasks enqueued longer ago than this (lost messages) no longer count toward the depth; 0 = no limit
+ASSIGNMENT_QUEUE_PENDING_MAX_AGE = int(env("ASSIGNMENT_QUEUE_PENDING_MAX_AGE", 3600))
+
 CELERY_TASK_QUEUES = {
     "assignment_queue": {
         "exchange": "assignment",
         "routing_key": "assignment",
-        "queue_arguments": {"x-max-length": 1},
+        "queue_arguments": {"x-max-priority": 10},
     }
 }
+CELERY_TASK_QUEUE_MAX_PRIORITY = 10
+# Redis emulates priorities with one list per step (queueing.priority_for handles its inverted order).
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+}
+# Long LLM jobs: don't let one worker hoard prefetched messages that a free worker could run.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
 
 CELERY_TASK_ROUTES = {
     "assignments.ai_engine.run_assignment_pipeline": {"queue": "assignment_queue"},
+    "assignments.ai_engine.run_assignment_batch": {"queue": "assignment_queue"},
+    "assignments.ai_engine.finalize_assignment_batch": {"queue": "assignment_queue"},
 }
 
 
@@ -180,4 +384,18 @@ CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND")
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
-CELERY_TIMEZONE = "Asia/Kolkata"
\ No newline at end of file
+CELERY_TIMEZONE = "Asia/Kolkata"
+CELERY_BEAT_SCHEDULE = {
+    "reconcile-workload-counters": {
+        "task": "assignments.tasks.reconcile_workload_counters",
+        "schedule": WORKLOAD_RECONCILE_INTERVAL,
+    },
+    "flush-notification-outbox": {
+        "task": "assignments.tasks.flush_notifications",
+        "schedule": NOTIFICATION_SWEEP_INTERVAL,
+    },
+    "purge-pipeline-checkpoints": {
+        "task": "assignments.tasks.purge_pipeline_checkpoints",
+        "schedule": 3600,
+    },
+}
\ No newline at end of file
@@ -5,11 +5,13 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.http import HttpResponse
+from assignments.views import metrics_endpoint
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path('api/', include('assignments.urls')),
+    path("metrics", metrics_endpoint, name="metrics"),
     path("", lambda request: HttpResponse("AI Task Backend is Running!")), 
 ]
 